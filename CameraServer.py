@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 # CameraServer.py — Fast‑Wake + Reconnect + Pre‑Arm DSLR for near zero‑lag
-import os, cv2, glob, stat, time, atexit, signal, threading
+import os, re, cv2, glob, stat, time, queue, atexit, signal, socket, itertools, threading
 import numpy as np
 from datetime import datetime
+import multiprocessing as mp
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional, List
+from contextlib import nullcontext
 from flask import Flask, Response, jsonify, request, stream_with_context, make_response, send_from_directory
+from framebus import FrameBroadcaster, FrameRing
+from jpegenc import AutoEncoder
+import renditions
+from catalog import CaptureCatalog
+from storage import capture_path, RetentionWorker
+from hotplug import HotplugMonitor
+from devices import DeviceRegistry
+from probecache import ProbeCache, v4l2_capture_nodes, v4l2_identity
+import synthcam
+import metrics
+import adaptive
+import wsframes
+import h264live
 
 # ---------- .env (CORS) ----------
 try:
@@ -24,47 +40,96 @@ CORS_ALLOW_ORIGINS = _parse_origins(os.environ.get("CORS_ALLOW_ORIGINS")) or [
 ]
 
 # ---------- Config ----------
-HOST, PORT, DEBUG = "0.0.0.0", 8080, False
-JPEG_QUALITY = 80
-UVC_W, UVC_H, UVC_FPS = 1280, 720, 60.0
-GPHOTO_FPS = 60.0
-WATCH_INTERVAL = 1.0
+HOST, PORT, DEBUG = "0.0.0.0", int(os.environ.get("PORT", "8080")), False
+JPEG_QUALITY = int(os.environ.get("JPEG_QUALITY", "80"))
+JPEG_ENCODER = os.environ.get("JPEG_ENCODER", "auto")   # auto|opencv|pillow|simplejpeg|turbojpeg
+UVC_W, UVC_H = int(os.environ.get("UVC_W", "1280")), int(os.environ.get("UVC_H", "720"))
+UVC_FPS = float(os.environ.get("UVC_FPS", "60"))
+UVC_FLUSH_FRAMES = 8   # max stale frames dropped after a standby / idle / paused gap
+# MJPEG passthrough: ask the webcam for MJPG with OpenCV's decode off and publish its own JPEG bytes;
+# pixels are decoded only for captures / ?w=&q= variants / H.264. Falls back to BGR if the backend won't.
+UVC_PASSTHROUGH = os.environ.get("UVC_PASSTHROUGH", "1").lower() in ("1", "true", "yes")
+GPHOTO_FPS = float(os.environ.get("GPHOTO_FPS", "60"))
+WATCH_INTERVAL = 1.0                       # polling fallback only (no netlink / inotify)
+HOTPLUG_BACKEND = os.environ.get("HOTPLUG_BACKEND", "auto")   # auto|netlink|inotify|poll
+HOTPLUG_RESYNC_S = float(os.environ.get("HOTPLUG_RESYNC_S", "60"))  # safety re-scan while event-driven
+DEVICE_TTL_S = float(os.environ.get("DEVICE_TTL_S", "120"))   # registry age past which readers log / report it stale
 FRAME_TIMEOUT_S = 1.0
 FIRST_FRAME_DEADLINE_MS = 300
+# /video_feed?w=640&q=60 preview ladder — each watched variant is encoded once per frame
+VARIANT_MIN_W = 160
+VARIANT_MAX = int(os.environ.get("VARIANT_MAX", "4"))
+# slow viewers: each holds only the newest frame (framebus); ?fps= caps a viewer's rate and the
+# socket send buffer is clamped so a stalled Wi-Fi client can't queue seconds of stale frames
+VIEWER_MAX_FPS = 60.0
+STREAM_SNDBUF_KB = int(os.environ.get("STREAM_SNDBUF_KB", "256"))   # 0 = kernel autotuning
+# demand-driven live loop: full rate while someone watches / a capture runs, STANDBY_FPS for
+# STANDBY_GRACE_S after the last one leaves (<0 = standby forever), then IDLE_MODE:
+#   release = close the device (UVC) / end the DSLR session;  sleep = keep it open, no reads (DSLR LV off)
+STANDBY_FPS = float(os.environ.get("STANDBY_FPS", "2"))
+STANDBY_GRACE_S = float(os.environ.get("STANDBY_GRACE_S", "30"))
+IDLE_MODE = os.environ.get("IDLE_MODE", "release").lower()
+DEMAND_HOLD_S = 1.0   # full rate this long after start() / demand(), until the viewer has subscribed
+DEMAND_WAKE_S = 3.0   # capture / snapshot on a standby or released engine: wait this long for a fresh frame
+# adaptive preview: ADAPTIVE=0 pins JPEG_QUALITY / full size / UVC_FPS; limits in adaptive.from_env
+ADAPT_INTERVAL_S = 1.0
+# zero-shutter-lag: keep the last N raw UVC frames (capped at ZSL_MAX_MB) so /capture can
+# pick the frame closest to the moment the client's countdown hit zero
+ZSL_FRAMES = int(os.environ.get("ZSL_FRAMES", "8"))
+ZSL_MAX_MB = float(os.environ.get("ZSL_MAX_MB", "64"))
+ZSL_WAIT_S = 0.25
+ZSL_CLOCK_ERR_MAX_S = 1.0   # cap on the client's reported clock error added to that wait
+# UVC stills: encoded from the raw frame (not the preview JPEG) on the writer pool; in MJPEG
+# passthrough a jpg still is the camera's own JPEG, saved unchanged
+STILL_QUALITY = int(os.environ.get("STILL_QUALITY", "95"))
+STILL_FORMAT = os.environ.get("STILL_FORMAT", "jpg").lower()          # jpg | png (lossless)
+STILL_PNG_COMPRESSION = 1   # zlib level: lossless either way, 1 keeps the encode fast
+STILL_MAX_RES = (os.environ.get("STILL_MAX_RES", "0").lower() in ("1","true","yes"))
+STILL_SETTLE_FRAMES = 2   # frames dropped after a resolution switch (AE / buffer flush)
 
 # ---------- App / State ----------
 app = Flask(__name__)
 
-# shared preview buffer
-buf_lock = threading.Lock()
-latest_jpeg: Optional[bytes] = None
-latest_ver = 0
-
-frame_event = threading.Event()
-
-# capture anti-double
-capture_lock = threading.Lock()
+# WebSocket live view under Flask / gunicorn needs flask-sock; asgi.py serves it natively
+try:
+    from flask_sock import Sock
+    ws_app = Sock(app)
+except Exception:
+    ws_app = None
+
+# picked by micro-benchmark on the first real frame (see jpegenc.AutoEncoder)
+jpeg_encoder = AutoEncoder(JPEG_ENCODER)
+# live preview operating point (quality / scale / fps), stepped by _adapt_loop under load
+adapt = adaptive.from_env(JPEG_QUALITY, max(UVC_FPS, GPHOTO_FPS))
+
+# ---- instrumentation, scraped from /api/metrics (see metrics.py)
+M_STAGE = metrics.histogram("camera_stage_seconds", "Live pipeline stage latency: read/encode/render/publish/write", ("cam", "stage"))
+M_CAPTURE = metrics.histogram("camera_capture_step_seconds", "Capture step latency", ("cam", "step"))
+M_FRAMES = metrics.counter("camera_frames_total", "Sensor frames by outcome: produced/read_failed/throttled", ("cam", "outcome"))
+M_VIEWER = metrics.counter("camera_viewer_frames_total", "Frames per connected viewer: delivered/skipped", ("cam", "viewer", "outcome"))
+M_DELIVERY = metrics.counter("camera_delivery_frames_total", "Frames to all viewers: delivered/skipped", ("cam", "outcome"))
+M_CAPTURES = metrics.counter("camera_captures_total", "Capture requests by result", ("cam", "result"))
+metrics.gauge("camera_viewers", "Connected viewers per camera bus", ("cam",),
+              fn=lambda: {(e.id,): e.bus.subscribers for e in list(engines.values())})
+
+# capture anti-double is per engine (CameraEngine.capture_lock); two engines can capture at
+# once, so the id / last path are only updated under _capture_seq_lock (_record_capture)
 last_capture_id = 0
 last_captured_path = None
+_capture_seq_lock = threading.Lock()
 
-# control flags
+# control flags (pause_live changes go through _set_pause so parked live loops wake up)
 pause_live = False
 viewers = 0
 
 ENGINE_UVC, ENGINE_GPHOTO = "uvc", "gphoto"
 current_engine = None
 
-# ---- UVC live thread
-uvc_thread = None
-uvc_running = False
-
-# ---- gphoto live thread + single-owner camera
-gphoto_thread = None
-gphoto_running = False
+# ---- one engine per device: own preview bus, live thread and device lock (see "Engines")
+engines = {}                      # cam id -> CameraEngine
+engines_lock = threading.RLock()
+primary_id: Optional[str] = None  # engine behind the single-camera routes (/video_feed, /capture, …)
 gphoto_selected_port: Optional[str] = None
-gphoto_last_error: Optional[str] = None
-gphoto_cam = None                 # live thread owns camera
-gphoto_cam_lock = threading.RLock()
 
 # probe state (only by watcher/boot)
 last_probe = {"engine": None, "ok": False, "why": "not-probed", "details": {}, "time": None}
@@ -72,12 +137,25 @@ last_probe = {"engine": None, "ok": False, "why": "not-probed", "details": {}, "
 # watcher (hot-plug)
 watcher_thread = None
 watcher_running = False
-_last_seen_uvc = set()
-_last_seen_gphoto_ports = set()
 starting_live = threading.Event()
+hotplug: Optional[HotplugMonitor] = None
 
 SAVE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "captured_images"))
 os.makedirs(SAVE_DIR, exist_ok=True)
+RENDITION_DIR = os.path.join(SAVE_DIR, "renditions")   # preview / thumb / print derivatives
+RENDITION_WORKERS = int(os.environ.get("RENDITION_WORKERS", "2"))
+RENDITION_PREVIEW_TIMEOUT_S = 3.0
+# capture index (SQLite) — kept beside the app, never inside the served SAVE_DIR; rebuilt from the directory if missing
+CATALOG_DB_PATH = os.environ.get("CATALOG_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".capture_catalog.sqlite3"))
+capture_catalog = CaptureCatalog(SAVE_DIR, db_path=CATALOG_DB_PATH, skip_dirs=[RENDITION_DIR])
+# captures are sharded as SAVE_DIR/<YYYYMMDD>/<session>/…; 0 disables a limit
+RETENTION_MAX_GB = float(os.environ.get("RETENTION_MAX_GB", "0"))
+RETENTION_MAX_DAYS = float(os.environ.get("RETENTION_MAX_DAYS", "0"))
+RETENTION_INTERVAL_S = float(os.environ.get("RETENTION_INTERVAL_S", "300"))
+# last good probe (device identity + working mode) — boot starts live from it, then verifies
+PROBE_CACHE_PATH = os.environ.get("PROBE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".probe_cache.json"))
+PROBE_VERIFY_S = 3.0   # first live frame must arrive within this, else full probe
+probe_cache = ProbeCache(PROBE_CACHE_PATH)
 
 # ---------- Utils ----------
 DELETE_RECENT_AFTER_UPLOAD = (os.environ.get("DELETE_RECENT_AFTER_UPLOAD", "false").lower() in ("1","true","yes"))
@@ -86,20 +164,116 @@ try:
 except Exception:
     DELETE_RECENT_COUNT = 2
 
-# Pre‑arm window (ms) — if /api/prepare_shot was called recently, skip DSLR toggle‑off to reduce lag
-prearmed_until_ms = 0
-prearm_lock = threading.Lock()
+# background writer — captures are returned before their file hits the disk;
+# serve_captured_image waits on the pending future for that file
+_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persist")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+# derivative pool — forked by the start-up hooks (__main__ / ASGI lifespan) before any
+# camera/watcher thread exists; importing the module alone forks nothing
+_rend_pool: Optional[ProcessPoolExecutor] = None
+_rend_pool_lock = threading.Lock()
+
+
+def start_rendition_pool() -> ProcessPoolExecutor:
+    """Fork the derivative workers once; a bare WSGI import gets them on the first DSLR capture."""
+    global _rend_pool
+    with _rend_pool_lock:
+        if _rend_pool is None:
+            _rend_pool = ProcessPoolExecutor(max_workers=RENDITION_WORKERS, mp_context=mp.get_context("fork"))
+            # the submit forks the workers; warm-up runs in them without holding anyone up
+            _rend_pool.submit(renditions.warm).add_done_callback(_rend_warmed)
+        return _rend_pool
 
 
-def _list_captured_sorted():
-    files = []
+def _rend_warmed(fut: Future):
+    e = None if fut.cancelled() else fut.exception()
+    if e is not None: log(f"[BOOT] rendition pool warm-up failed: {e}")
+
+
+def _track_pending(path, fut: Future):
+    with _pending_lock:
+        _pending[path] = fut
+    fut.add_done_callback(lambda _f: _untrack_pending(path, _f))
+
+
+def _untrack_pending(path, fut):
+    with _pending_lock:
+        if _pending.get(path) is fut: _pending.pop(path, None)
+
+
+def _renditions_for(data: bytes, original: str):
+    """Start preview/thumb/print derivatives -> (preview bytes or None, {name: path}).
+
+    Only the preview is waited for (it feeds the live buffer and the response);
+    thumb and print finish in the background.
+    """
+    paths = {n: renditions.rendition_path(_rendition_dir(original), original, n) for n in renditions.SPECS}
+    pool = start_rendition_pool()
+    pv = pool.submit(renditions.render_to, data, paths["preview"], "preview")
+    _track_pending(paths["preview"], pv)
+    rest = [(n, p) for n, p in paths.items() if n != "preview"]
+    bg = pool.submit(renditions.render_many, data, rest)
+    for _, p in rest: _track_pending(p, bg)
     try:
-        for p in sorted(glob.glob(os.path.join(SAVE_DIR, "*")), key=lambda x: os.path.getmtime(x), reverse=True):
-            if os.path.isfile(p):
-                files.append(p)
-    except Exception:
-        pass
-    return files
+        return pv.result(timeout=RENDITION_PREVIEW_TIMEOUT_S), paths
+    except Exception as e:
+        log(f"[RENDITION] preview failed: {e}")
+        return None, paths
+
+
+def _rendition_dir(original):
+    # mirror the capture's shard under renditions/
+    return os.path.join(RENDITION_DIR, os.path.dirname(os.path.relpath(original, SAVE_DIR)))
+
+
+def _rel_url(path):
+    return "/captured_images/" + os.path.relpath(path, SAVE_DIR).replace(os.sep, "/")
+
+
+def _write_file(path, data: bytes):
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _persist_async(path, produce, cam="") -> Future:
+    """Run produce() -> bytes on the writer pool and write the result to path.
+
+    The capture response (URL + catalog row) is already out; on failure the row is
+    dropped so /api/captures doesn't list a file that will never exist.
+    """
+    def job():
+        try:
+            with M_CAPTURE.time(cam=cam, step="encode"):
+                data = produce()
+            if not data: raise RuntimeError("empty image")
+            with M_CAPTURE.time(cam=cam, step="save"):
+                _write_file(path, data)
+        except Exception as e:
+            log(f"[WRITER] {cam} {os.path.basename(path)} failed: {e}")
+            M_CAPTURES.inc(cam=cam, result="write_failed")
+            capture_catalog.remove([path])
+            try: os.remove(path + ".part")
+            except OSError: pass
+            raise
+        capture_catalog.mark_written(path, len(data))
+    fut = _writer.submit(job)
+    _track_pending(path, fut)
+    return fut
+
+
+def _wait_pending(path, timeout=10.0) -> bool:
+    """Block until a queued write of path has finished -> True if the file is on disk."""
+    with _pending_lock:
+        fut = _pending.get(path)
+    if fut is not None:
+        try: fut.result(timeout=timeout)
+        except Exception: return False
+    return os.path.isfile(path)
 
 
 def _safe_delete(paths):
@@ -113,6 +287,8 @@ def _safe_delete(paths):
             if os.path.exists(ap):
                 os.remove(ap)
                 deleted.append(ap)
+                for rp in _renditions_of(ap):
+                    if os.path.exists(rp): os.remove(rp)
             else:
                 failed.append({"path": p, "error": "not-found"})
         except Exception as e:
@@ -120,6 +296,16 @@ def _safe_delete(paths):
     return deleted, failed
 
 
+def _renditions_of(original):
+    return [renditions.rendition_path(_rendition_dir(original), original, n) for n in renditions.SPECS]
+
+
+retention = RetentionWorker(capture_catalog, delete=lambda paths: _safe_delete(paths)[0],
+                            max_bytes=int(RETENTION_MAX_GB * 1024 ** 3), max_age_s=RETENTION_MAX_DAYS * 86400,
+                            interval=RETENTION_INTERVAL_S, log=lambda m: log(m),
+                            sidecars=_renditions_of, sidecar_root=RENDITION_DIR)
+
+
 def log(msg: str): print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
 
 
@@ -150,9 +336,22 @@ def root():
     return jsonify({"ok":True,"service":"CameraServer","time":datetime.now().isoformat()}),200
 
 
-def _enc(frame):
-    ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
-    return buf.tobytes() if ok else None
+def _timed(cam, stage, fn, *a):
+    with M_STAGE.time(cam=cam, stage=stage):
+        return fn(*a)
+
+
+def _enc(frame, quality=None):
+    return jpeg_encoder.encode(frame, JPEG_QUALITY if quality is None else quality)
+
+
+def _live_enc(frame):
+    """Native preview JPEG at the adaptive operating point (stills use _enc / _encode_still)."""
+    s = adapt.scale
+    if s < 1.0:
+        frame = cv2.resize(frame, (max(2, int(frame.shape[1] * s)), max(2, int(frame.shape[0] * s))),
+                           interpolation=cv2.INTER_AREA)
+    return _enc(frame, adapt.q)
 
 
 def _black_jpeg(width=640, height=480):
@@ -168,23 +367,58 @@ def _black_frame_jpeg(width=640, height=480):
     return _black_jpeg(width, height)
 
 
-def _set_latest(b: bytes):
-    global latest_jpeg, latest_ver
-    with buf_lock:
-        latest_jpeg = b; latest_ver += 1
-    try: frame_event.set()
-    except Exception: pass
+def _parse_variant(args):
+    """?w=&q= → (w, q) key, or None for the native stream.
 
+    Width is snapped to 16px and quality to 5 steps so clients cannot create
+    an unbounded number of distinct encodes; past VARIANT_MAX the subscription
+    maps to the nearest variant already being rendered (_subscribe).
+    """
+    w_s, q_s = args.get("w"), args.get("q")
+    if not w_s and not q_s: return None
+    try: w = max(VARIANT_MIN_W, int(w_s) // 16 * 16) if w_s else 0
+    except Exception: w = 0
+    try: q = max(20, min(95, int(round(int(q_s) / 5.0)) * 5)) if q_s else JPEG_QUALITY
+    except Exception: q = JPEG_QUALITY
+    if not w and q == JPEG_QUALITY: return None
+    return (w, q)
+
+
+def _nearest_variant(key, have):
+    # ladder full → nearest existing variant, never the (most expensive) native stream
+    w, q = key
+    far = 1 << 16   # w=0 (native width) sorts as widest
+    return min(have, key=lambda k: (abs((k[0] or far) - (w or far)), abs(k[1] - q)))
+
+
+def _subscribe(bus, variant):
+    # cap check + registration happen under the bus lock
+    return bus.subscribe(variant, limit=VARIANT_MAX, nearest=_nearest_variant)
+
+
+_dec_last = (None, None)   # (jpeg bytes, pixels): every variant of one JPEG-only frame shares a decode
+
+
+def _decode_jpeg(jpeg):
+    global _dec_last
+    last = _dec_last
+    if last[0] is jpeg: return last[1]
+    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    _dec_last = (jpeg, frame)
+    return frame
 
-def _clear_latest():
-    global latest_jpeg, latest_ver
-    with buf_lock:
-        latest_jpeg = None
-        latest_ver += 1
-    try:
-        frame_event.set()
-    except Exception:
-        pass
+
+def _render_variant(key, jpeg, raw):
+    w, q = key
+    frame = raw
+    if frame is None:
+        # gphoto preview / UVC passthrough → decode the published JPEG (once per frame)
+        frame = _decode_jpeg(jpeg)
+        if frame is None: return None
+    if w and frame.shape[1] > w:
+        h = max(2, int(round(frame.shape[0] * w / frame.shape[1])))
+        frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+    return _enc(frame, q)
 
 
 def _free_usb_claimers(port_hint=""):
@@ -204,111 +438,151 @@ def _list_v4l2():
         try:
             if stat.S_ISCHR(os.stat(d).st_mode): out.append(d)
         except Exception: pass
+    out=v4l2_capture_nodes(out)   # UVC metadata nodes never deliver frames — don't open them
+    if synthcam.enabled(): out.insert(0,SYNTH_DEV)
     return out
 
 
-def _first_uvc_idx():
-    for d in _list_v4l2():
-        try: idx=int(d.replace("/dev/video",""))
-        except: continue
-        cap=cv2.VideoCapture(idx)
-        ok=bool(cap and cap.isOpened())
-        try: cap.release()
-        except: pass
-        if ok: return idx
-    return None
+# CAMERA_SYNTH=pattern|dir:<jpegs>|<video> adds a synthetic UVC device (see synthcam.py);
+# it takes the same worker / ring / capture path as a real webcam
+SYNTH_DEV, SYNTH_INDEX = "synth:0", -1
 
 
-def _cold_probe_uvc():
-    idx=_first_uvc_idx()
-    if idx is None: return False,"no-uvc-device",{}
-    cap=cv2.VideoCapture(idx)
-    if not cap or not cap.isOpened(): return False,"open-failed",{"index":idx}
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH,UVC_W); cap.set(cv2.CAP_PROP_FRAME_HEIGHT,UVC_H)
-    try: cap.set(cv2.CAP_PROP_FPS,UVC_FPS)
-    except: pass
-    ret,frame=cap.read()
-    actual=(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),float(cap.get(cv2.CAP_PROP_FPS) or 0.0))
-    try: cap.release()
-    except: pass
-    if not ret or frame is None: return False,"no-frame",{"index":idx,"actual":{"w":actual[0],"h":actual[1],"fps":actual[2]}}
-    b=_enc(frame);
-    if b: _set_latest(b)
-    return True,"ok",{"index":idx,"actual":{"w":actual[0],"h":actual[1],"fps":actual[2]}}
+def _uvc_index(dev) -> Optional[int]:
+    if dev == SYNTH_DEV: return SYNTH_INDEX
+    try: return int(dev.replace("/dev/video",""))
+    except ValueError: return None
+
+
+def _uvc_dev(idx) -> str:
+    return SYNTH_DEV if idx == SYNTH_INDEX else f"/dev/video{idx}"
+
+
+def _open_uvc(idx):
+    return synthcam.SyntheticCapture() if idx == SYNTH_INDEX else cv2.VideoCapture(idx)
+
+
+def _cold_probe_uvc(prefer=None):
+    # one open per candidate (cached node first); the first node that yields a frame wins
+    cands=[i for i in map(_uvc_index, device_registry.uvc) if i is not None]
+    if prefer is None and synthcam.enabled(): prefer=SYNTH_INDEX
+    if prefer in cands: cands.remove(prefer); cands.insert(0,prefer)
+    if not cands: return False,"no-uvc-device",{}
+    why,det="open-failed",{"index":cands[0]}
+    for idx in cands:
+        live=engines.get(_cam_id(ENGINE_UVC,idx))
+        if live is not None and live.alive:
+            return True,"ok",dict(live.caps)   # its engine already streams it — never open a node twice
+        cap=_open_uvc(idx)
+        if not cap or not cap.isOpened(): continue
+        _uvc_fourcc(cap)   # probe the mode live will run in (YUYV often can't do 720p60)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH,UVC_W); cap.set(cv2.CAP_PROP_FRAME_HEIGHT,UVC_H)
+        try: cap.set(cv2.CAP_PROP_FPS,UVC_FPS)
+        except: pass
+        ret,frame=cap.read()
+        actual=(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),float(cap.get(cv2.CAP_PROP_FPS) or 0.0))
+        try: cap.release()
+        except: pass
+        det={"index":idx,"actual":{"w":actual[0],"h":actual[1],"fps":actual[2]}}
+        if ret and frame is not None:
+            b=_enc(frame)
+            eng=_engine(_cam_id(ENGINE_UVC,idx))
+            if b and eng: eng.bus.publish(b)
+            return True,"ok",det
+        why="no-frame"
+    return False,why,det
 
 
 def _open_uvc_from_caps(caps):
     idx=caps.get("index");
     if idx is None: return None
-    cap=cv2.VideoCapture(idx)
+    cap=_open_uvc(idx)
     if not cap or not cap.isOpened(): return None
-    if "actual" in caps:
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH,caps["actual"]["w"])
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT,caps["actual"]["h"])
-        try: cap.set(cv2.CAP_PROP_FPS,caps["actual"]["fps"])
-        except: pass
+    act=caps.get("actual") or {"w":UVC_W,"h":UVC_H,"fps":UVC_FPS}   # not probed → ask for the default mode
+    _uvc_fourcc(cap)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH,act["w"])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT,act["h"])
+    try: cap.set(cv2.CAP_PROP_FPS,act["fps"])
+    except: pass
+    # shallow driver queue: a slow reader (standby) gets a recent frame, not one buffered seconds ago
+    try: cap.set(cv2.CAP_PROP_BUFFERSIZE,1)
+    except: pass
     return cap
 
 
-def uvc_worker():
-    global uvc_running
-    log("[UVC] live started")
-    caps=last_probe.get("details",{})
-    cap=_open_uvc_from_caps(caps)
-    if not cap:
-        log("[UVC] live open failed from last caps"); uvc_running=False; return
-    interval=1.0/max(1.0,float(UVC_FPS)); nxt=time.time()
-    while uvc_running:
-        if pause_live: time.sleep(0.02); continue
-        ret,frame=cap.read()
-        if not ret or frame is None:
-            time.sleep(0.02); continue
-        b=_enc(frame);
-        if b: _set_latest(b)
-        nxt+=interval; d=nxt-time.time()
-        if d>0: time.sleep(d)
-        else: nxt=time.time()
-    try: cap.release()
-    except: pass
-    log("[UVC] live stopped")
-
+def _uvc_flush(cap, fps, max_frames=UVC_FLUSH_FRAMES):
+    # drop frames the driver queued while we read slowly: a grab that returns at once was
+    # buffered, one that blocks for ~a frame interval means the queue is empty
+    quick=0.5/max(1.0,fps)
+    grab=getattr(cap,"grab",None) or (lambda: cap.read()[0])
+    for _ in range(max_frames):
+        t=time.perf_counter()
+        if not grab() or time.perf_counter()-t >= quick: break
 
-def start_uvc_live():
-    global uvc_thread, uvc_running
-    if uvc_thread and uvc_thread.is_alive(): return
-    starting_live.set()
-    uvc_running=True
-    uvc_thread=threading.Thread(target=uvc_worker,daemon=True); uvc_thread.start()
-    threading.Timer(1.0, starting_live.clear).start()
 
+def _uvc_fourcc(cap):
+    # V4L2 picks the pixel format before the frame size → must come first
+    if UVC_PASSTHROUGH:
+        try: cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        except Exception: pass
 
-def stop_uvc_live():
-    global uvc_thread, uvc_running
-    if uvc_thread and uvc_thread.is_alive():
-        uvc_running=False
-        try: uvc_thread.join(timeout=2)
-        except: pass
-    uvc_thread=None
 
+def _is_jpeg_buf(frame) -> bool:
+    # CONVERT_RGB=0 + MJPG: cap.read() hands back the compressed buffer as a 1×N uint8 row
+    if frame is None or frame.ndim > 2 or frame.size < 4: return False
+    head = frame.reshape(-1)[:2]
+    return head[0] == 0xFF and head[1] == 0xD8
 
-def _start_live_for_current_engine():
-    global current_engine
-    if current_engine is None:
-        try:
-            _perform_cold_probe_and_record()
-        except Exception:
-            pass
 
-    eng = current_engine or ENGINE_UVC
+def _uvc_passthrough(cap) -> bool:
+    """Switch OpenCV's MJPEG decode off; True if the backend now yields the camera's JPEG bytes."""
+    if not UVC_PASSTHROUGH: return False
     try:
-        if eng == ENGINE_GPHOTO:
-            stop_uvc_live()
-            start_gphoto_live()
-        else:
-            stop_gphoto_live()
-            start_uvc_live()
+        if not cap.set(cv2.CAP_PROP_CONVERT_RGB, 0): return False
+        ret, frame = cap.read()
+        if ret and frame is not None and _is_jpeg_buf(frame): return True
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
     except Exception:
         pass
+    return False
+
+
+def _uvc_pixels(frame):
+    return cv2.imdecode(frame.reshape(-1), cv2.IMREAD_COLOR) if frame is not None and _is_jpeg_buf(frame) else frame
+
+
+def _uvc_still(buf, ts):
+    """(BGR frame, ts, the camera's JPEG bytes or None) for a picked / max-res frame, or None."""
+    frame = _uvc_pixels(buf)
+    if frame is None: return None
+    return frame, ts, (buf.tobytes() if frame is not buf else None)
+
+
+def _uvc_grab_still(cap, fut: Future, w, h):
+    """One frame at the device's largest mode, then back to the live mode."""
+    try:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH,10000); cap.set(cv2.CAP_PROP_FRAME_HEIGHT,10000)  # driver clamps to max
+        frame=None
+        for _ in range(STILL_SETTLE_FRAMES+1):
+            ret,f=cap.read()
+            if ret and f is not None: frame=f
+        fut.set_result(None if frame is None else _uvc_still(frame,time.time()))
+    except Exception as e:
+        fut.set_exception(e)
+    finally:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH,w); cap.set(cv2.CAP_PROP_FRAME_HEIGHT,h)
+        try: cap.set(cv2.CAP_PROP_FPS,UVC_FPS)
+        except: pass
+
+
+def _encode_still(frame, jpeg: Optional[bytes] = None) -> Optional[bytes]:
+    # jpeg = the camera's own bytes (MJPEG passthrough): a jpg still keeps them as-is
+    if STILL_FORMAT != "png" and jpeg is not None: return jpeg
+    if STILL_FORMAT == "png":
+        ok, buf = cv2.imencode(".png", frame, [int(cv2.IMWRITE_PNG_COMPRESSION), STILL_PNG_COMPRESSION])
+        return buf.tobytes() if ok else None
+    return _enc(frame, STILL_QUALITY)
+
 
 # ---------- gphoto ----------
 try:
@@ -324,6 +598,10 @@ def _gphoto_list():
         log(f"[GPHOTO] autodetect failed: {e}"); return []
 
 
+# one cached view of attached cameras; refreshed by the watcher, read by every route
+device_registry = DeviceRegistry(scan_uvc=_list_v4l2, scan_gphoto=_gphoto_list, ttl=DEVICE_TTL_S, log=lambda m: log(m))
+
+
 def _gphoto_set_port(cam, port):
     pil=gp.PortInfoList(); pil.load()
     idx=pil.lookup_path(port)
@@ -332,9 +610,11 @@ def _gphoto_set_port(cam, port):
 
 
 def _cold_probe_gphoto():
-    cams=_gphoto_list()
+    cams=device_registry.gphoto
     if not cams: return False,"No DSLR detected",{}
     port=gphoto_selected_port if gphoto_selected_port and any(p==gphoto_selected_port for _,p in cams) else cams[0][1]
+    live=engines.get(_cam_id(ENGINE_GPHOTO,port))
+    if live is not None and live.alive: return True,"ok",{"port":port}   # owned by a running engine
     cam=gp.Camera()
     try:
         _free_usb_claimers(port)
@@ -349,8 +629,9 @@ def _cold_probe_gphoto():
             return False,f"no-preview:{e}",{"port":port}
         try: cam.exit()
         except: pass
-        if b and b[:2]==b'\xff\xd8': _set_latest(b)
-        else: return False,"not-jpeg",{"port":port}
+        if not (b and b[:2]==b'\xff\xd8'): return False,"not-jpeg",{"port":port}
+        eng=_engine(_cam_id(ENGINE_GPHOTO,port))
+        if eng: eng.bus.publish(b)
         return True,"ok",{"port":port}
     except gp.GPhoto2Error as e:
         try: cam.exit()
@@ -359,7 +640,9 @@ def _cold_probe_gphoto():
 
 
 def _detect_engine() -> str:
-    return ENGINE_GPHOTO if (gp and _gphoto_list()) else ENGINE_UVC
+    # O(1): reads the registry the watcher keeps current — never autodetects on a request
+    if synthcam.enabled(): return ENGINE_UVC   # benchmarking: the synthetic source is the booth camera
+    return ENGINE_GPHOTO if (gp and device_registry.has_gphoto()) else ENGINE_UVC
 
 
 def _gphoto_set_liveview(cam, enabled: bool):
@@ -383,109 +666,487 @@ def _gphoto_set_liveview(cam, enabled: bool):
     return False
 
 
-def gphoto_worker():
-    global gphoto_running, gphoto_cam, gphoto_last_error
-    log("[GPHOTO] live started")
-    cams=_gphoto_list()
-    if not cams:
-        gphoto_last_error="no dslr"; gphoto_running=False; return
-    port=gphoto_selected_port if gphoto_selected_port and any(p==gphoto_selected_port for _,p in cams) else cams[0][1]
-    try:
-        cam=gp.Camera()
-        _free_usb_claimers(port)
-        _gphoto_set_port(cam,port); time.sleep(0.2); cam.init()
-        try:
-            _gphoto_set_liveview(cam, True)
-        except Exception: pass
-        with gphoto_cam_lock:
-            gphoto_cam=cam
-        frame_interval=1.0/max(1.0,float(GPHOTO_FPS)); nxt=time.monotonic()+frame_interval
-        while gphoto_running:
+# ---------- Engines (one per camera device) ----------
+
+class CameraEngine:
+    """One camera device: its own preview bus, live thread, device lock and capture lock.
+
+    Engines for different devices run side by side (e.g. DSLR for stills + webcam
+    overview); the same device always maps to the same engine, so two routes never
+    open it twice.
+    """
+    kind = None
+
+    def __init__(self, cam_id: str):
+        self.id = cam_id
+        # UVC publishes raw pixels; the JPEG is encoded only when someone asks for it
+        self.bus = FrameBroadcaster(render=lambda key, jpeg, raw: _timed(cam_id, "render", _render_variant, key, jpeg, raw),
+                                    encode=lambda raw: _timed(cam_id, "encode", _live_enc, raw))
+        self.lock = threading.RLock()           # device ownership: live loop vs capture
+        self.capture_lock = threading.Lock()    # capture anti-double
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.state = "new"                      # new | active | standby | idle | paused | released | stopped
+        self._start_ver = 0                     # bus version when the live thread was last (re)started
+        self.wake = threading.Event()           # demand / resume / stop → cuts a standby sleep or idle park short
+        self.demand_at = 0.0                    # monotonic time frames were last wanted
+        self._life = threading.Lock()           # start() vs the loop deciding to release the device
+        self.last_error: Optional[str] = None
+        self.viewers = 0                        # /cams/<id>/video_feed viewers
+        self.h264 = {}                          # fmt -> h264live.H264Stream, created on first subscriber
+        self._h264_dec = (-1, None)             # (bus version, decoded frame) for JPEG-only sources
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+    def start(self):
+        """Start the live thread, or just mark demand + wake it if it is already running."""
+        with self._life:
+            self.demand_at = time.monotonic()
+            self.wake.set()
+            if self.alive and self.running: return
+            # released by idle (or stopped) but still closing the device → let it finish first
+            if self.alive:
+                try: self.thread.join(timeout=2)
+                except: pass
+            starting_live.set()
+            self.running, self.state, self._start_ver = True, "active", self.bus.version
+            self.thread = threading.Thread(target=self._run, daemon=True, name=f"live-{self.id}")
+            self.thread.start()
+        threading.Timer(1.0, starting_live.clear).start()
+
+    def stop(self):
+        for st in list(self.h264.values()): st.stop()
+        if self.alive:
+            self.running = False
+            self.wake.set()
+            try: self.thread.join(timeout=2)
+            except: pass
+        self.thread = None
+        self.state = "stopped"
+
+    def demand(self, wait: float = 0.0) -> bool:
+        """Frames wanted now (capture / snapshot): wake a standby or idle loop, open a new or released device.
+
+        An engine stopped via /stop stays stopped. wait > 0 blocks until a newer frame
+        is published, unless the loop was already at full rate and has published since
+        it started, or live is paused (no frame can come). -> False if none came.
+        """
+        if self.state == "stopped": return False
+        ver = self.bus.version
+        # "active" alone is set by start() before the first read; the bus may still hold a boot-probe frame
+        fresh = self.alive and self.state == "active" and ver > self._start_ver
+        self.start()
+        if pause_live: return False
+        return fresh or wait <= 0 or self.bus.wait_newer(ver, timeout=wait) > ver
+
+    def wanted(self) -> bool:
+        return self.bus.subscribers > 0 or self.capture_lock.locked() or \
+            any(st.running for st in list(self.h264.values()))
+
+    def _pace(self, fps: float) -> Optional[float]:
+        """Live-loop gate -> seconds until the next frame, or None to leave the loop (stop / idle release).
+
+        Blocks on self.wake (no polling) while paused or idle.
+        """
+        while self.running:
+            self.wake.clear()
+            now = time.monotonic()
+            if self.wanted(): self.demand_at = now
             if pause_live:
+                self.state = "paused"; self.wake.wait(); continue
+            at = self.demand_at
+            quiet = now - at
+            if quiet < DEMAND_HOLD_S:
+                self.state = "active"; return 1.0 / max(1.0, fps)
+            if STANDBY_GRACE_S < 0 or quiet < STANDBY_GRACE_S:
+                self.state = "standby"; return 1.0 / max(0.1, min(STANDBY_FPS, fps))
+            with self._life:
+                if self.demand_at != at: continue   # start() raced us
+                if IDLE_MODE == "release":
+                    log(f"[ENGINE] {self.id} idle {quiet:.0f}s → releasing device")
+                    self.running, self.state = False, "released"
+                    return None
+                self.state = "idle"
+            log(f"[ENGINE] {self.id} idle {quiet:.0f}s → sleeping")
+            self._idle(True)
+            self.wake.wait()
+            self._idle(False)
+        return None
+
+    def _idle(self, on: bool): pass
+
+    def _exited(self):
+        # live thread ending (idle release, failure or /stop): nothing may still report it live;
+        # "released" lets the next demand() reopen the device, stop() sets "stopped" after the join
+        self.running = False
+        if self.state != "stopped": self.state = "released"
+
+    def _run(self): raise NotImplementedError
+
+    def info(self) -> dict:
+        return {"id": self.id, "kind": self.kind, "running": self.alive, "state": self.state, "viewers": self.viewers,
+                "error": self.last_error, "frames": self.bus.stats(),
+                "h264": [st.info() for st in list(self.h264.values())]}
+
+
+class UvcEngine(CameraEngine):
+    kind = ENGINE_UVC
+
+    def __init__(self, cam_id: str, index: int):
+        super().__init__(cam_id)
+        self.index = index
+        self.caps = {"index": index}           # probe result when this is the primary camera
+        self.ring: Optional[FrameRing] = None  # set while live runs (zero-shutter-lag frames)
+        self.passthrough = False               # ring / bus hold the camera's own JPEGs (UVC_PASSTHROUGH)
+        self.still_q: "queue.Queue[Future]" = queue.Queue()   # one-shot max-res grabs
+
+    def _run(self):
+        log(f"[UVC] {self.id} live started")
+        cap=_open_uvc_from_caps(self.caps)
+        if not cap:
+            self.last_error="open failed"
+            log(f"[UVC] {self.id} live open failed from last caps"); self._exited(); return
+        try:
+            self._live(cap)
+        except Exception as e:
+            self.last_error=f"live: {e}"
+            log(f"[UVC] {self.id} live failed: {e}")
+        finally:
+            self.ring=None; self.passthrough=False
+            try: cap.release()
+            except: pass
+            self._exited()
+            log(f"[UVC] {self.id} live stopped")
+
+    def _live(self, cap):
+        w,h=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or UVC_W),int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or UVC_H)
+        jpeg=self.passthrough=_uvc_passthrough(cap)
+        if jpeg:
+            # compressed slots (~w*h/10 bytes): the full ZSL depth costs little
+            n=max(2,ZSL_FRAMES); ring=FrameRing(n)
+        else:
+            n=max(2,min(ZSL_FRAMES,int(ZSL_MAX_MB*1024*1024)//(w*h*3)))
+            ring=FrameRing(n,[np.empty((h,w,3),np.uint8) for _ in range(n)])
+        self.ring=ring
+        log(f"[UVC] {self.id} {'mjpeg passthrough' if jpeg else 'bgr'} ring={n} frames"
+            f"{'' if jpeg else f' ({n*w*h*3/1048576:.0f} MB)'}")
+        nxt=time.time(); next_pub=0.0; last_read=time.monotonic()
+        while True:
+            interval=self._pace(float(UVC_FPS))
+            if interval is None: break
+            # after a standby / idle / paused gap the V4L2 queue holds old frames → t_cap must not label them
+            if time.monotonic()-last_read > 3.0/max(1.0,UVC_FPS): _uvc_flush(cap, float(UVC_FPS))
+            if not self.still_q.empty():
+                _uvc_grab_still(cap, self.still_q.get_nowait(), w, h)
+            i,buf,slot_lock=ring.next()
+            with slot_lock:
+                t_r=time.perf_counter()
+                ret,frame=cap.read(buf)
+                M_STAGE.observe(time.perf_counter()-t_r, cam=self.id, stage="read")
+                t_cap=time.time(); last_read=time.monotonic()
+                if ret and frame is not None and jpeg:
+                    data=frame.tobytes()
+                    if data[:2]!=b'\xff\xd8': ret=False   # truncated / corrupt USB transfer
+                if ret and frame is not None: ring.commit(i,frame,t_cap)
+            if not ret or frame is None:
+                M_FRAMES.inc(cam=self.id, outcome="read_failed")
                 time.sleep(0.02); continue
-            now=time.monotonic()
-            if now<nxt:
-                time.sleep(min(0.008,nxt-now)); continue
-            nxt=now+frame_interval
-            try:
-                with gphoto_cam_lock:
-                    if gphoto_cam is None: break
-                    cf=gphoto_cam.capture_preview()
-                    data=gp.check_result(gp.gp_file_get_data_and_size(cf))
-                b=memoryview(data).tobytes()
-                if b and b[:2]==b'\xff\xd8': _set_latest(b)
-            except Exception as e:
-                gphoto_last_error=f"preview: {e}"
-                time.sleep(0.05)
-    except gp.GPhoto2Error as e:
-        gphoto_last_error=f"init: {e}"
-    finally:
-        with gphoto_cam_lock:
+            M_FRAMES.inc(cam=self.id, outcome="produced")
+            # adaptive fps below the sensor rate: keep reading (ZSL ring stays full-rate), publish less
+            out_fps=min(UVC_FPS, adapt.fps); now=time.monotonic(); pub=True
+            if out_fps < UVC_FPS:
+                pub=now >= next_pub
+                if pub: next_pub=max(next_pub+1.0/out_fps, now-1.0/out_fps)
+                else: M_FRAMES.inc(cam=self.id, outcome="throttled")
+            # no encode here — viewers / snapshot / capture encode on demand (passthrough: never)
+            if pub:
+                with M_STAGE.time(cam=self.id, stage="publish"):
+                    if jpeg: self.bus.publish(data, ts=t_cap)
+                    else: self.bus.publish_raw(frame, slot_lock, ts=t_cap)
+            nxt+=interval; d=nxt-time.time()
+            # a viewer arriving mid standby-sleep → back to full rate now
+            if d<=0 or self.wake.wait(d): nxt=time.time()
+
+    def grab_still(self, timeout=3.0):
+        if not self.alive: return None
+        fut=Future(); self.still_q.put(fut)
+        try: return fut.result(timeout=timeout)
+        except Exception as e:
+            log(f"[UVC] {self.id} max-res still failed: {e}"); return None
+
+    def zsl_pick(self, target: Optional[float], slack: float = 0.0):
+        """(BGR frame copy, frame_ts, camera JPEG or None) from the ring closest to target (None = newest), or None.
+
+        slack = uncertainty of target (s); the wait for a frame at / after it grows by that much.
+        """
+        ring = self.ring
+        if ring is None: return None
+        if target is not None:
+            # countdown zero may be a hair ahead of the newest frame — wait briefly for it
+            deadline = time.monotonic() + ZSL_WAIT_S + slack
+            ver = self.bus.version
+            while (ring.newest_ts() or 0.0) < target and time.monotonic() < deadline:
+                ver = self.bus.wait_newer(ver, timeout=max(0.0, deadline - time.monotonic()))
+        picked = ring.copy_closest(time.time() if target is None else target)
+        if picked is None: return None
+        # passthrough slots are JPEG → only the frame a capture picked is decoded
+        return _uvc_still(*picked)
+
+    def info(self) -> dict:
+        return dict(super().info(), device=_uvc_dev(self.index), passthrough=self.passthrough)
+
+
+class GphotoEngine(CameraEngine):
+    kind = ENGINE_GPHOTO
+
+    def __init__(self, cam_id: str, port: str, model: Optional[str] = None):
+        super().__init__(cam_id)
+        self.port, self.model = port, model
+        self.cam = None                 # live thread owns the camera; capture borrows it under self.lock
+        self.prearmed_until_ms = 0      # /api/prepare_shot window — skip the LV toggle-off on capture
+
+    def _run(self):
+        log(f"[GPHOTO] {self.id} live started")
+        if not device_registry.has_gphoto(self.port):
+            self.last_error="no dslr"; self._exited(); return
+        try:
+            cam=gp.Camera()
+            _free_usb_claimers(self.port)
+            _gphoto_set_port(cam,self.port); time.sleep(0.2); cam.init()
             try:
-                if gphoto_cam: gphoto_cam.exit()
+                _gphoto_set_liveview(cam, True)
+            except Exception: pass
+            with self.lock:
+                self.cam=cam
+            nxt=time.monotonic()
+            while True:
+                iv=self._pace(min(float(GPHOTO_FPS),adapt.fps))
+                if iv is None: break
+                d=nxt-time.monotonic()
+                if d>0 and self.wake.wait(d):
+                    nxt=0.0; continue   # woken (viewer / pause / stop) → re-gate
+                nxt=time.monotonic()+iv
+                try:
+                    with self.lock:
+                        if self.cam is None: break
+                        with M_STAGE.time(cam=self.id, stage="read"):
+                            cf=self.cam.capture_preview()
+                            data=gp.check_result(gp.gp_file_get_data_and_size(cf))
+                    t_cap=time.time()
+                    b=memoryview(data).tobytes()
+                    if b and b[:2]==b'\xff\xd8':
+                        M_FRAMES.inc(cam=self.id, outcome="produced")
+                        with M_STAGE.time(cam=self.id, stage="publish"):
+                            self.bus.publish(b, ts=t_cap)
+                    else:
+                        M_FRAMES.inc(cam=self.id, outcome="read_failed")
+                except Exception as e:
+                    M_FRAMES.inc(cam=self.id, outcome="read_failed")
+                    self.last_error=f"preview: {e}"
+                    time.sleep(0.05)
+        except gp.GPhoto2Error as e:
+            self.last_error=f"init: {e}"
+        finally:
+            with self.lock:
+                try:
+                    if self.cam: self.cam.exit()
+                except Exception: pass
+                self.cam=None
+            log(f"[GPHOTO] {self.id} live stopped")
+            self._exited()
+
+    def start(self):
+        if gp: super().start()
+
+    def _idle(self, on: bool):
+        # IDLE_MODE=sleep: mirror down / sensor off while nobody watches, session kept for a fast resume
+        with self.lock:
+            if self.cam is None: return
+            try: _gphoto_set_liveview(self.cam, not on)
             except Exception: pass
-            gphoto_cam=None
-        log("[GPHOTO] live stopped")
-        gphoto_running=False
-
-
-def start_gphoto_live():
-    global gphoto_thread, gphoto_running
-    if not gp: return
-    if gphoto_thread and gphoto_thread.is_alive(): return
-    starting_live.set()
-    gphoto_running=True
-    gphoto_thread=threading.Thread(target=gphoto_worker,daemon=True); gphoto_thread.start()
-    threading.Timer(1.0, starting_live.clear).start()
-
-
-def stop_gphoto_live():
-    global gphoto_thread, gphoto_running
-    if gphoto_thread and gphoto_thread.is_alive():
-        gphoto_running=False
-        try: gphoto_thread.join(timeout=2)
-        except: pass
-    gphoto_thread=None
 
-# ---------- Watcher ----------
+    def info(self) -> dict:
+        return dict(super().info(), port=self.port, model=self.model)
+
 
-def _snapshot_uvc(): return set(_list_v4l2())
+def _cam_id(kind, key) -> str:
+    """URL-safe device id: video<N> for UVC nodes, synth, gp-<port> for gphoto (e.g. gp-usb-001-004)."""
+    if kind == ENGINE_UVC: return "synth" if key == SYNTH_INDEX else f"video{key}"
+    return "gp-" + re.sub(r"[^0-9A-Za-z]+", "-", str(key)).strip("-").lower()
 
-def _snapshot_gphoto():
-    cams=_gphoto_list() if gp else []
-    return set([p for _,p in cams])
+
+def _attached():
+    """-> [(cam id, kind, key, model)] for every device in the registry (O(1), no scan)."""
+    out = []
+    for d in device_registry.uvc:
+        idx = _uvc_index(d)
+        if idx is None: continue
+        out.append((_cam_id(ENGINE_UVC, idx), ENGINE_UVC, idx, None))
+    for m, p in (device_registry.gphoto if gp else []):
+        out.append((_cam_id(ENGINE_GPHOTO, p), ENGINE_GPHOTO, p, m))
+    return out
 
 
-def _perform_cold_probe_and_record():
+def _engine(cam_id: Optional[str]) -> Optional[CameraEngine]:
+    """The engine for an attached device, created on first use; None if not attached."""
+    if not cam_id: return None
+    with engines_lock:
+        eng = engines.get(cam_id)
+        if eng is not None: return eng
+        for cid, kind, key, model in _attached():
+            if cid != cam_id: continue
+            eng = UvcEngine(cid, key) if kind == ENGINE_UVC else GphotoEngine(cid, key, model)
+            engines[cid] = eng
+            return eng
+    return None
+
+
+def _prune_engines():
+    """Stop + forget engines whose device is gone (after a hotplug change)."""
+    present = {cid for cid, _k, _key, _m in _attached()}
+    with engines_lock:
+        gone = [e for cid, e in engines.items() if cid not in present]
+        for e in gone: engines.pop(e.id, None)
+    for e in gone:
+        log(f"[ENGINE] {e.id} detached"); e.stop(); e.bus.close()
+
+
+def _primary() -> Optional[CameraEngine]:
+    """Engine behind the single-camera routes — follows the probe (current_engine / last_probe)."""
+    if current_engine == ENGINE_GPHOTO and gp:
+        cams = device_registry.gphoto
+        port = gphoto_selected_port if gphoto_selected_port and any(p == gphoto_selected_port for _, p in cams) \
+            else (cams[0][1] if cams else None)
+        return _engine(_cam_id(ENGINE_GPHOTO, port)) if port else None
+    det = last_probe.get("details") or {}
+    if current_engine != ENGINE_UVC or det.get("index") is None: return None
+    eng = _engine(_cam_id(ENGINE_UVC, det["index"]))
+    if eng is not None and det.get("actual"): eng.caps = dict(det)
+    return eng
+
+
+def _stop_all_engines():
+    with engines_lock:
+        es = list(engines.values())
+    for e in es: e.stop()
+
+
+def _start_live_for_current_engine():
+    global primary_id
+    if current_engine is None:
+        try:
+            _perform_cold_probe_and_record()
+        except Exception:
+            pass
+    eng = _primary()
+    if eng is None: return None
+    try:
+        prev = engines.get(primary_id) if primary_id != eng.id else None
+        # the old primary keeps running only if someone watches it directly via /cams/<id>
+        if prev is not None and prev.viewers == 0: prev.stop()
+        primary_id = eng.id
+        eng.start()
+    except Exception:
+        pass
+    return eng
+
+
+_viewer_seq = itertools.count(1)   # viewer label for per-viewer metrics
+live_viewers = {}                  # vid -> MjpegViewer, for /api/viewers
+
+# idle bus for single-camera viewers while no device is attached (nothing publishes here)
+_no_camera_bus = FrameBroadcaster()
+
+
+def _bus_of(eng: Optional[CameraEngine]) -> FrameBroadcaster:
+    return eng.bus if eng is not None else _no_camera_bus
+
+# ---------- Watcher ----------
+
+def _probe_identity(eng, det):
+    if eng==ENGINE_GPHOTO:
+        return {"model": next((m for m,p in device_registry.gphoto if p==det.get("port")), None)}
+    return v4l2_identity(f"/dev/video{det.get('index')}")
+
+
+def _perform_cold_probe_and_record(rescan=True, prefer=None):
     global last_probe, current_engine
+    if rescan: device_registry.refresh()
     eng=_detect_engine()
     if eng==ENGINE_GPHOTO and gp:
         ok,why,det=_cold_probe_gphoto()
     else:
-        ok,why,det=_cold_probe_uvc()
+        ok,why,det=_cold_probe_uvc(prefer)
     last_probe={"engine":eng,"ok":ok,"why":why,"details":det,"time":datetime.now().isoformat()}
     current_engine=eng
+    if ok and det.get("index")!=SYNTH_INDEX: probe_cache.save({"engine":eng,"ok":True,"details":det,"identity":_probe_identity(eng,det),"preview_ok":True})
     log(f"[PROBE] {eng} ok={ok} why={why}")
 
 
+def _probe_from_cache() -> bool:
+    """Boot fast path: match the cached probe against sysfs / the registry — no open, no cam.init()."""
+    global last_probe, current_engine
+    if synthcam.enabled(): return False   # synthetic source probes instantly
+    eng=_detect_engine()
+    if eng==ENGINE_GPHOTO and gp: hit=probe_cache.match_gphoto(device_registry.gphoto)
+    else: hit=probe_cache.match_uvc(device_registry.uvc)
+    if not hit or not hit.get("preview_ok"): return False
+    last_probe={"engine":eng,"ok":True,"why":"cached","details":hit.get("details") or {},
+                "time":datetime.now().isoformat(),"cached":True}
+    current_engine=eng
+    log(f"[PROBE] {eng} from cache details={last_probe['details']}")
+    return True
+
+
+def _verify_cached_probe():
+    # the live worker opening the device and delivering a frame *is* the check —
+    # a second probe open here would only fight it for the device
+    global last_probe
+    eng=_primary()
+    if eng is not None and eng.bus.wait_for_data(timeout=PROBE_VERIFY_S):
+        last_probe=dict(last_probe, why="cache-verified")
+        log("[PROBE] cache verified by first live frame")
+        return
+    log("[PROBE] cached caps gave no frame — full probe")
+    prefer=(last_probe.get("details") or {}).get("index")
+    if eng is not None: eng.stop()
+    _perform_cold_probe_and_record(rescan=False, prefer=prefer)
+    if last_probe.get("ok"): _start_live_for_current_engine()
+
+
+def _boot_probe():
+    device_registry.refresh()
+    if not _probe_from_cache():
+        _perform_cold_probe_and_record(rescan=False); return
+    _start_live_for_current_engine()
+    threading.Thread(target=_verify_cached_probe, daemon=True, name="probe-verify").start()
+
+
 def watcher_loop():
-    global watcher_running,_last_seen_uvc,_last_seen_gphoto_ports
-    log("[WATCHER] started")
-    _last_seen_uvc=_snapshot_uvc(); _last_seen_gphoto_ports=_snapshot_gphoto()
-    _perform_cold_probe_and_record()
+    global watcher_running,hotplug
+    hotplug=HotplugMonitor(log=log, prefer=HOTPLUG_BACKEND)
+    log(f"[WATCHER] started hotplug={hotplug.start()}")
+    _boot_probe()
     while watcher_running:
+        # event-driven: sleep until a usb/video4linux add/remove (or the periodic resync);
+        # no autodetect / /dev glob competes with capture_preview in between
+        if hotplug.active: hotplug.wait(HOTPLUG_RESYNC_S)
+        else: time.sleep(WATCH_INTERVAL)
+        while starting_live.is_set() and watcher_running: time.sleep(0.25)
+        if not watcher_running: break
         try:
-            if starting_live.is_set(): time.sleep(0.25); continue
-            a=_snapshot_uvc(); b=_snapshot_gphoto()
-            if a!=_last_seen_uvc or b!=_last_seen_gphoto_ports:
-                _last_seen_uvc=a; _last_seen_gphoto_ports=b
-                _perform_cold_probe_and_record()
-                if viewers>0 and not pause_live:
-                    if current_engine==ENGINE_GPHOTO: stop_uvc_live(); start_gphoto_live()
-                    else: stop_gphoto_live(); start_uvc_live()
+            if device_registry.refresh():
+                _prune_engines()
+                prev=primary_id
+                _perform_cold_probe_and_record(rescan=False)
+                if viewers>0 and not pause_live: _start_live_for_current_engine()
+                elif prev and (_primary() is None or _primary().id!=prev) and prev in engines and engines[prev].viewers==0:
+                    engines[prev].stop()
         except Exception as e:
             log(f"[WATCHER] error: {e}")
-        time.sleep(WATCH_INTERVAL)
+    hotplug.stop()
     log("[WATCHER] stopped")
 
 
@@ -500,6 +1161,7 @@ def stop_watcher():
     global watcher_thread, watcher_running
     if watcher_thread and watcher_thread.is_alive():
         watcher_running=False
+        if hotplug: hotplug.stop()   # wakes the event wait
         try: watcher_thread.join(timeout=2)
         except: pass
     watcher_thread=None
@@ -510,22 +1172,50 @@ def api_health():
     return jsonify({
         "ok": True,
         "paused": bool(pause_live),
-        "running": bool((uvc_thread and uvc_thread.is_alive()) or (gphoto_thread and gphoto_thread.is_alive())),
+        "running": any(e.alive for e in list(engines.values())),
         "engine": current_engine,
+        "primary": primary_id,
         "last_probe": last_probe,
-        "uvc_devices": list(_list_v4l2()),
+        "uvc_devices": device_registry.uvc,
         "dslr_supported": bool(gp is not None),
-        "dslr_error": gphoto_last_error,
+        "dslr_error": next((e.last_error for e in list(engines.values()) if e.kind == ENGINE_GPHOTO and e.last_error), None),
         "viewers": viewers,
+        "variants": [{"w": v["key"][0], "q": v["key"][1], "viewers": v["viewers"]} for v in _bus_of(_primary()).variants()],
+        "frames": _bus_of(_primary()).stats(),
+        "cams": [e.info() for e in list(engines.values())],
+        "encoder": jpeg_encoder.info(),
+        "adaptive": adapt.info(),
+        "retention": {"enabled": retention.enabled, "last_run": retention.last_run},
+        "hotplug": {"backend": hotplug.backend if hotplug else None, "events": hotplug.events if hotplug else 0},
+        "devices": device_registry.info(),
         "time": datetime.now().isoformat(),
     }), 200
 
 
+@app.route("/api/time")
+def api_time():
+    """Server clock for the client's offset handshake (shutter_ts on /capture)."""
+    return _nocache(jsonify({"ok": True, "server_ms": time.time() * 1000.0})), 200
+
+
+@app.route("/api/metrics")
+def api_metrics():
+    """Prometheus text: stage / capture-step histograms, frame + delivery counters."""
+    return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route("/api/viewers")
+def api_viewers():
+    """Per-viewer delivery: delivered / skipped frames, ?fps= cap, socket write time (slow clients)."""
+    vs = [v.info() for v in list(live_viewers.values())]
+    return jsonify({"ok": True, "viewers": sorted(vs, key=lambda d: int(d["id"]))}), 200
+
+
 @app.route("/api/devices")
 def api_devices():
-    cams=_gphoto_list() if gp else []
+    cams=device_registry.gphoto if gp else []
     return jsonify({
-        "uvc_devices": list(_list_v4l2()),
+        "uvc_devices": device_registry.uvc,
         "gphoto_detected":[{"model":m,"port":p} for (m,p) in cams],
         "selected_port": gphoto_selected_port,
         "engine_now": current_engine,
@@ -534,39 +1224,44 @@ def api_devices():
     }),200
 
 # ---------- API: control ----------
+
+def _set_pause(on: bool):
+    global pause_live
+    pause_live=on
+    for e in list(engines.values()): e.wake.set()
+
+
 @app.route("/pause", methods=["POST"])
 def pause():
-    global pause_live
-    pause_live=True
+    _set_pause(True)
     return jsonify({"ok":True,"paused":True}),200
 
 
 @app.route("/resume", methods=["POST"])
 def resume():
-    global pause_live
-    pause_live=False
+    _set_pause(False)
     return jsonify({"ok":True,"resumed":True}),200
 
 
 @app.route("/stop_stream", methods=["POST"])
 @app.route("/stop", methods=["POST"])
 def stop_stream():
-    global pause_live
-    pause_live=True
-    stop_gphoto_live(); stop_uvc_live()
+    _set_pause(True)
+    # the booth's camera stops; a device watched directly via /cams/<id> keeps streaming
+    for e in list(engines.values()):
+        if e.id == primary_id or e.viewers == 0: e.stop()
     return jsonify({"ok":True,"stopped":True,"paused":True}),200
 
 
 @app.route("/confirm", methods=["POST"])
 def confirm():
-    global pause_live
-    pause_live=False
+    _set_pause(False)
     return jsonify({"ok":True}),200
 
 # ---------- API: set camera / reset ----------
 @app.route("/cameras")
 def cameras():
-    cams=_gphoto_list() if gp else []
+    cams=device_registry.gphoto if gp else []
     return jsonify({"cameras":[{"model":m,"port":p} for (m,p) in cams],
                     "selected_port": gphoto_selected_port}),200
 
@@ -589,17 +1284,17 @@ def reset_camera():
 
 # ---------- DSLR Wake & Pre‑arm ----------
 
-def _wake_dslr_internal():
-    if not (gp and current_engine == ENGINE_GPHOTO):
+def _wake_dslr_internal(eng=None):
+    eng = eng or _primary()
+    if not (gp and isinstance(eng, GphotoEngine)):
         return False
-    cams = _gphoto_list()
-    if not cams:
+    if not device_registry.has_gphoto(eng.port):
         return False
-    with gphoto_cam_lock:
-        cam = gphoto_cam
+    with eng.lock:
+        cam = eng.cam
         if cam is None:
             # try starting live quickly
-            start_gphoto_live()
+            eng.start()
             return True
         try:
             _gphoto_set_liveview(cam, True)
@@ -607,7 +1302,7 @@ def _wake_dslr_internal():
             data = gp.check_result(gp.gp_file_get_data_and_size(cf))
             b = memoryview(data).tobytes()
             if b and b[:2] == b'\xff\xd8':
-                _set_latest(b)
+                eng.bus.publish(b)
             return True
         except Exception:
             return False
@@ -621,32 +1316,26 @@ def api_wake():
 
 @app.route("/api/prepare_shot", methods=["POST"])
 def api_prepare_shot():
-    global prearmed_until_ms
+    eng = _primary()
     now = time.time() * 1000.0
-    with prearm_lock:
-        prearmed_until_ms = now + 4000  # valid for 4s
-    if gp and current_engine == ENGINE_GPHOTO:
-        with gphoto_cam_lock:
-            if gphoto_cam is not None:
+    if not isinstance(eng, GphotoEngine):
+        return jsonify({"ok": True, "prearmed_until": 0}), 200
+    eng.prearmed_until_ms = now + 4000  # valid for 4s
+    if gp:
+        with eng.lock:
+            if eng.cam is not None:
                 try:
-                    _gphoto_set_liveview(gphoto_cam, False)  # turn off LV ahead of time
+                    _gphoto_set_liveview(eng.cam, False)  # turn off LV ahead of time
                 except Exception:
                     pass
-    return jsonify({"ok": True, "prearmed_until": prearmed_until_ms}), 200
+    return jsonify({"ok": True, "prearmed_until": eng.prearmed_until_ms}), 200
 
 
 # ---------- Helper: ensure first frame ASAP ----------
 
 def _ensure_first_frame_ready(deadline_ms=FIRST_FRAME_DEADLINE_MS):
-    t0 = time.time()
-    with buf_lock:
-        if latest_jpeg:
-            return True
-    while (time.time() - t0) * 1000 < deadline_ms:
-        with buf_lock:
-            if latest_jpeg:
-                return True
-        time.sleep(0.01)
+    if _bus_of(_primary()).wait_for_data(timeout=deadline_ms / 1000.0):
+        return True
     # if not ready, attempt to wake DSLR quickly
     _wake_dslr_internal()
     return False
@@ -655,93 +1344,208 @@ def _ensure_first_frame_ready(deadline_ms=FIRST_FRAME_DEADLINE_MS):
 def _ms():
     return time.time() * 1000.0
 
+
+def _shutter_target(t_req: float) -> Optional[float]:
+    """Wall-clock time (s) the client's countdown hit zero, if it told us.
+
+    shutter_ts = epoch ms on this server's clock — the client converts with the
+    offset it measured from /api/time round trips, so the /capture request's own
+    latency and jitter drop out. offset_ms = ms relative to the moment this request
+    arrived (negative = in the past); fallback only, it still carries the one-way
+    request latency. clock_err_ms (with shutter_ts) is read by _clock_err_s.
+    """
+    p = request.get_json(silent=True) or {}
+    try:
+        v = request.values.get("shutter_ts", p.get("shutter_ts"))
+        if v not in (None, ""): return float(v) / 1000.0
+        v = request.values.get("offset_ms", p.get("offset_ms"))
+        if v not in (None, ""): return t_req + float(v) / 1000.0
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _clock_err_s() -> float:
+    """The client's clock-offset uncertainty for shutter_ts (half its sync round trip), in s."""
+    p = request.get_json(silent=True) or {}
+    try:
+        if request.values.get("shutter_ts", p.get("shutter_ts")) in (None, ""): return 0.0
+        v = float(request.values.get("clock_err_ms", p.get("clock_err_ms")) or 0.0) / 1000.0
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, min(ZSL_CLOCK_ERR_MAX_S, v))
+
+
+def _session_of() -> Optional[str]:
+    p = request.get_json(silent=True) or {}
+    v = request.values.get("session", p.get("session"))
+    return str(v)[:64] if v else None
+
+
 # ---------- API: capture (anti double + freshest buffer) ----------
 @app.route("/capture", methods=["POST"])
 def capture():
-    global last_capture_id, last_captured_path, prearmed_until_ms
-    if not capture_lock.acquire(blocking=False):
+    return _capture(_primary())
+
+
+def _record_capture(path) -> int:
+    """Make path the last capture -> its capture_id."""
+    global last_capture_id, last_captured_path
+    with _capture_seq_lock:
+        last_capture_id += 1
+        last_captured_path = path
+        return last_capture_id
+
+
+def _capture(eng: Optional[CameraEngine]):
+    if eng is None:
+        return jsonify({"ok": False, "error": "no camera"}), 503
+    if not eng.capture_lock.acquire(blocking=False):
+        M_CAPTURES.inc(cam=eng.id, result="busy")
         return jsonify({"ok": False, "error": "busy: capture in progress"}), 429
 
     t0 = _ms()
     try:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        target, clock_err = _shutter_target(t0 / 1000.0), _clock_err_s()
+        session = _session_of()
+        # standby / released engine → full rate (capture_lock held = wanted) + a fresh frame first
+        eng.demand(wait=DEMAND_WAKE_S)
 
         # ---------- DSLR path ----------
-        if gp and _detect_engine() == ENGINE_GPHOTO:
-            with gphoto_cam_lock:
-                if gphoto_cam is None:
+        if gp and isinstance(eng, GphotoEngine):
+            with eng.lock:
+                cam = eng.cam
+                if cam is None:
                     return jsonify({"ok": False, "error": "DSLR not ready"}), 503
                 t1 = _ms()
                 try:
                     keep_lv = (os.environ.get("DSLR_CAPTURE_KEEP_LV","0").lower() in ("1","true","yes"))
                     # if pre-armed within window, we already turned LV off → skip extra toggle
-                    prearmed = (_ms() <= prearmed_until_ms)
+                    prearmed = (_ms() <= eng.prearmed_until_ms)
                     if not keep_lv and not prearmed:
-                        _gphoto_set_liveview(gphoto_cam, False)
+                        _gphoto_set_liveview(cam, False)
                     t2 = _ms()
-                    fp = gphoto_cam.capture(gp.GP_CAPTURE_IMAGE)
+                    fp = cam.capture(gp.GP_CAPTURE_IMAGE)
                     t3 = _ms()
                     folder, name = fp.folder, fp.name
-                    cf = gphoto_cam.file_get(folder, name, gp.GP_FILE_TYPE_NORMAL)
+                    cf = cam.file_get(folder, name, gp.GP_FILE_TYPE_NORMAL)
                     t4 = _ms()
                     mime = cf.get_mime_type()
                     import mimetypes
                     ext = mimetypes.guess_extension(mime) or ".jpg"
-                    out = os.path.join(SAVE_DIR, f"capture_{ts}{ext}")
-                    cf.save(out)
+                    out = capture_path(SAVE_DIR, session, ext, now=t0 / 1000.0)
+                    # keep the download in memory; disk write + fsync happen on the writer pool
+                    data = memoryview(gp.check_result(gp.gp_file_get_data_and_size(cf))).tobytes()
+                    capture_catalog.add(out, session=session, engine=ENGINE_GPHOTO, created=t0 / 1000.0)
+                    _persist_async(out, lambda: data, eng.id)
                     t5 = _ms()
-                    try: gphoto_cam.file_delete(folder, name)
+                    try: cam.file_delete(folder, name)
                     except Exception: pass
                     if not keep_lv:
-                        _gphoto_set_liveview(gphoto_cam, True)
+                        _gphoto_set_liveview(cam, True)
                     t6 = _ms()
-                    with open(out, "rb") as f:
-                        _set_latest(f.read())
-                    t7 = _ms()
-
-                    last_captured_path = out
-                    last_capture_id += 1
-                    with prearm_lock:
-                        prearmed_until_ms = 0  # consumed
-
-                    print(f"[CAPTURE DSLR] total={t7-t0:.0f}ms prearmed={prearmed} "
-                          f"toggle={(t2-t1)+(t6-t5):.0f} dl={(t5-t3):.0f} save={(t5-t4):.0f} setbuf={(t7-t6):.0f}")
-                    return jsonify({
-                        "ok": True,
-                        "serverPath": out,
-                        "url": f"/captured_images/{os.path.basename(out)}",
-                        "capture_id": last_capture_id
-                    }), 200
-
                 except gp.GPhoto2Error as e:
+                    M_CAPTURES.inc(cam=eng.id, result="error")
                     return jsonify({"ok": False, "error": f"capture failed: {e}"}), 500
+                eng.prearmed_until_ms = 0  # consumed
+
+            # camera released → the live loop resumes while the preview renders on the process pool;
+            # live buffer + response get the screen-size rendition, never the 6–10 MB original
+            preview, rend = (None, {})
+            if data[:2] == b'\xff\xd8':
+                preview, rend = _renditions_for(data, out)
+                if preview: eng.bus.publish(preview)
+            t7 = _ms()
+
+            capture_id = _record_capture(out)
+
+            for step, ms in (("lv_off", t2-t1), ("shutter", t3-t2), ("download", t4-t3), ("queue", t5-t4),
+                             ("lv_on", t6-t5), ("preview", t7-t6), ("total", t7-t0)):
+                M_CAPTURE.observe(ms / 1000.0, cam=eng.id, step=step)
+            M_CAPTURES.inc(cam=eng.id, result="ok")
+            print(f"[CAPTURE DSLR] total={t7-t0:.0f}ms prearmed={prearmed} "
+                  f"toggle={(t2-t1)+(t6-t5):.0f} dl={(t4-t3):.0f} mem+queue={(t5-t4):.0f} preview={(t7-t6):.0f} "
+                  f"bytes={len(data)}")
+            return jsonify({
+                "ok": True,
+                "serverPath": out,
+                "url": _rel_url(rend["preview"]) if preview else _rel_url(out),
+                "original_url": _rel_url(out),
+                "renditions": {n: _rel_url(p) for n, p in rend.items()},
+                "capture_id": capture_id,
+                "written": False,   # serverPath is still on the writer pool → /api/wait_written
+            }), 200
 
         # ---------- UVC path ----------
-        with buf_lock:
-            data = latest_jpeg
+        p = request.get_json(silent=True) or {}
+        mr = request.values.get("max_res", p.get("max_res"))
+        want_max = STILL_MAX_RES if mr is None else str(mr).lower() in ("1","true","yes")
+        picked = eng.grab_still() if want_max else None
+        if picked is None:
+            picked = eng.zsl_pick(target, slack=clock_err)
+        frame_ts, still, skew, written = None, None, None, False
+        if picked is not None:
+            # full-quality still from the raw frame; preview-size JPEG only for the live buffer
+            frame, frame_ts, src = picked
+            # no shutter target (plain /capture, or a max_res still without one) → newest frame, no skew
+            if target is not None: skew = (frame_ts - target) * 1000.0
+            # passthrough + jpg: the camera's JPEG is saved byte for byte (quality is the camera's)
+            kept = src is not None and STILL_FORMAT != "png"
+            still = {"format": STILL_FORMAT, "quality": None if STILL_FORMAT == "png" or kept else STILL_QUALITY,
+                     "camera_jpeg": kept, "size": [int(frame.shape[1]), int(frame.shape[0])]}
+            if STILL_FORMAT == "png": still["png_compression"] = STILL_PNG_COMPRESSION
+            # live buffer / response: downscale a max-res frame; otherwise reuse the camera's JPEG when there is one
+            if frame.shape[1] > UVC_W: data = _render_variant((UVC_W, JPEG_QUALITY), None, frame)
+            else: data = src if src is not None else _enc(frame)
+            out = capture_path(SAVE_DIR, session, ".png" if STILL_FORMAT == "png" else ".jpg", now=frame_ts)
+            capture_catalog.add(out, session=session, engine=ENGINE_UVC, created=frame_ts)
+            _persist_async(out, lambda: _encode_still(frame, src), eng.id)
+        else:
+            _, data = eng.bus.latest()
+            out = capture_path(SAVE_DIR, session, ".jpg", now=t0 / 1000.0)
+            if data:
+                _write_file(out, data)
+                capture_catalog.add(out, session=session, engine=ENGINE_UVC, created=t0 / 1000.0, size=len(data))
+                written = True
         if not data:
+            M_CAPTURES.inc(cam=eng.id, result="error")
             return jsonify({"ok": False, "error": "no frame"}), 503
-        out = os.path.join(SAVE_DIR, f"capture_{ts}.jpg")
-        with open(out, "wb") as f:
-            f.write(data)
         tW = _ms()
 
-        _set_latest(data)
+        eng.bus.publish(data)
         tB = _ms()
 
-        last_captured_path = out
-        last_capture_id += 1
+        capture_id = _record_capture(out)
 
-        print(f"[CAPTURE UVC] total={tB-t0:.0f}ms write={(tW-t0):.0f} setbuf={(tB-tW):.0f} save_dir={SAVE_DIR}")
+        for step, ms in (("grab", tW-t0), ("publish", tB-tW), ("total", tB-t0)):
+            M_CAPTURE.observe(ms / 1000.0, cam=eng.id, step=step)
+        M_CAPTURES.inc(cam=eng.id, result="ok")
+        print(f"[CAPTURE UVC] total={tB-t0:.0f}ms write={(tW-t0):.0f} setbuf={(tB-tW):.0f} "
+              f"zsl_skew={'-' if skew is None else f'{skew:.0f}'} save_dir={SAVE_DIR}")
         return jsonify({
             "ok": True,
             "serverPath": out,
-            "url": f"/captured_images/{os.path.basename(out)}",
-            "capture_id": last_capture_id
+            "url": _rel_url(out),
+            "capture_id": capture_id,
+            "frame_ts": None if frame_ts is None else frame_ts * 1000.0,
+            "shutter_skew_ms": skew,
+            "clock_err_ms": clock_err * 1000.0 if target is not None else None,   # skew within ± this is clock noise
+            "still": still,
+            "written": written,
         }), 200
 
     finally:
-        capture_lock.release()
+        eng.capture_lock.release()
+
+
+@app.route("/snapshot")
+def snapshot():
+    eng = _primary()
+    if eng is not None: eng.demand(wait=DEMAND_WAKE_S)
+    _, data = _bus_of(eng).latest()
+    if not data:
+        return jsonify({"ok": False, "error": "no frame"}), 503
+    return Response(data, mimetype="image/jpeg")
 
 
 @app.route("/api/delete_recent", methods=["POST"])
@@ -756,8 +1560,9 @@ def api_delete_recent():
     except Exception:
         count = DELETE_RECENT_COUNT
 
-    files = _list_captured_sorted()[:count]
+    files = capture_catalog.recent(count)
     deleted, failed = _safe_delete(files)
+    capture_catalog.remove(deleted + [f["path"] for f in failed if f.get("error") == "not-found"])
     return jsonify({
         "ok": True,
         "requested": count,
@@ -767,8 +1572,47 @@ def api_delete_recent():
     }), 200
 
 
+@app.route("/api/captures")
+def api_captures():
+    """Paginated capture list from the catalog: ?limit=50&cursor=<id>&session=<key>"""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 500))
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor not in (None, "") else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "bad limit/cursor"}), 400
+    items, nxt = capture_catalog.page(limit, before_id=cursor, session=request.args.get("session") or None)
+    for it in items:
+        it["url"] = "/captured_images/" + it.pop("rel")
+    return jsonify({"ok": True, "items": items, "next_cursor": nxt, "total": capture_catalog.count()}), 200
+
+
+@app.route("/api/wait_written", methods=["POST"])
+def api_wait_written():
+    """Block until captures are on disk: {"paths": [serverPath, ...], "timeout": s}.
+
+    /capture answers before the writer pool has saved the file ("written": false);
+    anything that opens serverPath directly (upload, print) waits here first.
+    """
+    p = request.get_json(silent=True) or {}
+    paths = p.get("paths") or ([p["path"]] if p.get("path") else [])
+    try: timeout = max(0.0, min(float(p.get("timeout", 10)), 30.0))
+    except (TypeError, ValueError): timeout = 10.0
+    deadline = time.monotonic() + timeout
+    written = {}
+    for path in paths:
+        ap = os.path.abspath(str(path))
+        written[path] = ap.startswith(SAVE_DIR + os.sep) and _wait_pending(ap, max(0.0, deadline - time.monotonic()))
+    return jsonify({"ok": all(written.values()), "written": written}), 200
+
+
 @app.route('/captured_images/<path:filename>')
 def serve_captured_image(filename):
+    # dotfiles are never served (the catalog DB is .capture_catalog.sqlite3 next to the app, but
+    # CATALOG_DB may point into SAVE_DIR — it and its -wal/-shm must not be downloadable)
+    if any(part.startswith(".") for part in filename.replace("\\", "/").split("/")):
+        return jsonify({"ok": False, "error": "not found"}), 404
+    _wait_pending(os.path.abspath(os.path.join(SAVE_DIR, filename)))
     resp=send_from_directory(SAVE_DIR,filename)
     return _nocache(resp)
 
@@ -780,81 +1624,443 @@ def video_feed():
 
     - autoconfirm=1  : ปลด pause ให้ live ทำงานอัตโนมัติ
     - fresh=1        : ล้างเฟรมค้างก่อนเริ่ม และถ้าช้า ส่งแบล็คเฟรมเป็นเฟรมแรก
+    - meta=1         : ใส่ X-Frame-Seq / X-Capture-Ts / X-Publish-Ts / X-Send-Ts (epoch ms) ทุก part — ดู bench/latency.py
+    - fps=15         : จำกัดเฟรมต่อวินาทีของ viewer นี้ (ได้เฟรมล่าสุดเสมอ ไม่ต่อคิว)
+    - w=640&q=60     : preview variant (ย่อ/ลดคุณภาพ) — encode ครั้งเดียวต่อเฟรม แชร์ทุก viewer ที่ขอ variant เดียวกัน
     - จะ start live-thread ให้ตรง engine ทันที (ไม่รอ watcher)
+    - ตาม primary camera: ถ้า probe เปลี่ยนกล้อง stream จะย้ายไปกล้องใหม่เอง
     """
-    global viewers, pause_live
-    viewers += 1
+    return _mjpeg_response(*_stream_begin(request.args))
+
 
+def _truthy(v) -> bool:
+    return str(v or "0").lower() in ("1", "true", "yes")
+
+
+def _apply_stream_args(args, eng=None):
     try:
-        ac = request.args.get("autoconfirm", "0").lower()
-        if ac in ("1", "true", "yes"):
-            pause_live = False
+        if _truthy(args.get("autoconfirm")):
+            _set_pause(False)
     except Exception:
         pass
-
     try:
-        if request.args.get("fresh", "0").lower() in ("1", "true", "yes"):
-            _clear_latest()
+        if _truthy(args.get("fresh")):
+            _bus_of(eng if eng is not None else _primary()).clear()
     except Exception:
         pass
 
+
+def _stream_begin(args, cam_id=None):
+    """Viewer bookkeeping + live start for a new stream -> (eng, follow, on_close); None if cam_id is unknown.
+
+    Shared by the Flask routes and the asyncio path in asgi.py (which runs it off the event loop).
+    """
+    if cam_id is not None:
+        eng = _engine(cam_id)
+        if eng is None: return None
+        _start_adapt()
+        eng.viewers += 1
+        _apply_stream_args(args, eng)
+        eng.start()
+        if isinstance(eng, GphotoEngine): _wake_dslr_internal(eng)
+
+        def _dec():
+            eng.viewers = max(0, eng.viewers - 1)
+
+        return eng, None, _dec
+
+    _start_adapt()
+    global viewers
+    viewers += 1
+    _apply_stream_args(args)
+    eng = None
     try:
-        _start_live_for_current_engine()
+        eng = _start_live_for_current_engine()
         # ensure DSLR LV is on when someone starts viewing
-        _wake_dslr_internal()
+        _wake_dslr_internal(eng)
     except Exception:
         pass
 
-    def _ensure_first_frame_ready_local(deadline_ms=FIRST_FRAME_DEADLINE_MS):
-        t0 = time.time()
-        while True:
-            with buf_lock:
-                if latest_jpeg is not None:
-                    return True
-            if (time.time() - t0) * 1000.0 >= deadline_ms:
-                return False
-            frame_event.wait(timeout=0.02)
+    def _dec_viewers():
+        global viewers
+        viewers = max(0, viewers - 1)
 
-    def generate():
-        boundary = b"--frame\r\n"
-        hdr = b"Content-Type: image/jpeg\r\n\r\n"
+    return eng, _primary, _dec_viewers
 
-        ready = _ensure_first_frame_ready_local(FIRST_FRAME_DEADLINE_MS)
-        if not ready:
-            try:
-                black = _black_frame_jpeg(640, 480)
-            except Exception:
-                black = None
-            if black:
-                yield boundary + hdr + black + b"\r\n"
 
-        last_ver = -1
+class MjpegViewer:
+    """One viewer's subscription, framing and metrics (MJPEG or WebSocket; WSGI thread or asyncio task).
+
+    follow() -> engine lets the stream move with the primary camera.
+    """
+
+    def __init__(self, eng, follow=None, on_close=None, args=None, client=None):
+        args = args if args is not None else {}
+        self.eng, self.follow, self.on_close, self.client = eng, follow, on_close, client
+        self.variant = _parse_variant(args)
+        self.meta = _truthy(args.get("meta"))
+        self.max_fps = 0.0
+        try: self.set_fps(float(args.get("fps") or 0))
+        except ValueError: pass
+        self.sub = _subscribe(_bus_of(eng), self.variant)
+        self.vid = str(next(_viewer_seq))
+        self._skipped = 0
+        self._closed = False
+        self.t0 = self._due = time.monotonic()
+        self.delivered = self.skipped = 0
+        self.write_s = self.write_max = 0.0
+        self.lag_ms: Optional[float] = None   # publish → handed to socket, EWMA (adaptive controller input)
+        live_viewers[self.vid] = self
+
+    @property
+    def cam(self) -> str:
+        return self.eng.id if self.eng else "none"
+
+    def part(self, frame: bytes, sub=None) -> bytes:
+        h = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n" % len(frame)
+        if self.meta and sub is not None:
+            # epoch ms so a client on another (NTP-synced) host can compute glass-to-glass
+            seq, cap, pub = sub.meta
+            h += b"X-Frame-Seq: %d\r\nX-Capture-Ts: %.3f\r\nX-Publish-Ts: %.3f\r\nX-Send-Ts: %.3f\r\n" % (
+                seq, cap * 1000.0, pub * 1000.0, time.time() * 1000.0)
+        return h + b"\r\n" + frame + b"\r\n"
+
+    def black(self) -> Optional[bytes]:
+        """Placeholder part while the first real frame is late."""
+        try: b = _black_frame_jpeg(640, 480)
+        except Exception: b = None
+        return self.part(b) if b else None
+
+    def set_fps(self, fps: float):
+        self.max_fps = max(0.0, min(VIEWER_MAX_FPS, fps))
+
+    def feed(self, frame: Optional[bytes]) -> Optional[bytes]:
+        """Result of sub.wait() -> multipart part to send, or None."""
+        return self.part(frame, self.sub) if self.take(frame) else None
+
+    def take(self, frame: Optional[bytes]) -> bool:
+        """Count a frame about to be sent; on timeout (None) re-subscribe if the primary moved."""
+        if not frame:
+            cur = self.follow() if self.follow else self.eng
+            if cur is not self.eng:
+                # primary camera changed (hotplug / set_camera) → move to the new device's bus
+                self.sub.close()
+                self.eng, self.sub, self._skipped = cur, _subscribe(_bus_of(cur), self.variant), 0
+            return False
+        cam, sub = self.cam, self.sub
+        sk, self._skipped = sub.skipped - self._skipped, sub.skipped
+        self.delivered += 1; self.skipped += sk
+        if self.max_fps: self._due = max(self._due + 1.0 / self.max_fps, time.monotonic() - 1.0 / self.max_fps)
+        M_VIEWER.inc(cam=cam, viewer=self.vid, outcome="delivered"); M_DELIVERY.inc(cam=cam, outcome="delivered")
+        if sk:
+            M_VIEWER.inc(sk, cam=cam, viewer=self.vid, outcome="skipped"); M_DELIVERY.inc(sk, cam=cam, outcome="skipped")
+        return True
+
+    def pause(self) -> float:
+        """Seconds to hold off before taking the next frame (?fps= cap); the newest one is taken then."""
+        return max(0.0, self._due - time.monotonic()) if self.max_fps else 0.0
+
+    def wrote(self, t0: float):
+        # the part has been handed to the socket; a long write = slow client, its next frame is the newest
+        dt = time.perf_counter() - t0
+        self.write_s += dt; self.write_max = max(self.write_max, dt)
+        lag = (time.time() - self.sub.meta[2]) * 1000.0
+        self.lag_ms = lag if self.lag_ms is None else self.lag_ms + 0.2 * (lag - self.lag_ms)
+        M_STAGE.observe(dt, cam=self.cam, stage="write")
+
+    def info(self) -> dict:
+        up = max(1e-6, time.monotonic() - self.t0)
+        return {"id": self.vid, "cam": self.cam, "client": self.client,
+                "variant": self.sub.variant.key if self.sub.variant is not None else None,
+                "max_fps": self.max_fps or None, "seconds": round(up, 1),
+                "delivered": self.delivered, "skipped": self.skipped, "fps": round(self.delivered / up, 2),
+                "write_ms_avg": round(1000.0 * self.write_s / self.delivered, 2) if self.delivered else None,
+                "write_ms_max": round(1000.0 * self.write_max, 2),
+                "lag_ms": round(self.lag_ms, 1) if self.lag_ms is not None else None}
+
+    def close(self):
+        if self._closed: return
+        self._closed = True
+        self.sub.close()
+        live_viewers.pop(self.vid, None)
+        for o in ("delivered", "skipped"): M_VIEWER.remove(cam=self.cam, viewer=self.vid, outcome=o)
+        if self.on_close: self.on_close()
+
+
+def _adapt_loop():
+    """Feed the adaptive controller once per ADAPT_INTERVAL_S while anyone is watching."""
+    ncpu = os.cpu_count() or 1
+    t_prev, c_prev, enc_prev = time.monotonic(), sum(os.times()[:2]), {}
+    while True:
+        time.sleep(ADAPT_INTERVAL_S)
+        now, c = time.monotonic(), sum(os.times()[:2])
+        cpu = 100.0 * (c - c_prev) / max(1e-6, now - t_prev) / ncpu
+        t_prev, c_prev = now, c
+        # mean live encode time over this tick, all cameras
+        n = tot = 0
+        for e in list(engines.values()):
+            cnt, sm = M_STAGE.totals(cam=e.id, stage="encode")
+            pc, ps = enc_prev.get(e.id, (0, 0.0))
+            n += cnt - pc; tot += sm - ps; enc_prev[e.id] = (cnt, sm)
+        # q / scale only reach frames _live_enc encodes: a UVC loop in bgr mode
+        adapt.set_encoding(any(e.kind == ENGINE_UVC and e.alive and not e.passthrough for e in list(engines.values())))
+        vs = list(live_viewers.values())
+        if not vs: continue   # nothing to adapt for: hold the current point
+        # median viewer, so one client on bad Wi-Fi doesn't degrade the whole booth
+        lags = sorted(v.lag_ms for v in vs if v.lag_ms is not None)
+        if adapt.update(enc_ms=1000.0 * tot / n if n > 0 else None, lag_ms=lags[len(lags) // 2] if lags else None,
+                        cpu_pct=cpu, temp_c=adaptive.read_soc_temp()):
+            i = adapt.info()
+            log(f"[ADAPT] q={i['quality']} fps={i['fps']} scale={i['scale']} ({adapt.reason})")
+
+
+_adapt_thread: Optional[threading.Thread] = None
+
+
+def _start_adapt():
+    global _adapt_thread
+    if not adapt.enabled or (_adapt_thread and _adapt_thread.is_alive()): return
+    _adapt_thread = threading.Thread(target=_adapt_loop, daemon=True, name="adapt")
+    _adapt_thread.start()
+
+
+def _clamp_sndbuf(sock):
+    """Cap the kernel send buffer so a stalled client backs up into its latest-only slot, not the socket."""
+    if sock is None or STREAM_SNDBUF_KB <= 0: return
+    try: sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, STREAM_SNDBUF_KB * 1024)
+    except (OSError, AttributeError): pass
+
+
+def _mjpeg_response(eng, follow=None, on_close=None):
+    """multipart MJPEG from eng's bus; one worker thread per viewer (see asgi.py for the asyncio path)."""
+    v = MjpegViewer(eng, follow, on_close, request.args, request.remote_addr)
+    _clamp_sndbuf(request.environ.get("gunicorn.socket") or request.environ.get("werkzeug.socket"))
+
+    def generate():
+        if not _bus_of(v.eng).wait_for_data(timeout=FIRST_FRAME_DEADLINE_MS / 1000.0):
+            black = v.black()
+            if black: yield black
+
+        # blocks until this viewer has an unseen frame — one wake per publish
         while True:
-            frame_event.wait(timeout=1.0)
-            with buf_lock:
-                if latest_ver == last_ver:
-                    continue
-                frame = latest_jpeg
-                last_ver = latest_ver
-            if not frame:
-                continue
-            yield boundary + hdr + frame + b"\r\n"
+            d = v.pause()
+            if d: time.sleep(d)
+            b = v.feed(v.sub.wait(timeout=1.0))
+            if b is None: continue
+            t_w = time.perf_counter()
+            yield b
+            v.wrote(t_w)
 
     resp = Response(stream_with_context(generate()),
                     mimetype="multipart/x-mixed-replace; boundary=frame")
+    resp.call_on_close(v.close)
+    return resp
+
+# ---------- WebSocket live view (credit-based, see wsframes.py) ----------
+
+def _ws_control(v: MjpegViewer, credits: wsframes.Credits, msg):
+    m = wsframes.parse_client(msg)
+    if "credit" in m: credits.add(m["credit"])
+    if "fps" in m: v.set_fps(m["fps"])
+
+
+def _ws_credits(args) -> int:
+    try: return int(args.get("credits") or 1)
+    except ValueError: return 1
+
+
+def _ws_serve(ws, args, cam_id=None):
+    """One WebSocket viewer on a worker thread: a frame goes out only against a client credit."""
+    got = _stream_begin(args, cam_id)
+    if got is None:
+        ws.close(reason=4404, message=f"unknown camera: {cam_id}"); return
+    v = MjpegViewer(*got, args, request.remote_addr)
+    credits = wsframes.Credits(_ws_credits(args))
+    try:
+        ws.send(wsframes.hello(v.cam, credits.n))
+        if credits.n and not _bus_of(v.eng).wait_for_data(timeout=FIRST_FRAME_DEADLINE_MS / 1000.0):
+            black = _black_frame_jpeg(640, 480)
+            if black and credits.take(): ws.send(wsframes.pack(black, flags=wsframes.FLAG_PLACEHOLDER))
+        while True:
+            # drain control messages; without credit, park on the socket instead of the bus
+            msg = ws.receive(timeout=0 if credits.n else 1.0)
+            while msg is not None:
+                _ws_control(v, credits, msg)
+                msg = ws.receive(timeout=0)
+            if credits.n <= 0: continue
+            d = v.pause()
+            if d: time.sleep(d)
+            frame = v.sub.wait(timeout=1.0)
+            if not v.take(frame): continue
+            credits.take()
+            t_w = time.perf_counter()
+            ws.send(wsframes.pack(frame, v.sub.meta))
+            v.wrote(t_w)
+    finally:
+        v.close()
+
+
+if ws_app is not None:
+    @ws_app.route("/video_ws")
+    def video_ws(ws):
+        """Primary camera as binary WebSocket frames; same query args as /video_feed plus credits=N."""
+        _ws_serve(ws, request.args)
+
+    @ws_app.route("/cams/<cam_id>/video_ws")
+    def cam_video_ws(ws, cam_id):
+        _ws_serve(ws, request.args, cam_id)
+
+# ---------- H.264 live view (local ffmpeg, see h264live.py) ----------
+
+def _h264_frame(eng: CameraEngine, size=None):
+    """Newest frame of eng as BGR at size (w, h); size=None → natural size capped at H264_W."""
+    ver, raw, lk, jpeg = eng.bus.latest_raw()
+    if raw is None:
+        # gphoto preview: JPEG only → decode once per bus version
+        if not jpeg: return None
+        if eng._h264_dec[0] != ver:
+            eng._h264_dec = (ver, cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR))
+        raw, lk = eng._h264_dec[1], None
+        if raw is None: return None
+    with lk or nullcontext():
+        h0, w0 = raw.shape[:2]
+        if size is None:
+            w = max(16, min(h264live.H264_W, w0)) // 2 * 2
+            size = (w, max(16, int(round(h0 * w / w0))) // 2 * 2)
+        if (w0, h0) == tuple(size): return raw.copy()
+        return cv2.resize(raw, tuple(size), interpolation=cv2.INTER_AREA)
+
+
+def _h264_stream(eng: CameraEngine, fmt: str) -> h264live.H264Stream:
+    with engines_lock:
+        st = eng.h264.get(fmt)
+        if st is None:
+            st = eng.h264[fmt] = h264live.H264Stream(f"{eng.id}.{fmt}", lambda size: _h264_frame(eng, size), fmt)
+        return st
+
+
+def _h264_begin(args, fmt, cam_id=None):
+    """-> (client, on_close) or (None, (json error, status)) — shared by Flask and asgi.py."""
+    if fmt not in h264live.FORMATS:
+        return None, ({"ok": False, "error": f"unknown format: {fmt}"}, 404)
+    if not h264live.available():
+        return None, ({"ok": False, "error": "ffmpeg not installed"}, 503)
+    got = _stream_begin(args, cam_id)
+    if got is None:
+        return None, ({"ok": False, "error": f"unknown camera: {cam_id}"}, 404)
+    eng, _, on_close = got
+    if eng is None:
+        on_close()
+        return None, ({"ok": False, "error": "no camera"}, 503)
+    # the live thread keeps publishing into eng.bus; ffmpeg starts with the first client
+    client = _h264_stream(eng, fmt).subscribe()
+    if client.closed:
+        client.close(); on_close()
+        return None, ({"ok": False, "error": client.stream.error or "encoder failed"}, 503)
+    return client, on_close
+
+
+def _h264_response(fmt, cam_id=None):
+    client, extra = _h264_begin(request.args, fmt, cam_id)
+    if client is None:
+        body, status = extra
+        return jsonify(body), status
+
+    def generate():
+        while True:
+            chunk = client.get(timeout=1.0)
+            if chunk: yield chunk
+            elif client.closed: return
+
+    resp = Response(stream_with_context(generate()), mimetype=client.stream.content_type)
 
     @resp.call_on_close
-    def _dec_viewers():
-        global viewers
-        viewers = max(0, viewers - 1)
+    def _closed():
+        client.close()
+        extra()
 
     return resp
 
+
+@app.route("/video.<fmt>")
+def video_h264(fmt):
+    """Primary camera as H.264: /video.mp4 (fragmented MP4) or /video.ts (MPEG-TS). Needs ffmpeg."""
+    return _h264_response(fmt)
+
+
+@app.route("/cams/<cam_id>/video.<fmt>")
+def cam_video_h264(cam_id, fmt):
+    return _h264_response(fmt, cam_id)
+
+# ---------- Multi-camera: /cams/<id>/… ----------
+@app.route("/api/cams")
+def api_cams():
+    """Attached devices and their engines; ids are stable while the device stays plugged in."""
+    out = []
+    for cid, kind, key, model in _attached():
+        e = engines.get(cid)
+        d = e.info() if e else {"id": cid, "kind": kind, "running": False, "viewers": 0}
+        d.update(primary=(cid == primary_id), model=model,
+                 device=_uvc_dev(key) if kind == ENGINE_UVC else key)
+        out.append(d)
+    return jsonify({"ok": True, "cams": out, "primary": primary_id}), 200
+
+
+def _cam_or_404(cam_id):
+    eng = _engine(cam_id)
+    if eng is None:
+        return None, (jsonify({"ok": False, "error": f"unknown camera: {cam_id}"}), 404)
+    return eng, None
+
+
+@app.route("/cams/<cam_id>/video_feed")
+def cam_video_feed(cam_id):
+    got = _stream_begin(request.args, cam_id)
+    if got is None:
+        return jsonify({"ok": False, "error": f"unknown camera: {cam_id}"}), 404
+    return _mjpeg_response(*got)
+
+
+@app.route("/cams/<cam_id>/capture", methods=["POST"])
+def cam_capture(cam_id):
+    eng, err = _cam_or_404(cam_id)
+    if err: return err
+    if not eng.alive: eng.start()
+    return _capture(eng)
+
+
+@app.route("/cams/<cam_id>/snapshot")
+def cam_snapshot(cam_id):
+    eng, err = _cam_or_404(cam_id)
+    if err: return err
+    eng.demand(wait=DEMAND_WAKE_S)
+    _, data = eng.bus.latest()
+    if not data:
+        return jsonify({"ok": False, "error": "no frame"}), 503
+    return Response(data, mimetype="image/jpeg")
+
+
+@app.route("/cams/<cam_id>/stop", methods=["POST"])
+def cam_stop(cam_id):
+    eng, err = _cam_or_404(cam_id)
+    if err: return err
+    eng.stop()
+    return jsonify({"ok": True, "id": eng.id, "stopped": True}), 200
+
 # ---------- Lifecycle ----------
 
 def _graceful_shutdown(*args):
     log("[SYS] shutting down ...")
-    try: stop_gphoto_live(); stop_uvc_live(); stop_watcher()
+    try: _stop_all_engines(); stop_watcher(); retention.stop()
+    except Exception: pass
+    try:
+        for e in list(engines.values()): e.bus.close()
+        _no_camera_bus.close()
+    except Exception: pass
+    try: _writer.shutdown(wait=True)   # flush captures still being written
+    except Exception: pass
+    try:
+        if _rend_pool is not None: _rend_pool.shutdown(wait=True, cancel_futures=False)
     except Exception: pass
     try: cv2.destroyAllWindows()
     except Exception: pass
@@ -869,6 +2075,8 @@ atexit.register(_graceful_shutdown)
 if __name__=="__main__":
     log(f"[BOOT] CameraServer starting at {HOST}:{PORT}")
     log(f"[BOOT] CORS_ALLOW_ORIGINS={CORS_ALLOW_ORIGINS}")
+    start_rendition_pool()
     start_watcher()
+    retention.start()
     app.run(host=HOST, port=PORT, debug=DEBUG, threaded=True)
     
\ No newline at end of file
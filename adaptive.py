@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# adaptive.py — live preview operating point (JPEG quality / output scale / fps) under load
+#
+# The caller feeds one sample per tick (mean encode time, viewer publish→send lag, CPU %,
+# SoC temperature); the controller steps the preview down when any signal is over
+# its limit for DOWN_AFTER ticks in a row and back up after UP_AFTER calm ticks.
+# Order of degradation: quality → frame rate → resolution (cheapest to notice last);
+# recovery runs in reverse. Stills are never touched — only the live preview.
+# When no live frame is encoded here (UVC MJPEG passthrough, DSLR preview: the camera's
+# own JPEGs are published) quality and scale have no effect; the caller says so via
+# set_encoding(False) and only the frame rate is stepped.
+import os, threading
+from typing import Optional
+
+DOWN_AFTER, UP_AFTER = 2, 5
+Q_STEP, FPS_FACTOR, SCALE_FACTOR = 10, 0.75, 0.75
+CALM = 0.6          # "calm" = every signal below CALM × its limit …
+CALM_TEMP_C = 5.0   # … except temperature: this many °C under its limit
+
+
+def read_soc_temp() -> Optional[float]:
+    """°C from the first thermal zone (Raspberry Pi SoC), or None."""
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp") as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+class AdaptiveController:
+    def __init__(self, q_max: int, fps_max: float, q_min: int = 50, fps_min: float = 10.0, scale_min: float = 0.5,
+                 lag_ms: float = 200.0, cpu_pct: float = 85.0, temp_c: float = 75.0, enabled: bool = True):
+        self.q_max, self.q_min = int(q_max), min(int(q_min), int(q_max))
+        self.fps_max, self.fps_min = float(fps_max), min(float(fps_min), float(fps_max))
+        self.scale_min = max(0.1, min(1.0, float(scale_min)))
+        self.limits = {"lag_ms": float(lag_ms), "cpu_pct": float(cpu_pct), "temp_c": float(temp_c)}
+        self.enabled = enabled
+        self.encoding = True   # live frames are JPEG-encoded here → quality / scale levers apply
+        self.q, self.fps, self.scale = self.q_max, self.fps_max, 1.0
+        self.reason: Optional[str] = None
+        self.signals: dict = {}
+        self.changes = 0
+        self._over = self._calm = 0
+        self._lock = threading.Lock()
+
+    def _pressure(self, s: dict):
+        """-> (name of the first signal over its limit or None, all signals calm?)"""
+        lim = dict(self.limits, enc_ms=500.0 / self.fps)   # encode may use half the frame interval
+        over, calm = None, True
+        for k in ("temp_c", "cpu_pct", "enc_ms", "lag_ms"):
+            v = s.get(k)
+            if v is None: continue
+            if v > lim[k] and over is None: over = k
+            if v > (lim[k] - CALM_TEMP_C if k == "temp_c" else lim[k] * CALM): calm = False
+        return over, calm
+
+    def set_encoding(self, encoding: bool):
+        """False while the preview is the camera's own JPEG (nothing to re-quality or rescale)."""
+        with self._lock:
+            if encoding == self.encoding: return
+            self.encoding = encoding
+            # levers that were out of play come back at full quality / size
+            if not encoding: self.q, self.scale = self.q_max, 1.0
+
+    def update(self, enc_ms: Optional[float] = None, lag_ms: Optional[float] = None,
+               cpu_pct: Optional[float] = None, temp_c: Optional[float] = None) -> bool:
+        """One tick; True if the operating point changed."""
+        with self._lock:
+            self.signals = {k: (round(v, 2) if v is not None else None) for k, v in
+                            (("enc_ms", enc_ms), ("lag_ms", lag_ms), ("cpu_pct", cpu_pct), ("temp_c", temp_c))}
+            if not self.enabled: return False
+            over, calm = self._pressure(self.signals)
+            self._over = self._over + 1 if over else 0
+            self._calm = self._calm + 1 if calm else 0
+            if self._over >= DOWN_AFTER and self._step_down():
+                self._over, self.reason = 0, over
+                self.changes += 1
+                return True
+            if self._calm >= UP_AFTER and self._step_up():
+                self._calm, self.reason = 0, "recovered"
+                self.changes += 1
+                return True
+            return False
+
+    def _step_down(self) -> bool:
+        if self.encoding and self.q > self.q_min:
+            self.q = max(self.q_min, self.q - Q_STEP)
+        elif self.fps > self.fps_min:
+            self.fps = max(self.fps_min, round(self.fps * FPS_FACTOR, 1))
+        elif self.encoding and self.scale > self.scale_min:
+            self.scale = max(self.scale_min, round(self.scale * SCALE_FACTOR, 3))
+        else:
+            return False
+        return True
+
+    def _step_up(self) -> bool:
+        if self.scale < 1.0:
+            self.scale = min(1.0, round(self.scale / SCALE_FACTOR, 3))
+        elif self.fps < self.fps_max:
+            self.fps = min(self.fps_max, round(self.fps / FPS_FACTOR, 1))
+        elif self.encoding and self.q < self.q_max:
+            self.q = min(self.q_max, self.q + Q_STEP)
+        else:
+            return False
+        return True
+
+    def info(self) -> dict:
+        with self._lock:
+            na = not self.encoding
+            return {"enabled": self.enabled, "quality": "n/a" if na else self.q, "fps": self.fps,
+                    "scale": "n/a" if na else self.scale, "encoding": self.encoding,
+                    "degraded": (self.q, self.fps, self.scale) != (self.q_max, self.fps_max, 1.0),
+                    "reason": self.reason, "changes": self.changes, "signals": dict(self.signals),
+                    "limits": {"quality": [self.q_min, self.q_max], "fps": [self.fps_min, self.fps_max],
+                               "scale": [self.scale_min, 1.0], **self.limits}}
+
+
+def from_env(q_max: int, fps_max: float) -> AdaptiveController:
+    e = os.environ.get
+    return AdaptiveController(
+        q_max, fps_max,
+        q_min=int(e("ADAPT_Q_MIN", "50")), fps_min=float(e("ADAPT_FPS_MIN", "10")),
+        scale_min=float(e("ADAPT_SCALE_MIN", "0.5")), lag_ms=float(e("ADAPT_LAG_MS", "200")),
+        cpu_pct=float(e("ADAPT_CPU_PCT", "85")), temp_c=float(e("ADAPT_TEMP_C", "75")),
+        enabled=e("ADAPTIVE", "1").lower() in ("1", "true", "yes"))
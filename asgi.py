@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# asgi.py — asyncio serving mode for CameraServer (CAMERA_RUN_MODE=asgi in run_CameraServer.sh)
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 8080 --timeout-graceful-shutdown 5
+#
+# MJPEG viewers (/video_feed, /cams/<id>/video_feed) are coroutines parked on the
+# frame bus (Subscriber.wait_async), not threads, so hundreds of them fit on one
+# core. Every other route runs the unchanged Flask app through a small WSGI bridge
+# on its own thread pool (CONTROL_THREADS) that streams never occupy, so /capture
+# and /api/health stay fast however many viewers are connected.
+#
+# /video_ws and /cams/<id>/video_ws are the credit-based WebSocket live view
+# (wire format in wsframes.py); uvicorn needs websockets or wsproto installed.
+# /video.mp4 and /video.ts (H.264 via ffmpeg, h264live.py) are streamed from here too.
+import io, os, re, sys, json, time, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import CameraServer as cs
+import wsframes
+
+CONTROL_THREADS = int(os.environ.get("CONTROL_THREADS", "8"))
+_control = ThreadPoolExecutor(max_workers=CONTROL_THREADS, thread_name_prefix="ctl")
+_STREAM = re.compile(r"^(?:/cams/([^/]+))?/video_feed/?$")
+_WS = re.compile(r"^(?:/cams/([^/]+))?/video_ws/?$")
+_H264 = re.compile(r"^(?:/cams/([^/]+))?/video\.(mp4|ts)$")
+
+
+# ---------- MJPEG on the event loop ----------
+
+def _headers(scope, extra=()):
+    h = [(b"cache-control", b"no-store, no-cache, must-revalidate, max-age=0"), (b"pragma", b"no-cache"),
+         (b"expires", b"0")]
+    origin = dict(scope.get("headers") or []).get(b"origin", b"").decode("latin-1").rstrip("/")
+    if origin and origin in cs.CORS_ALLOW_ORIGINS:
+        h += [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin"),
+              (b"access-control-allow-credentials", b"true")]
+    return h + list(extra)
+
+
+async def _stream(scope, receive, send, cam_id):
+    loop = asyncio.get_running_loop()
+    args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    # may open a device / wake the DSLR → off the loop
+    got = await loop.run_in_executor(_control, cs._stream_begin, args, cam_id)
+    if got is None:
+        body = b'{"ok": false, "error": "unknown camera"}'
+        await send({"type": "http.response.start", "status": 404,
+                    "headers": _headers(scope, [(b"content-type", b"application/json")])})
+        await send({"type": "http.response.body", "body": body})
+        return
+    v = cs.MjpegViewer(*got, args, (scope.get("client") or ("",))[0])
+    gone = asyncio.Event()
+
+    async def _watch():
+        while (await receive())["type"] != "http.disconnect": pass
+        gone.set()
+
+    watcher = asyncio.ensure_future(_watch())
+    try:
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": _headers(scope, [(b"content-type", b"multipart/x-mixed-replace; boundary=frame")])})
+        first = await v.sub.wait_async(cs.FIRST_FRAME_DEADLINE_MS / 1000.0)
+        b = v.feed(first) if first else v.black()
+        while not gone.is_set():
+            if b is not None:
+                t_w = time.perf_counter()
+                # awaits transport flow control: a slow client parks only its own coroutine
+                await send({"type": "http.response.body", "body": b, "more_body": True})
+                v.wrote(t_w)
+            d = v.pause()
+            if d: await asyncio.sleep(d)
+            b = v.feed(await v.sub.wait_async(1.0))
+    finally:
+        watcher.cancel()
+        v.close()
+
+
+async def _ws_send_frame(v, send, credits, timeout) -> bool:
+    frame = await v.sub.wait_async(timeout)
+    if not v.take(frame): return False
+    credits.take()
+    t_w = time.perf_counter()
+    await send({"type": "websocket.send", "bytes": wsframes.pack(frame, v.sub.meta)})
+    v.wrote(t_w)
+    return True
+
+
+async def _ws(scope, receive, send, cam_id):
+    loop = asyncio.get_running_loop()
+    if (await receive())["type"] != "websocket.connect": return
+    args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    got = await loop.run_in_executor(_control, cs._stream_begin, args, cam_id)
+    if got is None:
+        await send({"type": "websocket.close", "code": 4404}); return
+    await send({"type": "websocket.accept"})
+    v = cs.MjpegViewer(*got, args, (scope.get("client") or ("",))[0])
+    credits = wsframes.Credits(cs._ws_credits(args))
+    more = asyncio.Event()   # credit arrived (or the client left)
+    gone = False
+
+    async def _rx():
+        nonlocal gone
+        while True:
+            m = await receive()
+            if m["type"] == "websocket.disconnect":
+                gone = True; more.set(); return
+            cs._ws_control(v, credits, m.get("text") if m.get("text") is not None else m.get("bytes"))
+            if credits.n: more.set()
+
+    rx = asyncio.ensure_future(_rx())
+    try:
+        await send({"type": "websocket.send", "text": wsframes.hello(v.cam, credits.n)})
+        if credits.n and not await _ws_send_frame(v, send, credits, cs.FIRST_FRAME_DEADLINE_MS / 1000.0):
+            black = cs._black_frame_jpeg(640, 480)
+            if black and credits.take():
+                await send({"type": "websocket.send", "bytes": wsframes.pack(black, flags=wsframes.FLAG_PLACEHOLDER)})
+        while not gone:
+            if credits.n <= 0:
+                more.clear()
+                if credits.n <= 0: await more.wait()
+                continue
+            d = v.pause()
+            if d: await asyncio.sleep(d)
+            await _ws_send_frame(v, send, credits, 1.0)
+    finally:
+        rx.cancel()
+        v.close()
+
+
+async def _h264(scope, receive, send, cam_id, fmt):
+    loop = asyncio.get_running_loop()
+    args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    # may wait for the first frame and spawn ffmpeg → off the loop
+    client, extra = await loop.run_in_executor(_control, cs._h264_begin, args, fmt, cam_id)
+    if client is None:
+        body, status = extra
+        await send({"type": "http.response.start", "status": status,
+                    "headers": _headers(scope, [(b"content-type", b"application/json")])})
+        await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+        return
+    gone = asyncio.Event()
+
+    async def _watch():
+        while (await receive())["type"] != "http.disconnect": pass
+        gone.set()
+
+    watcher = asyncio.ensure_future(_watch())
+    try:
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": _headers(scope, [(b"content-type", client.stream.content_type.encode())])})
+        while not gone.is_set() and not client.closed:
+            # a handful of remote monitors: a default-executor thread parks on the chunk queue
+            chunk = await loop.run_in_executor(None, client.get, 1.0)
+            if chunk: await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        watcher.cancel()
+        client.close()
+        extra()
+
+
+# ---------- WSGI bridge for everything else ----------
+
+def _environ(scope, body: bytes) -> dict:
+    server = scope.get("server") or ("0.0.0.0", cs.PORT)
+    client = scope.get("client") or ("", 0)
+    env = {
+        "REQUEST_METHOD": scope["method"], "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]), "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0], "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0), "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body), "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    for k, val in scope.get("headers") or []:
+        k = k.decode("latin-1").upper().replace("-", "_")
+        val = val.decode("latin-1")
+        if k == "CONTENT_TYPE": env["CONTENT_TYPE"] = val; continue
+        if k == "CONTENT_LENGTH": continue
+        k = "HTTP_" + k
+        env[k] = env[k] + "," + val if k in env else val
+    return env
+
+
+async def _wsgi(scope, receive, send):
+    loop = asyncio.get_running_loop()
+    body, more = b"", True
+    while more:
+        m = await receive()
+        if m["type"] == "http.disconnect": return
+        body += m.get("body", b""); more = m.get("more_body", False)
+    st = {}
+
+    def start_response(status, headers, exc_info=None):
+        st["status"] = int(status.split(" ", 1)[0])
+        st["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return lambda data: None   # legacy write(): Flask never uses it
+
+    def run():
+        it = cs.app(_environ(scope, body), start_response)
+        return it, iter(it)
+
+    it, chunks = await loop.run_in_executor(_control, run)
+    started = False
+    try:
+        while True:
+            # file responses (send_from_directory) are read chunk by chunk off the loop
+            chunk = await loop.run_in_executor(_control, next, chunks, None)
+            if not started:
+                await send({"type": "http.response.start", "status": st["status"], "headers": st["headers"]})
+                started = True
+            if chunk is None: break
+            if chunk: await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(it, "close"): await loop.run_in_executor(_control, it.close)
+
+
+# ---------- ASGI entry ----------
+
+async def _lifespan(receive, send):
+    while True:
+        m = await receive()
+        if m["type"] == "lifespan.startup":
+            cs.log(f"[BOOT] CameraServer (asgi) starting, control threads={CONTROL_THREADS}")
+            cs.log(f"[BOOT] CORS_ALLOW_ORIGINS={cs.CORS_ALLOW_ORIGINS}")
+            cs.start_rendition_pool()
+            cs.start_watcher()
+            cs.retention.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif m["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            cs._graceful_shutdown()   # stops engines, flushes writers, exits
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] == "websocket":
+        m = _WS.match(scope["path"])
+        if m: return await _ws(scope, receive, send, m.group(1))
+        await receive()
+        return await send({"type": "websocket.close", "code": 4404})
+    if scope["type"] != "http":
+        return
+    m = _STREAM.match(scope["path"])
+    if m and scope["method"] == "GET":
+        return await _stream(scope, receive, send, m.group(1))
+    m = _H264.match(scope["path"])
+    if m and scope["method"] == "GET":
+        return await _h264(scope, receive, send, m.group(1), m.group(2))
+    return await _wsgi(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("asgi:app", host=cs.HOST, port=cs.PORT, timeout_graceful_shutdown=5, log_level="warning")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# bench/bandwidth.py — uplink cost of each live-view flavour, side by side
+#
+# Reads each stream for --seconds (one at a time, after --warmup) and reports Mbit/s;
+# MJPEG rows also count parts (fps). Typical rows:
+#   mjpeg         /video_feed                  (full size, JPEG_QUALITY)
+#   mjpeg-640     /video_feed?w=640&q=60       (lazily rendered variant)
+#   h264-mp4      /video.mp4                   (fragmented MP4, needs ffmpeg on the server)
+#   h264-ts       /video.ts                    (MPEG-TS)
+#
+# usage:
+#   python3 bench/bandwidth.py --seconds 10
+#   python3 bench/bandwidth.py --env H264_KBPS=800 --env H264_W=960
+#   python3 bench/bandwidth.py --url http://booth.local:8080 --cam video0
+import os, sys, json, time, argparse
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import ROOT, free_port, start_server, wait_ready, stop_server
+
+STREAMS = [("mjpeg", "/video_feed", ""), ("mjpeg-640", "/video_feed", "w=640&q=60"),
+           ("h264-mp4", "/video.mp4", ""), ("h264-ts", "/video.ts", "")]
+
+
+def measure(base, path, warmup, seconds):
+    u = urlsplit(base)
+    c = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+    try:
+        c.request("GET", path)
+        r = c.getresponse()
+        if r.status != 200:
+            return {"status": r.status, "error": r.read(300).decode("utf-8", "replace")}
+        mjpeg = r.getheader("Content-Type", "").startswith("multipart/")
+        t_end_warm = time.monotonic() + warmup
+        while time.monotonic() < t_end_warm:
+            if not r.read1(65536): return {"status": 200, "error": "stream ended during warmup"}
+        n = parts = 0
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < seconds:
+            b = r.read1(65536)
+            if not b: break
+            n += len(b)
+            if mjpeg: parts += b.count(b"--frame\r\n")
+        dur = max(1e-6, time.monotonic() - t0)
+        out = {"status": 200, "mbps": round(n * 8 / 1e6 / dur, 3), "bytes": n, "seconds": round(dur, 2)}
+        if mjpeg: out.update(fps=round(parts / dur, 2), kb_per_frame=round(n / 1024 / parts, 1) if parts else None)
+        return out
+    except OSError as e:
+        return {"status": None, "error": str(e)}
+    finally:
+        c.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1] if __doc__ else None)
+    ap.add_argument("--seconds", type=float, default=10.0, help="measured seconds per stream")
+    ap.add_argument("--warmup", type=float, default=2.0, help="seconds read and ignored first (ffmpeg start)")
+    ap.add_argument("--cam", default=None, help="camera id → /cams/<id>/… instead of the primary camera")
+    ap.add_argument("--only", default="", help="comma-separated row names, e.g. mjpeg,h264-mp4")
+    ap.add_argument("--synth", default="pattern", help="CAMERA_SYNTH for the spawned server")
+    ap.add_argument("--synth-size", default="1280x720")
+    ap.add_argument("--synth-fps", type=float, default=30.0)
+    ap.add_argument("--env", action="append", default=[], help="KEY=VAL for the spawned server (repeatable)")
+    ap.add_argument("--cmd", default=None, help="server command, {port} is substituted (default: python CameraServer.py)")
+    ap.add_argument("--url", default=None, help="test an already running server instead of spawning one")
+    ap.add_argument("--server-log", default=None, help="write the spawned server's output here")
+    ap.add_argument("--out", default=None, help="JSON results file (default: bench/results/bandwidth-<time>.json)")
+    args = ap.parse_args()
+
+    proc = None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = start_server(args, port)
+    try:
+        if not wait_ready(base):
+            print(json.dumps({"ok": False, "error": f"server not ready at {base}"})); return 2
+        only = {x for x in args.only.split(",") if x}
+        prefix = f"/cams/{args.cam}" if args.cam else ""
+        rows = {}
+        for name, path, q in STREAMS:
+            if only and name not in only: continue
+            q = "&".join(x for x in ("autoconfirm=1", q) if x)
+            rows[name] = measure(base, f"{prefix}{path}?{q}", args.warmup, args.seconds)
+            print(f"[bandwidth] {name:10s} {json.dumps(rows[name])}", file=sys.stderr)
+        res = {"ok": True, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "config": {k: v for k, v in vars(args).items() if k != "out"}, "base": base, "streams": rows}
+        out = args.out or os.path.join(ROOT, "bench", "results", time.strftime("bandwidth-%Y%m%d-%H%M%S.json"))
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(res, f, indent=1)
+        print(json.dumps(rows, indent=1))
+        print(f"[bandwidth] results → {out}", file=sys.stderr)
+        return 0
+    finally:
+        stop_server(proc)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# bench/framebus_stress.py — CPU cost of idle / active viewers on FrameBroadcaster
+#
+# usage: python3 bench/framebus_stress.py [--viewers 64] [--seconds 3] [--fps 60]
+# exit code 1 if idle CPU per viewer exceeds --max-idle-pct (default 0.5%)
+import os, sys, time, json, argparse, threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from framebus import FrameBroadcaster
+
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system
+
+
+def _run_viewers(bus, n, stop, counts):
+    def viewer(i):
+        with bus.subscribe() as sub:
+            while not stop.is_set():
+                if sub.wait(timeout=1.0) is not None:
+                    counts[i] += 1
+    ths = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(n)]
+    for t in ths: t.start()
+    return ths
+
+
+def phase(n, seconds, fps):
+    bus = FrameBroadcaster()
+    bus.publish(b"\xff\xd8seed")
+    stop = threading.Event(); counts = [0] * n
+    ths = _run_viewers(bus, n, stop, counts)
+    time.sleep(0.2)  # let every viewer consume the seed frame
+    base = list(counts)
+    c0, t0 = _cpu(), time.monotonic()
+    published = 0
+    if fps > 0:
+        interval = 1.0 / fps; nxt = t0
+        while time.monotonic() - t0 < seconds:
+            bus.publish(b"\xff\xd8frame"); published += 1
+            nxt += interval; d = nxt - time.monotonic()
+            if d > 0: time.sleep(d)
+    else:
+        time.sleep(seconds)
+    time.sleep(0.05)
+    wall = time.monotonic() - t0; cpu = _cpu() - c0
+    stop.set(); bus.close()
+    for t in ths: t.join(timeout=2)
+    got = [c - b for c, b in zip(counts, base)]
+    return {
+        "viewers": n, "fps": fps, "seconds": round(wall, 3),
+        "published": published,
+        "delivered_min": min(got) if got else 0, "delivered_max": max(got) if got else 0,
+        "cpu_pct_total": round(100.0 * cpu / wall, 3),
+        "cpu_pct_per_viewer": round(100.0 * cpu / wall / max(1, n), 4),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--viewers", type=int, default=64)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--fps", type=float, default=60.0)
+    ap.add_argument("--max-idle-pct", type=float, default=0.5)
+    a = ap.parse_args()
+    idle = phase(a.viewers, a.seconds, 0)
+    active = phase(a.viewers, a.seconds, a.fps)
+    print(json.dumps({"idle": idle, "active": active}, indent=2))
+    ok = idle["cpu_pct_per_viewer"] <= a.max_idle_pct and idle["delivered_max"] == 0
+    if not ok:
+        print("[FAIL] idle viewers are consuming CPU / receiving phantom frames", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
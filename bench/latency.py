@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# bench/latency.py — per-client glass-to-glass / server-queue latency from a live MJPEG stream
+#
+# Opens /video_feed?meta=1 (or /cams/<id>/video_feed?meta=1) and reads the per-part headers:
+#   X-Frame-Seq   bus version → gaps are frames the server dropped for this viewer
+#   X-Capture-Ts  sensor read done (epoch ms)
+#   X-Publish-Ts  frame handed to the bus (epoch ms)
+#   X-Send-Ts     part written to this viewer's socket (epoch ms)
+# and reports, per window:
+#   g2g     receive − capture   (includes network; needs NTP-synced clocks across hosts)
+#   queue   send − publish      (server side: encode/render + waiting for this viewer)
+#   net     receive − send
+#   drops   sequence numbers this client never saw
+#
+# usage:
+#   python3 bench/latency.py http://booth.local:8080 --seconds 30 --every 5
+#   python3 bench/latency.py http://127.0.0.1:8080 --path /cams/video0/video_feed --query w=640 --json
+import os, sys, json, time, argparse
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import _Stream, summary
+
+
+def _ms(hdrs, k):
+    try: return float(hdrs[k])
+    except (KeyError, ValueError): return None
+
+
+class Window:
+    def __init__(self):
+        self.frames, self.drops, self.bytes = 0, 0, 0
+        self.g2g, self.queue, self.net, self.age = [], [], [], []
+        self.t0 = time.monotonic()
+
+    def add(self, hdrs, n, recv_ms, last_seq):
+        self.frames += 1; self.bytes += n
+        seq, cap, pub, sent = (_ms(hdrs, k) for k in ("x-frame-seq", "x-capture-ts", "x-publish-ts", "x-send-ts"))
+        if seq is not None and last_seq is not None and seq > last_seq + 1: self.drops += int(seq - last_seq - 1)
+        if cap is not None: self.g2g.append(recv_ms - cap)
+        if cap is not None and pub is not None: self.age.append(pub - cap)
+        if pub is not None and sent is not None: self.queue.append(sent - pub)
+        if sent is not None: self.net.append(recv_ms - sent)
+        return int(seq) if seq is not None else last_seq
+
+    def result(self):
+        dur = max(1e-6, time.monotonic() - self.t0)
+        return {"fps": round(self.frames / dur, 2), "frames": self.frames, "drops": self.drops,
+                "mbps": round(self.bytes * 8 / 1e6 / dur, 2),
+                "g2g_ms": summary(self.g2g), "capture_to_publish_ms": summary(self.age),
+                "queue_ms": summary(self.queue), "net_ms": summary(self.net)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("url", help="server base URL, e.g. http://127.0.0.1:8080")
+    ap.add_argument("--path", default="/video_feed")
+    ap.add_argument("--query", default="", help="extra query, e.g. w=640&q=60")
+    ap.add_argument("--seconds", type=float, default=0, help="stop after N seconds (0 = until Ctrl-C)")
+    ap.add_argument("--every", type=float, default=5.0, help="report interval (s)")
+    ap.add_argument("--json", action="store_true", help="one JSON object per report")
+    args = ap.parse_args()
+
+    u = urlsplit(args.url)
+    q = "&".join(x for x in ("meta=1", args.query) if x)
+    c = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+    c.request("GET", f"{args.path}?{q}")
+    r = c.getresponse()
+    if r.status != 200:
+        sys.exit(f"http {r.status}")
+    st, win, last_seq, total = _Stream(r), Window(), None, Window()
+    end = time.monotonic() + args.seconds if args.seconds > 0 else None
+    try:
+        while end is None or time.monotonic() < end:
+            line = st.readline()
+            if not line: break
+            if not line.startswith(b"--frame"): continue
+            hdrs = {}
+            while True:
+                h = st.readline()
+                if not h or h in (b"\r\n", b"\n"): break
+                k, _, v = h.decode("latin-1").partition(":")
+                hdrs[k.strip().lower()] = v.strip()
+            body = st.read(int(hdrs["content-length"])) if "content-length" in hdrs else st.read_until(b"\xff\xd9")
+            now = time.time() * 1000.0
+            if "x-frame-seq" not in hdrs: continue   # placeholder frame before the first real one
+            total.add(hdrs, len(body), now, last_seq)
+            last_seq = win.add(hdrs, len(body), now, last_seq)
+            if time.monotonic() - win.t0 >= args.every:
+                _report(win.result(), args.json); win = Window()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        c.close()
+    if not args.json: print("total:", end=" ")
+    _report(total.result(), args.json)
+
+
+def _report(res, as_json):
+    if as_json:
+        print(json.dumps(res), flush=True); return
+    def p(k): s = res[k]; return f"{s['p50']}/{s['p99']}" if s["n"] else "-"
+    print(f"{res['fps']:6.1f} fps  drops {res['drops']:4d}  g2g {p('g2g_ms')} ms  queue {p('queue_ms')} ms  "
+          f"net {p('net_ms')} ms  ({res['mbps']} Mbit/s, p50/p99)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
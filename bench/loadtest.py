@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# bench/loadtest.py — MJPEG fan-out + capture-burst load test against CameraServer
+#
+# Starts CameraServer on the synthetic camera (CAMERA_SYNTH, see synthcam.py), opens
+# N /video_feed viewers (fast, plus optional throttled "slow Wi-Fi" ones), fires
+# /capture bursts, and samples the server's CPU / RSS from /proc. Results go to a
+# JSON file so runs can be compared (e.g. UVC_FPS / JPEG_QUALITY / thread count).
+#
+# usage:
+#   python3 bench/loadtest.py --viewers 16 --slow 4 --seconds 20 --captures 5
+#   python3 bench/loadtest.py --env JPEG_QUALITY=70 --env UVC_FPS=30 --out q70.json
+#   python3 bench/loadtest.py --cmd "gunicorn CameraServer:app -k gthread --threads 8 -b 127.0.0.1:{port}"
+#   python3 bench/loadtest.py --cmd "uvicorn asgi:app --host 127.0.0.1 --port {port}" --viewers 200
+#   python3 bench/loadtest.py --url http://booth.local:8080 --pid 1234   # already running
+#
+# Per-frame latency uses the per-part X-Capture-Ts header (?meta=1, see bench/latency.py); servers
+# that don't send it still get fps / inter-frame gap numbers.
+import os, sys, json, time, shlex, signal, socket, argparse, threading, subprocess
+import http.client
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def pct(vals, p):
+    if not vals: return None
+    s = sorted(vals)
+    k = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return round(s[k], 3)
+
+
+def summary(vals):
+    return {"n": len(vals), "p50": pct(vals, 50), "p90": pct(vals, 90), "p99": pct(vals, 99),
+            "max": round(max(vals), 3) if vals else None}
+
+
+# ---------- server process ----------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port):
+    env = dict(os.environ, PORT=str(port), CAMERA_SYNTH=args.synth, SYNTH_FPS=str(args.synth_fps),
+               PYTHONUNBUFFERED="1")
+    w, h = args.synth_size.lower().split("x")
+    env.update(SYNTH_W=w, SYNTH_H=h)
+    for kv in args.env:
+        k, _, v = kv.partition("=")
+        env[k] = v
+    cmd = shlex.split(args.cmd.format(port=port)) if args.cmd else [sys.executable, "CameraServer.py"]
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+
+def wait_ready(base, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            st, _ = request(base, "GET", "/api/health", timeout=2)
+            if st == 200: return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def stop_server(proc):
+    if proc is None or proc.poll() is not None: return
+    try: os.killpg(proc.pid, signal.SIGTERM)
+    except OSError: pass
+    try: proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+# ---------- /proc sampling (server + children: gunicorn workers, rendition pool) ----------
+
+def _stat(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        raw = f.read()
+    rest = raw[raw.rindex(")") + 2:].split()
+    return int(rest[1]), int(rest[11]) + int(rest[12])   # ppid, utime+stime
+
+
+def _rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"): return int(line.split()[1])
+    return 0
+
+
+def proc_tree(root):
+    kids = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit(): continue
+        try: ppid, _ = _stat(int(d))
+        except (OSError, ValueError, IndexError): continue
+        kids.setdefault(ppid, []).append(int(d))
+    out, todo = [], [root]
+    while todo:
+        p = todo.pop(); out.append(p); todo += kids.get(p, [])
+    return out
+
+
+class ProcSampler(threading.Thread):
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.samples = []   # (t, cpu ticks, rss kb)
+        self.stop_evt = threading.Event()
+
+    def sample(self):
+        ticks = rss = 0
+        for p in proc_tree(self.pid):
+            try:
+                ticks += _stat(p)[1]; rss += _rss_kb(p)
+            except (OSError, ValueError, IndexError):
+                pass
+        return time.monotonic(), ticks, rss
+
+    def run(self):
+        while not self.stop_evt.is_set():
+            self.samples.append(self.sample())
+            self.stop_evt.wait(self.interval)
+
+    def result(self):
+        s = self.samples
+        if len(s) < 2: return None
+        cpu = [100.0 * (b[1] - a[1]) / CLK_TCK / (b[0] - a[0]) for a, b in zip(s, s[1:]) if b[0] > a[0]]
+        return {"cpu_pct_avg": round(100.0 * (s[-1][1] - s[0][1]) / CLK_TCK / (s[-1][0] - s[0][0]), 2),
+                "cpu_pct_p90": pct(cpu, 90), "cpu_pct_max": round(max(cpu), 2) if cpu else None,
+                "rss_mb_max": round(max(x[2] for x in s) / 1024.0, 1), "rss_mb_end": round(s[-1][2] / 1024.0, 1),
+                "samples": len(s)}
+
+
+# ---------- clients ----------
+
+def request(base, method, path, body=None, timeout=10.0):
+    u = urlsplit(base)
+    c = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=timeout)
+    try:
+        hdr = {"Content-Type": "application/json"} if body is not None else {}
+        c.request(method, path, body=json.dumps(body) if body is not None else None, headers=hdr)
+        r = c.getresponse()
+        return r.status, r.read()
+    finally:
+        c.close()
+
+
+class Viewer(threading.Thread):
+    """One /video_feed client; fps > 0 throttles reads to simulate a slow link."""
+
+    def __init__(self, base, path, fps, stop, warmup):
+        super().__init__(daemon=True)
+        self.base, self.path, self.fps, self.stop_evt, self.warmup = base, path, fps, stop, warmup
+        self.frames, self.bytes, self.gaps, self.lat, self.error = 0, 0, [], [], None
+        self.t_first = self.t_last = None
+
+    def run(self):
+        u = urlsplit(self.base)
+        try:
+            c = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+            c.request("GET", self.path)
+            r = c.getresponse()
+            if r.status != 200:
+                self.error = f"http {r.status}"; return
+            self._read(r)
+        except Exception as e:
+            if not self.stop_evt.is_set(): self.error = str(e)
+
+    def _read(self, r):
+        interval = 1.0 / self.fps if self.fps > 0 else 0.0
+        nxt = time.monotonic()
+        st = _Stream(r)
+        while not self.stop_evt.is_set():
+            line = st.readline()
+            if not line: break
+            if not line.startswith(b"--frame"): continue
+            hdrs = {}
+            while True:
+                h = st.readline()
+                if not h or h in (b"\r\n", b"\n"): break
+                k, _, v = h.decode("latin-1").partition(":")
+                hdrs[k.strip().lower()] = v.strip()
+            # no Content-Length → the part ends at the JPEG end-of-image marker
+            body = st.read(int(hdrs["content-length"])) if "content-length" in hdrs else st.read_until(b"\xff\xd9")
+            now = time.time()
+            if time.monotonic() < self.warmup: continue
+            self.frames += 1; self.bytes += len(body)
+            mono = time.monotonic()
+            if self.t_last is not None: self.gaps.append((mono - self.t_last) * 1000.0)
+            self.t_first = self.t_first or mono; self.t_last = mono
+            ts = hdrs.get("x-capture-ts")
+            if ts:
+                try: self.lat.append(now * 1000.0 - float(ts))
+                except ValueError: pass
+            if interval:
+                nxt += interval; d = nxt - time.monotonic()
+                if d > 0: time.sleep(d)
+                else: nxt = time.monotonic()
+
+    def result(self, seconds):
+        dur = (self.t_last - self.t_first) if self.t_first and self.t_last and self.t_last > self.t_first else seconds
+        return {"fps": round(self.frames / dur, 2) if self.frames > 1 else 0.0, "frames": self.frames,
+                "mbps": round(self.bytes * 8 / 1e6 / max(dur, 1e-6), 2), "throttle_fps": self.fps or None,
+                "gap_ms": summary(self.gaps), "latency_ms": summary(self.lat) if self.lat else None,
+                "error": self.error}
+
+
+class _Stream:
+    """Buffered reader over HTTPResponse.read1 (which undoes chunked transfer encoding)."""
+
+    def __init__(self, resp):
+        self.resp, self.buf = resp, bytearray()
+
+    def _fill(self) -> bool:
+        chunk = self.resp.read1(65536)
+        self.buf += chunk
+        return bool(chunk)
+
+    def readline(self) -> bytes:
+        while b"\n" not in self.buf:
+            if not self._fill(): break
+        i = self.buf.find(b"\n")
+        n = i + 1 if i >= 0 else len(self.buf)
+        out = bytes(self.buf[:n]); del self.buf[:n]
+        return out
+
+    def read(self, n) -> bytes:
+        while len(self.buf) < n:
+            if not self._fill(): break
+        out = bytes(self.buf[:n]); del self.buf[:n]
+        return out
+
+    def read_until(self, marker) -> bytes:
+        start = 0
+        while True:
+            i = self.buf.find(marker, start)
+            if i >= 0: return self.read(i + len(marker))
+            start = max(0, len(self.buf) - len(marker) + 1)
+            if not self._fill(): return self.read(len(self.buf))
+
+
+def capture_bursts(base, n, interval, bursts, gap, out):
+    """bursts × n POST /capture (interval apart), then time until the image is downloadable."""
+    for b in range(bursts):
+        for _ in range(n):
+            t0 = time.monotonic()
+            try:
+                st, body = request(base, "POST", "/capture", body={"offset_ms": 0}, timeout=30)
+                t1 = time.monotonic()
+                rec = {"status": st, "ms": round((t1 - t0) * 1000.0, 1)}
+                if st == 200:
+                    url = json.loads(body).get("url")
+                    if url:
+                        st2, img = request(base, "GET", url, timeout=30)
+                        rec.update(file_ms=round((time.monotonic() - t0) * 1000.0, 1), file_status=st2, bytes=len(img))
+            except Exception as e:
+                rec = {"status": None, "error": str(e)}
+            out.append(rec)
+            time.sleep(interval)
+        if b < bursts - 1: time.sleep(gap)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1] if __doc__ else None)
+    ap.add_argument("--viewers", type=int, default=8, help="fast /video_feed clients")
+    ap.add_argument("--slow", type=int, default=0, help="extra throttled clients")
+    ap.add_argument("--slow-fps", type=float, default=5.0)
+    ap.add_argument("--feed", default="/video_feed", help="stream path (e.g. /cams/synth/video_feed)")
+    ap.add_argument("--variant", default="", help="query for the feed, e.g. 'w=640&q=60'")
+    ap.add_argument("--seconds", type=float, default=15.0)
+    ap.add_argument("--warmup", type=float, default=2.0, help="seconds ignored at the start")
+    ap.add_argument("--captures", type=int, default=3, help="captures per burst (0 = none)")
+    ap.add_argument("--bursts", type=int, default=2)
+    ap.add_argument("--capture-interval", type=float, default=0.5)
+    ap.add_argument("--burst-gap", type=float, default=3.0)
+    ap.add_argument("--synth", default="pattern", help="CAMERA_SYNTH for the spawned server")
+    ap.add_argument("--synth-size", default="1920x1080")
+    ap.add_argument("--synth-fps", type=float, default=60.0)
+    ap.add_argument("--env", action="append", default=[], help="KEY=VAL for the spawned server (repeatable)")
+    ap.add_argument("--cmd", default=None, help="server command, {port} is substituted (default: python CameraServer.py)")
+    ap.add_argument("--port", type=int, default=0, help="port for the spawned server (default: free port)")
+    ap.add_argument("--url", default=None, help="test an already running server instead of spawning one")
+    ap.add_argument("--pid", type=int, default=None, help="server pid for CPU/RSS when using --url")
+    ap.add_argument("--server-log", default=None, help="write the spawned server's output here")
+    ap.add_argument("--out", default=None, help="JSON results file (default: bench/results/loadtest-<time>.json)")
+    args = ap.parse_args()
+
+    proc, pid = None, args.pid
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        port = args.port or free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = start_server(args, port); pid = proc.pid
+    try:
+        if not wait_ready(base):
+            print(json.dumps({"ok": False, "error": f"server not ready at {base}"})); return 2
+
+        sampler = ProcSampler(pid) if pid and os.path.isdir(f"/proc/{pid}") else None
+        q = "&".join(x for x in ("meta=1&autoconfirm=1", args.variant) if x)
+        path = f"{args.feed}?{q}"
+        stop = threading.Event()
+        warm = time.monotonic() + args.warmup
+        viewers = [Viewer(base, path, 0.0, stop, warm) for _ in range(args.viewers)] + \
+                  [Viewer(base, path, args.slow_fps, stop, warm) for _ in range(args.slow)]
+        for v in viewers: v.start()
+        time.sleep(args.warmup)
+        if sampler: sampler.start()
+
+        caps = []
+        ct = None
+        if args.captures > 0:
+            ct = threading.Thread(target=capture_bursts, daemon=True,
+                                  args=(base, args.captures, args.capture_interval, args.bursts, args.burst_gap, caps))
+            ct.start()
+        time.sleep(args.seconds)
+        if ct: ct.join(timeout=60)
+        if sampler: sampler.stop_evt.set(); sampler.join(timeout=2)
+        stop.set()
+        try: _, health = request(base, "GET", "/api/health", timeout=5); health = json.loads(health)
+        except Exception: health = None
+
+        fast = [v.result(args.seconds) for v in viewers[:args.viewers]]
+        slow = [v.result(args.seconds) for v in viewers[args.viewers:]]
+        lat_all = [x for v in viewers[:args.viewers] for x in v.lat]
+        ok_caps = [c for c in caps if c.get("status") == 200]
+        res = {
+            "ok": True,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out",)},
+            "server": {"base": base, "proc": sampler.result() if sampler else None,
+                       "encoder": (health or {}).get("encoder"), "frames": (health or {}).get("frames")},
+            "viewers": {
+                "fast": {"n": len(fast), "fps_min": min((r["fps"] for r in fast), default=None),
+                         "fps_avg": round(sum(r["fps"] for r in fast) / len(fast), 2) if fast else None,
+                         "mbps_total": round(sum(r["mbps"] for r in fast), 2),
+                         "latency_ms": summary(lat_all) if lat_all else None,
+                         "errors": [r["error"] for r in fast if r["error"]]},
+                "slow": {"n": len(slow), "fps_avg": round(sum(r["fps"] for r in slow) / len(slow), 2) if slow else None,
+                         "errors": [r["error"] for r in slow if r["error"]]},
+                "per_viewer": fast + slow,
+            },
+            "captures": {"n": len(caps), "ok": len(ok_caps),
+                         "busy_429": sum(1 for c in caps if c.get("status") == 429),
+                         "response_ms": summary([c["ms"] for c in ok_caps]),
+                         "file_ms": summary([c["file_ms"] for c in ok_caps if "file_ms" in c]),
+                         "all": caps},
+        }
+        out = args.out or os.path.join(ROOT, "bench", "results", time.strftime("loadtest-%Y%m%d-%H%M%S.json"))
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(res, f, indent=1)
+        brief = {k: res[k] for k in ("server", "captures")}
+        brief["captures"] = {k: v for k, v in brief["captures"].items() if k != "all"}
+        brief["viewers"] = {k: v for k, v in res["viewers"].items() if k != "per_viewer"}
+        print(json.dumps(brief, indent=1))
+        print(f"[loadtest] results → {out}", file=sys.stderr)
+        return 0
+    finally:
+        stop_server(proc)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
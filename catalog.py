@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# catalog.py — persistent index of captured files (SQLite, one row per capture)
+#
+# Rows are added when a capture is taken and updated once its file is on disk,
+# so listing / "delete most recent" never has to glob + stat the save dir.
+# If the database is missing (or unreadable) it is rebuilt from the directory.
+import os, sqlite3, threading, time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    rel      TEXT NOT NULL UNIQUE,       -- path relative to the save dir
+    session  TEXT,
+    engine   TEXT,
+    size     INTEGER,                    -- NULL until the file is written
+    created  REAL NOT NULL,              -- capture time (epoch s)
+    written  REAL                        -- file persisted (epoch s)
+);
+CREATE INDEX IF NOT EXISTS captures_created ON captures(created);
+CREATE INDEX IF NOT EXISTS captures_session ON captures(session);
+"""
+
+_COLS = "id, rel, session, engine, size, created, written"
+
+
+class CaptureCatalog:
+    def __init__(self, root: str, db_path: Optional[str] = None, skip_dirs: Iterable[str] = ()):
+        self.root = os.path.abspath(root)
+        # default sits beside root, not in it: root is usually served over HTTP
+        self.db_path = db_path or os.path.join(os.path.dirname(self.root), f".{os.path.basename(self.root)}.catalog.sqlite3")
+        self.skip_dirs = {os.path.abspath(d) for d in skip_dirs}
+        self._lock = threading.Lock()
+        fresh = not os.path.exists(self.db_path)
+        try:
+            self._db = self._open()
+        except sqlite3.DatabaseError:
+            # corrupt → keep it for inspection and start over from the directory
+            os.replace(self.db_path, self.db_path + f".corrupt-{int(time.time())}")
+            self._db, fresh = self._open(), True
+        if fresh:
+            self.rebuild()
+
+    def _open(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    def rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def abspath(self, rel: str) -> str:
+        return os.path.join(self.root, *rel.split("/"))
+
+    # ---- writes
+    def add(self, path: str, session: Optional[str] = None, engine: Optional[str] = None,
+            created: Optional[float] = None, size: Optional[int] = None) -> int:
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR REPLACE INTO captures(rel, session, engine, size, created, written) VALUES (?,?,?,?,?,?)",
+                (self.rel(path), session, engine, size, created or time.time(), time.time() if size is not None else None))
+            return int(cur.lastrowid)
+
+    def mark_written(self, path: str, size: int):
+        with self._lock:
+            self._db.execute("UPDATE captures SET size=?, written=? WHERE rel=?", (size, time.time(), self.rel(path)))
+
+    def remove(self, paths: Iterable[str]):
+        rels = [(self.rel(p),) for p in paths]
+        if not rels: return
+        with self._lock, self._tx():
+            self._db.executemany("DELETE FROM captures WHERE rel=?", rels)
+
+    @contextmanager
+    def _tx(self):
+        # autocommit connection → explicit transaction for bulk statements
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK"); raise
+        self._db.execute("COMMIT")
+
+    # ---- reads
+    def count(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM captures").fetchone()[0])
+
+    def recent(self, n: int) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT rel FROM captures ORDER BY created DESC, id DESC LIMIT ?", (int(n),)).fetchall()
+        return [self.abspath(r[0]) for r in rows]
+
+    def total_size(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM captures").fetchone()[0])
+
+    def oldest(self, n: int, before: Optional[float] = None) -> List[Tuple[str, Optional[int], float]]:
+        """Oldest written captures -> [(abspath, size, created)]; pending writes are never returned."""
+        q, args = "SELECT rel, size, created FROM captures WHERE written IS NOT NULL", []
+        if before is not None: q += " AND created < ?"; args.append(float(before))
+        q += " ORDER BY created ASC, id ASC LIMIT ?"; args.append(int(n))
+        with self._lock:
+            rows = self._db.execute(q, args).fetchall()
+        return [(self.abspath(r), sz, c) for r, sz, c in rows]
+
+    def page(self, limit: int = 50, before_id: Optional[int] = None, session: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        """Newest first, keyset-paginated on id -> (items, next cursor or None)."""
+        q, args = f"SELECT {_COLS} FROM captures WHERE 1=1", []
+        if before_id is not None: q += " AND id < ?"; args.append(int(before_id))
+        if session: q += " AND session = ?"; args.append(session)
+        q += " ORDER BY id DESC LIMIT ?"; args.append(int(limit) + 1)
+        with self._lock:
+            rows = self._db.execute(q, args).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [dict(zip(("id", "rel", "session", "engine", "size", "created", "written"), r)) for r in rows]
+        return items, (items[-1]["id"] if more and items else None)
+
+    # ---- recovery
+    def _scan(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames
+                           if not d.startswith(".") and os.path.join(dirpath, d) not in self.skip_dirs]
+            for fn in filenames:
+                if fn.startswith(".") or fn.endswith(".part"): continue
+                yield os.path.join(dirpath, fn)
+
+    def rebuild(self) -> int:
+        rows = []
+        for p in self._scan():
+            try: st = os.stat(p)
+            except OSError: continue
+            rows.append((self.rel(p), None, None, st.st_size, st.st_mtime, st.st_mtime))
+        rows.sort(key=lambda r: r[4])  # ids follow capture order
+        with self._lock, self._tx():
+            self._db.execute("DELETE FROM captures")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO captures(rel, session, engine, size, created, written) VALUES (?,?,?,?,?,?)", rows)
+        return len(rows)
@@ -4,6 +4,7 @@
 import { useState, useEffect, useRef, useMemo } from "react";
 import { useRouter, usePathname } from "next/navigation";
 import { client } from "@/lib/photoboothClient";
+import { openCameraSocket } from "@/lib/cameraSocket";
 import { Button } from "@/components/ui/button";
 import {
   Dialog,
@@ -25,6 +26,8 @@ const MAX_PHOTOS = 2;
 const CHE_OFFSET_MS = Number(process.env.NEXT_PUBLIC_CHE_OFFSET_MS ?? 0) || 0;
 // Mirror live preview like a selfie (does not affect saved photo)
 const LIVE_MIRROR = (process.env.NEXT_PUBLIC_LIVE_MIRROR ?? "true").toLowerCase() === "true";
+// Live preview transport: "mjpeg" (<img> on /video_feed, default) or "ws" (credit-based /video_ws on a <canvas>)
+const LIVE_WS = (process.env.NEXT_PUBLIC_LIVE_TRANSPORT || "mjpeg").toLowerCase() === "ws";
 // Edge flash effect config (color & thickness)
 const EDGE_COLOR = (process.env.NEXT_PUBLIC_SHUTTER_EDGE_COLOR || "#22d3ee").trim();
 const EDGE_THICKNESS = Number(process.env.NEXT_PUBLIC_SHUTTER_EDGE_PX ?? 100) || 100;
@@ -81,6 +84,7 @@ export default function PhotoboothInterface({ user, onLogout }) {
   const [liveSrc, setLiveSrc] = useState(null);
   const [liveLoading, setLiveLoading] = useState(true);
   const liveImgRef = useRef(null);
+  const liveCanvasRef = useRef(null);
 
   // ให้ Loader ค้างครอบแบล็คเฟรมสักครู่ (เพื่อกันกระพริบ)
   const suppressOnLoadUntil = useRef(0);
@@ -105,6 +109,28 @@ export default function PhotoboothInterface({ user, onLogout }) {
     try { triggerShutterFX(); } catch {}
   };
 
+  // ===== Camera-server clock offset (shutter_ts is sent on the server's clock) =====
+  // NTP-style round trips to /api/time: offset = server_ms − midpoint, lowest-RTT sample wins.
+  // Error is bounded by rtt/2, independent of how long the /capture request itself takes.
+  const clockRef = useRef(null); // { offset, rtt }
+  const syncClock = async (samples = 5) => {
+    if (!CAMERA_BASE) return;
+    let best = null;
+    for (let i = 0; i < samples; i++) {
+      try {
+        const t0 = Date.now();
+        const r = await fetch(`${CAMERA_BASE}/api/time`, { cache: "no-store" });
+        const t1 = Date.now();
+        const { server_ms } = await r.json();
+        if (typeof server_ms === "number" && (!best || t1 - t0 < best.rtt)) {
+          best = { offset: server_ms - (t0 + t1) / 2, rtt: t1 - t0 };
+        }
+      } catch {}
+    }
+    if (best) clockRef.current = best;
+  };
+  useEffect(() => { syncClock(); }, []);
+
   // ===== Retry/backoff for live preview + warm-up guard =====
   const retryRef = useRef({ tries: 0, timer: null });
   const liveStartAtRef = useRef(0);
@@ -216,6 +242,22 @@ export default function PhotoboothInterface({ user, onLogout }) {
     }
   };
 
+  // /capture returns before the file is saved; upload + print read serverPath straight from disk
+  const waitWrittenOnServer = async (paths) => {
+    if (!CAMERA_BASE || !paths?.length) return;
+    try {
+      const r = await fetch(`${CAMERA_BASE}/api/wait_written`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ paths, timeout: 15 }),
+      });
+      const j = await r.json().catch(() => ({}));
+      if (!j?.ok) console.warn("wait_written: not all captures saved", j?.written);
+    } catch (e) {
+      console.warn("wait_written failed:", e);
+    }
+  };
+
   const initLiveFirstTime = useRef(null);
   initLiveFirstTime.current = async () => {
     setLiveLoading(true);
@@ -266,11 +308,38 @@ export default function PhotoboothInterface({ user, onLogout }) {
     reloadLive(nextDelay);
   };
 
+  // ===== WebSocket live view (LIVE_WS): liveSrc changes = (re)connect, same retry path as <img> =====
+  const liveHandlersRef = useRef(null);
+  liveHandlersRef.current = { onLiveLoad, onLiveError };
+  useEffect(() => {
+    if (!LIVE_WS || !CAMERA_BASE || !liveSrc || capturedImage) return;
+    let first = true;
+    let done = false;
+    const cam = openCameraSocket(CAMERA_BASE, {
+      query: { autoconfirm: 1, session: SESSION_KEY },
+      onFrame: ({ bitmap }) => {
+        const c = liveCanvasRef.current;
+        if (c && !done) {
+          if (c.width !== bitmap.width || c.height !== bitmap.height) {
+            c.width = bitmap.width;
+            c.height = bitmap.height;
+          }
+          c.getContext("2d").drawImage(bitmap, 0, 0);
+        }
+        try { bitmap.close(); } catch {}
+        if (first && !done) { first = false; liveHandlersRef.current.onLiveLoad(); }
+      },
+      onClose: () => { if (!done) liveHandlersRef.current.onLiveError(); },
+    });
+    return () => { done = true; cam.close(); };
+  }, [liveSrc, capturedImage, SESSION_KEY]);
+
   // ===== Photo flow: overlay -> countdown -> capture =====
   const startPhotoshoot = () => {
     if (shooting || busy) return;
     setShooting(true);
     setPreMessage(true);
+    syncClock(); // refresh the offset during the pre-message, well before zero
 
     setTimeout(() => {
       setPreMessage(false);
@@ -287,7 +356,7 @@ export default function PhotoboothInterface({ user, onLogout }) {
         else {
           setCountdown("📸");
           setCountdown(null);
-          handleCapture();
+          handleCapture(Date.now());
           clearInterval(timer);
         }
       }, 1000);
@@ -295,7 +364,8 @@ export default function PhotoboothInterface({ user, onLogout }) {
   };
 
   // ===== Capture with hard-timeout + session (zero‑lag ordering) =====
-  const handleCapture = async () => {
+  // zeroAt = Date.now() when the countdown hit zero → server picks the matching frame (UVC)
+  const handleCapture = async (zeroAt = Date.now()) => {
     if (!CAMERA_BASE || !SESSION_KEY) return;
     setBusy(true);
 
@@ -311,11 +381,17 @@ export default function PhotoboothInterface({ user, onLogout }) {
         await new Promise((r) => setTimeout(r, Math.min(1200, Math.abs(CHE_OFFSET_MS))));
       }
 
-      // Start capture request
+      // Start capture request — zero on the server clock; without a sync the server falls
+      // back to offset_ms from request arrival (includes the request's one-way latency).
+      // clock_err_ms (half the sync RTT) widens the server's wait for the frame at zero.
+      const clk = clockRef.current;
+      const timing = clk
+        ? { shutter_ts: zeroAt + clk.offset, clock_err_ms: clk.rtt / 2 }
+        : { offset_ms: zeroAt - Date.now() };
       const capPromise = fetch(`${CAMERA_BASE}/capture`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ session: SESSION_KEY }),
+        body: JSON.stringify({ session: SESSION_KEY, ...timing }),
         signal: ctrl.signal,
       });
 
@@ -417,6 +493,7 @@ export default function PhotoboothInterface({ user, onLogout }) {
         } catch {}
         setLiveSrc(null);
         await stopCamera().catch(() => {});
+        await waitWrittenOnServer(nextPaths);
         await uploadBatchAndGo(nextPaths);
 
         // Print
@@ -510,7 +587,14 @@ export default function PhotoboothInterface({ user, onLogout }) {
         )}
 
         {!capturedImage ? (
-          liveSrc ? (
+          liveSrc && LIVE_WS ? (
+            <canvas
+              ref={liveCanvasRef}
+              aria-label="Live preview"
+              className={`w-full h-full ${objectClass} select-none transform`}
+              style={{ transform: LIVE_MIRROR ? 'scaleX(-1)' : undefined }}
+            />
+          ) : liveSrc ? (
             <img
               ref={liveImgRef}
               src={liveSrc ?? undefined}
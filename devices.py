@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# devices.py — in-process cache of attached cameras (UVC nodes + gphoto ports)
+#
+# The watcher (hotplug events / resync) and the explicit probe / reset routes call
+# refresh(); every other route reads the cached lists in O(1). Readers never scan, not
+# even in the background — a USB / gphoto autodetect must not overlap a capture. A
+# snapshot older than `ttl` (e.g. watcher not running under gunicorn) is still returned;
+# it is logged once and reported as stale in info().
+import threading, time
+from typing import Callable, List, Optional, Tuple
+
+
+class DeviceRegistry:
+    def __init__(self, scan_uvc: Callable[[], List[str]], scan_gphoto: Callable[[], List[Tuple[str, str]]],
+                 ttl: float = 120.0, log: Callable[[str], None] = print):
+        self._scan_uvc, self._scan_gphoto = scan_uvc, scan_gphoto
+        self.ttl = float(ttl)
+        self.log = log
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stale_logged = False
+        self._uvc: Tuple[str, ...] = ()
+        self._gphoto: Tuple[Tuple[str, str], ...] = ()
+        self._updated: Optional[float] = None
+        self.refreshes = 0
+
+    # ---- writers (watcher / probe)
+    def refresh(self) -> bool:
+        """Rescan both buses -> True if the device set changed."""
+        with self._refreshing:
+            uvc = tuple(self._scan_uvc())
+            gph = tuple((str(m), str(p)) for m, p in self._scan_gphoto())
+            with self._lock:
+                changed = self._updated is None or set(uvc) != set(self._uvc) or \
+                          set(p for _, p in gph) != set(p for _, p in self._gphoto)
+                self._uvc, self._gphoto, self._updated = uvc, gph, time.time()
+                self.refreshes += 1
+                self._stale_logged = False
+            return changed
+
+    # ---- readers (routes)
+    def _stale(self) -> bool:
+        # caller holds _lock
+        return self._updated is None or time.time() - self._updated > self.ttl
+
+    def _check_ttl(self):
+        with self._lock:
+            if not self._stale() or self._stale_logged: return
+            self._stale_logged = True
+            age = "never scanned" if self._updated is None else f"{time.time() - self._updated:.0f}s old"
+        self.log(f"[DEVICES] device list is stale ({age}); is the watcher running?")
+
+    @property
+    def uvc(self) -> List[str]:
+        self._check_ttl()
+        with self._lock:
+            return list(self._uvc)
+
+    @property
+    def gphoto(self) -> List[Tuple[str, str]]:
+        self._check_ttl()
+        with self._lock:
+            return list(self._gphoto)
+
+    def has_gphoto(self, port: Optional[str] = None) -> bool:
+        cams = self.gphoto
+        return any(p == port for _, p in cams) if port else bool(cams)
+
+    def info(self) -> dict:
+        with self._lock:
+            age = None if self._updated is None else round(time.time() - self._updated, 3)
+            return {"uvc": list(self._uvc), "gphoto": [{"model": m, "port": p} for m, p in self._gphoto],
+                    "age_s": age, "ttl_s": self.ttl, "stale": self._stale(), "refreshes": self.refreshes}
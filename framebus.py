@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# framebus.py — latest-frame fan-out shared by CameraServer / usbcam / pisci producers
+#
+# One producer calls publish(); any number of viewers hold a Subscriber.
+# Each subscriber remembers the last version it was handed, so wait() returns
+# exactly once per new frame and otherwise sleeps on a Condition (no polling).
+#
+# Variants (e.g. w=640,q=60) are rendered lazily by the first subscriber that
+# needs a given frame version and cached for the rest; a variant with no
+# subscribers is dropped and costs nothing.
+#
+# Producers with pixels (UVC) may publish_raw() instead of publish(): the native
+# JPEG is then encoded only when a viewer / snapshot / capture asks for that
+# version, so an unwatched camera costs a sensor read and nothing else.
+#
+# Subscriber.wait_async() is the asyncio flavour of wait(): the coroutine parks on
+# one future per event loop (a publish costs one call_soon_threadsafe per loop, not
+# per viewer) and encodes go to the loop's default executor.
+import asyncio, threading, time
+from contextlib import nullcontext
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Variant:
+    __slots__ = ("key", "refs", "lock", "ver", "data")
+
+    def __init__(self, key):
+        self.key = key
+        self.refs = 0
+        self.lock = threading.Lock()
+        self.ver = -1
+        self.data: Optional[bytes] = None
+
+
+class _LoopWaker:
+    """Per event loop: every coroutine waiting on the bus awaits one shared future.
+
+    Only a publish / close resolves it, so parked viewers stay asleep while no frames
+    arrive; a wait_async() timeout is the waiter's own deadline, not a wake-up here.
+    """
+    __slots__ = ("loop", "fut", "armed", "encodes")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.fut = None
+        self.armed = False
+        self.encodes = {}   # (variant, version) -> executor future shared by this loop's viewers
+
+    def future(self):
+        # loop thread only; armed before the caller checks the bus so a publish can't slip past
+        if self.fut is None or self.fut.done(): self.fut = self.loop.create_future()
+        self.armed = True
+        return self.fut
+
+    def fire(self):
+        f, self.fut, self.armed = self.fut, None, False
+        if f is not None and not f.done(): f.set_result(None)
+
+
+class SlotLock:
+    """A ring slot's lock plus its rewrite generation.
+
+    FrameRing.next() bumps gen before the producer takes the lock to overwrite the
+    slot, so a reader holding the lock can tell whether the pixels are still the
+    ones it claimed (see FrameBroadcaster.publish_raw).
+    """
+    __slots__ = ("_lock", "gen")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.gen = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+class FrameRing:
+    """N reusable, timestamped frame slots; the oldest slot is overwritten first.
+
+    With n=2 this is a plain double buffer. Each slot has a lock held by the
+    producer while writing into the array and by readers while encoding or
+    copying from it, so a slot is never overwritten mid-read. Larger rings keep
+    the last n frames around for zero-shutter-lag captures (copy_closest()).
+    """
+
+    def __init__(self, n: int = 2, arrs=None):
+        n = max(2, int(n))
+        self._arrs = list(arrs)[:n] if arrs else []
+        self._arrs += [None] * (n - len(self._arrs))
+        self._locks = [SlotLock() for _ in range(n)]
+        self._ts: List[Optional[float]] = [None] * n
+        self._meta = threading.Lock()
+        self._w = -1
+
+    def __len__(self): return len(self._arrs)
+
+    def next(self):
+        """-> (index, preallocated array or None, slot lock) for the next write."""
+        with self._meta:
+            self._w = i = (self._w + 1) % len(self._arrs)
+            self._ts[i] = None  # not readable until commit()
+            self._locks[i].gen += 1   # claims on the old contents are stale from here on
+            return i, self._arrs[i], self._locks[i]
+
+    def commit(self, i: int, arr, ts: float):
+        # the capture backend may hand back a fresh array (size change) — reuse it next time
+        with self._meta:
+            self._arrs[i] = arr
+            self._ts[i] = ts
+
+    def newest_ts(self) -> Optional[float]:
+        with self._meta:
+            return max((t for t in self._ts if t is not None), default=None)
+
+    def copy_closest(self, ts: float) -> Optional[Tuple[object, float]]:
+        """Copy of the committed frame nearest to ts -> (frame, frame_ts), or None."""
+        for _ in range(len(self._arrs)):
+            with self._meta:
+                cands = [(abs(t - ts), i, t) for i, t in enumerate(self._ts) if t is not None]
+            if not cands: return None
+            _, i, t = min(cands)
+            with self._locks[i]:
+                with self._meta:
+                    if self._ts[i] != t: continue  # overwritten while we waited → pick again
+                    arr = self._arrs[i]
+                return arr.copy(), t
+        return None
+
+
+class FrameBroadcaster:
+    """Version-tracked single-slot frame buffer with blocking subscribers.
+
+    render(key, jpeg, raw) -> bytes is used for non-default variants; raw is
+    whatever the producer passed alongside the JPEG (e.g. the BGR ndarray).
+    encode(raw) -> bytes produces the native JPEG for publish_raw() frames.
+    """
+
+    def __init__(self, render: Optional[Callable] = None, encode: Optional[Callable] = None):
+        self._cond = threading.Condition(threading.Lock())
+        self._data: Optional[bytes] = None
+        self._raw = None
+        self._raw_lock = None
+        self._raw_gen = None   # raw_lock.gen at publish (ring slots) → stale-claim check
+        self._ver = 0
+        self._ts = 0.0
+        self._cap_ts = self._pub_ts = 0.0   # wall clock (epoch s) of the newest frame
+        self._subs = 0
+        self._closed = False
+        self._render = render
+        self._encode = encode
+        self._native = _Variant(None)
+        self._encodes = 0
+        self._variants: Dict[Hashable, _Variant] = {}
+        self._wakers: Dict[object, _LoopWaker] = {}
+
+    # ---- producer side
+    def publish(self, data: Optional[bytes], raw=None, raw_lock=None, ts: Optional[float] = None):
+        """ts = wall-clock capture time of the frame (epoch s); defaults to now."""
+        now = time.time()
+        with self._cond:
+            self._data = data
+            self._raw = raw
+            self._raw_lock = raw_lock
+            self._raw_gen = getattr(raw_lock, "gen", None)
+            self._ver += 1
+            self._ts = time.monotonic()
+            self._cap_ts, self._pub_ts = (ts if ts is not None else now), now
+            self._cond.notify_all()
+        self._poke()
+
+    def publish_raw(self, raw, raw_lock=None, ts: Optional[float] = None):
+        """Publish pixels only; the native JPEG is encoded on first demand.
+
+        With a FrameRing SlotLock as raw_lock, a reader that gets to the slot after
+        the producer has started rewriting it encodes nothing (never newer pixels
+        under this version's label).
+        """
+        self.publish(None, raw=raw, raw_lock=raw_lock, ts=ts)
+
+    def clear(self):
+        self.publish(None)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._poke()
+
+    def _poke(self):
+        """Wake asyncio waiters: one call_soon_threadsafe per loop that has someone parked."""
+        for loop, w in list(self._wakers.items()):
+            if not w.armed: continue
+            try:
+                loop.call_soon_threadsafe(w.fire)
+            except RuntimeError:   # loop closed
+                with self._cond:
+                    self._wakers.pop(loop, None)
+
+    def _waker(self) -> _LoopWaker:
+        loop = asyncio.get_running_loop()
+        w = self._wakers.get(loop)
+        if w is None:
+            with self._cond:
+                w = self._wakers.setdefault(loop, _LoopWaker(loop))
+        return w
+
+    # ---- reader side
+    @property
+    def version(self) -> int:
+        with self._cond:
+            return self._ver
+
+    @property
+    def subscribers(self) -> int:
+        with self._cond:
+            return self._subs
+
+    def latest(self) -> Tuple[int, Optional[bytes]]:
+        """Newest native JPEG (encoding it now if only pixels were published)."""
+        with self._cond:
+            ver, data, raw, lk, gen = self._ver, self._data, self._raw, self._raw_lock, self._raw_gen
+        if data is None and raw is not None:
+            data = self._native_jpeg(ver, raw, lk, gen)
+        return ver, data
+
+    def latest_raw(self):
+        """(version, raw, raw_lock, jpeg) of the newest frame — nothing is encoded."""
+        with self._cond:
+            return self._ver, self._raw, self._raw_lock, self._data
+
+    def latest_ts(self) -> float:
+        with self._cond:
+            return self._ts
+
+    def wait_newer(self, ver: int, timeout: Optional[float] = None) -> int:
+        """Block until the version moves past ver (no encoding) -> current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._ver > ver or self._closed, timeout)
+            return self._ver
+
+    def wait_for_data(self, timeout: Optional[float] = None) -> bool:
+        """Block until any frame is available (first-frame gate)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._has_frame() or self._closed, timeout) and self._has_frame()
+
+    def _has_frame(self) -> bool:
+        return self._data is not None or self._raw is not None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"published": self._ver, "encoded": self._encodes, "subscribers": self._subs}
+
+    def variants(self) -> List[dict]:
+        with self._cond:
+            return [{"key": v.key, "viewers": v.refs} for v in self._variants.values()]
+
+    def subscribe(self, variant: Optional[Hashable] = None, limit: int = 0,
+                  nearest: Optional[Callable] = None) -> "Subscriber":
+        """variant=None streams the published JPEG as-is.
+
+        limit > 0 caps the number of distinct variants: a new key past it is mapped
+        by nearest(key, live_keys) (native stream if None), decided under the same
+        lock as the registration so concurrent subscribers can't overshoot the cap.
+        """
+        with self._cond:
+            self._subs += 1
+            v = None
+            if variant is not None and limit > 0 and variant not in self._variants and len(self._variants) >= limit:
+                variant = nearest(variant, list(self._variants)) if nearest else None
+            if variant is not None and self._render is not None:
+                v = self._variants.get(variant)
+                if v is None:
+                    v = self._variants[variant] = _Variant(variant)
+                v.refs += 1
+        return Subscriber(self, v)
+
+    def _unsubscribe(self, v: Optional[_Variant]):
+        with self._cond:
+            self._subs = max(0, self._subs - 1)
+            if v is not None:
+                v.refs -= 1
+                if v.refs <= 0:
+                    self._variants.pop(v.key, None)
+
+    def _rendered(self, v: _Variant, ver: int, data: Optional[bytes], raw, raw_lock=None, gen=None) -> Optional[bytes]:
+        # one encode per (variant, version): later viewers reuse the cached bytes
+        with v.lock:
+            if v.ver < ver:
+                try:
+                    with raw_lock or nullcontext():
+                        if _stale(raw_lock, gen): return None
+                        v.data = self._render(v.key, data, raw)
+                except Exception:
+                    v.data = None
+                v.ver = ver
+            return v.data
+
+    def _native_jpeg(self, ver: int, raw, raw_lock=None, gen=None) -> Optional[bytes]:
+        v = self._native
+        with v.lock:
+            if v.ver < ver and self._encode is not None:
+                try:
+                    with raw_lock or nullcontext():
+                        if _stale(raw_lock, gen): return None
+                        v.data = self._encode(raw)
+                except Exception:
+                    v.data = None
+                v.ver = ver
+                with self._cond:
+                    self._encodes += 1
+            return v.data
+
+
+def _stale(raw_lock, gen) -> bool:
+    # caller holds raw_lock: the ring slot was handed out for rewriting after this claim
+    return gen is not None and raw_lock.gen != gen
+
+
+class Subscriber:
+    """One viewer's cursor into a FrameBroadcaster."""
+
+    def __init__(self, bus: FrameBroadcaster, variant: Optional[_Variant] = None):
+        self.bus = bus
+        self.variant = variant
+        self.last_ver = -1
+        self._open = True
+        self.delivered = 0   # frames handed to this viewer
+        self.skipped = 0     # versions published while it was busy elsewhere (never seen)
+        self.meta = (0, 0.0, 0.0)   # (version, capture ts, publish ts) of the last wait() frame
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Return the next unseen frame, or None on timeout / close.
+
+        Cleared slots (publish(None)) advance the version but never wake the
+        caller with an empty frame.
+        """
+        bus = self.bus
+        with bus._cond:
+            if not bus._cond.wait_for(self._ready, timeout): return None
+            got = self._claim()
+        return self._frame(*got) if got else None
+
+    async def wait_async(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """wait() for asyncio: parks the coroutine, never a thread."""
+        bus = self.bus
+        waker = bus._waker()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fut = waker.future()
+            with bus._cond:
+                if self._ready():
+                    got = self._claim(); break
+            if deadline is None:
+                await asyncio.shield(fut)   # shared future: one cancelled viewer must not cancel the rest
+                continue
+            left = deadline - time.monotonic()
+            if left <= 0: return None
+            try: await asyncio.wait_for(asyncio.shield(fut), left)
+            except asyncio.TimeoutError: pass   # one last look at the bus, then None
+        if not got: return None
+        ver, data, raw, lk, gen = got
+        if self.variant is None and data is not None: return data
+        v = self.variant if self.variant is not None else bus._native
+        if v.ver >= ver: return v.data   # already encoded by another viewer
+        key, pend = (v, ver), waker.encodes
+        f = pend.get(key)
+        if f is None:
+            # one executor job per (variant, version) however many viewers are waiting on it
+            f = pend[key] = waker.loop.run_in_executor(None, self._frame, ver, data, raw, lk, gen)
+            f.add_done_callback(lambda _f: pend.pop(key, None))
+        return await asyncio.shield(f)
+
+    # caller holds bus._cond
+    def _ready(self) -> bool:
+        bus = self.bus
+        return bus._closed or not self._open or (bus._ver != self.last_ver and bus._has_frame())
+
+    def _claim(self):
+        bus = self.bus
+        if bus._closed or not self._open: return None
+        ver = bus._ver
+        if self.last_ver >= 0: self.skipped += max(0, ver - self.last_ver - 1)
+        self.last_ver = ver
+        self.delivered += 1
+        self.meta = (ver, bus._cap_ts, bus._pub_ts)
+        return ver, bus._data, bus._raw, bus._raw_lock, bus._raw_gen
+
+    def _frame(self, ver, data, raw, lk, gen=None) -> Optional[bytes]:
+        # None if the ring slot was rewritten before we got to it — a newer version is already out
+        if self.variant is not None:
+            return self.bus._rendered(self.variant, ver, data, raw, lk, gen)
+        if data is None:
+            return self.bus._native_jpeg(ver, raw, lk, gen)
+        return data
+
+    def close(self):
+        if not self._open: return
+        self._open = False
+        self.bus._unsubscribe(self.variant)
+        with self.bus._cond:
+            self.bus._cond.notify_all()
+        self.bus._poke()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# h264live.py — low-bandwidth live view: bus frames → local ffmpeg (libx264) → fMP4 / MPEG-TS
+#
+# For remote monitoring over venue uplinks, where MJPEG at 720p60 costs tens of
+# Mbit/s. One H264Stream per (camera, container) pulls the newest frame from the
+# same bus the MJPEG viewers use at a constant H264_FPS (duplicating when the
+# sensor is slower), pipes raw BGR into ffmpeg and fans the output out to HTTP
+# clients. ffmpeg runs only while someone is subscribed (plus H264_IDLE_S grace).
+#
+#   fMP4 : init segment (ftyp+moov) is kept for late joiners; every fragment
+#          (moof+mdat) starts on a keyframe, so a slow client drops whole
+#          fragments and resumes cleanly at the next one
+#   TS   : fanned out in whole 188-byte packets (pipe reads are re-chunked), so a
+#          dropped chunk never splits a packet; joinable anywhere (decoders resync
+#          on the next IDR)
+#
+# After the last client leaves (plus the grace) the pipeline is retired under the
+# stream lock before ffmpeg is closed; a client that subscribes during teardown
+# starts a fresh ffmpeg and never sees the old one's tail.
+#
+# ffmpeg's stderr is drained continuously (last lines kept for the error message),
+# so a chatty encoder never stalls on a full pipe.
+#
+# The frame source is a callable so this module needs neither cv2 nor numpy:
+#   source(size) -> HxWx3 uint8 BGR array (buffer protocol) at size=(w, h), or None;
+#   size=None asks for the natural output size once, before ffmpeg is started.
+import os, shutil, struct, subprocess, threading, time
+from collections import deque
+from typing import Callable, Optional
+
+FORMATS = {"mp4": "video/mp4", "ts": "video/mp2t"}
+FFMPEG = os.environ.get("FFMPEG", "ffmpeg")
+H264_W = int(os.environ.get("H264_W", "1280"))          # output width (height keeps aspect, even)
+H264_FPS = float(os.environ.get("H264_FPS", "30"))
+H264_KBPS = int(os.environ.get("H264_KBPS", "1500"))
+H264_GOP_S = float(os.environ.get("H264_GOP_S", "1.0"))  # keyframe / fMP4 fragment interval
+H264_IDLE_S = float(os.environ.get("H264_IDLE_S", "5"))  # keep ffmpeg warm this long after the last client
+CLIENT_MAX_CHUNKS = 32
+TS_PACKET = 188
+STDERR_TAIL = 20
+FIRST_FRAME_WAIT_S = 5.0
+
+
+def available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+
+def ffmpeg_cmd(fmt: str, w: int, h: int, fps: float, kbps: int) -> list:
+    gop = max(1, int(round(fps * H264_GOP_S)))
+    cmd = [FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin",
+           "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", f"{fps:g}", "-i", "pipe:0",
+           "-an", "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency", "-pix_fmt", "yuv420p",
+           "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+           "-b:v", f"{kbps}k", "-maxrate", f"{kbps}k", "-bufsize", f"{kbps}k"]
+    if fmt == "mp4":
+        cmd += ["-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof"]
+    else:
+        cmd += ["-f", "mpegts", "-muxdelay", "0", "-muxpreload", "0"]
+    return cmd + ["pipe:1"]
+
+
+def _read_exact(f, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        b = f.read(n - len(buf))
+        if not b: break
+        buf += b
+    return bytes(buf)
+
+
+def mp4_boxes(f):
+    """Top-level ISO-BMFF boxes from a stream -> (type, whole box bytes)."""
+    while True:
+        hdr = _read_exact(f, 8)
+        if len(hdr) < 8: return
+        size, typ = struct.unpack(">I4s", hdr)
+        if size == 1:
+            ext = _read_exact(f, 8)
+            if len(ext) < 8: return
+            size, hdr = struct.unpack(">Q", ext)[0], hdr + ext
+        if size < len(hdr): return   # size 0 ("to end of file") never appears in a fragmented live stream
+        body = _read_exact(f, size - len(hdr))
+        if len(body) < size - len(hdr): return
+        yield typ.decode("latin-1"), hdr + body
+
+
+class Client:
+    """One HTTP client's bounded chunk queue."""
+
+    def __init__(self, stream: "H264Stream"):
+        self.stream = stream
+        self.q = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, chunk: bytes, key: bool):
+        with self.cond:
+            if len(self.q) >= CLIENT_MAX_CHUNKS:
+                # behind: drop what's queued; a keyframe fragment is a clean place to resume
+                if not key: return
+                self.dropped += len(self.q); self.q.clear()
+            self.q.append(chunk)
+            self.cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Next chunk, or None on timeout / end of stream (check .closed)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.q or self.closed, timeout)
+            return self.q.popleft() if self.q else None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.stream._detach(self)
+
+
+class H264Stream:
+    def __init__(self, name: str, source: Callable, fmt: str = "mp4", fps: float = H264_FPS, kbps: int = H264_KBPS):
+        if fmt not in FORMATS: raise ValueError(f"unknown format: {fmt}")
+        self.name, self.source, self.fmt, self.fps, self.kbps = name, source, fmt, fps, kbps
+        self.content_type = FORMATS[fmt]
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._proc: Optional[subprocess.Popen] = None
+        self._starting = False
+        self._init: Optional[bytes] = None    # fMP4 ftyp+moov
+        self._stderr = deque(maxlen=STDERR_TAIL)
+        self._idle_since: Optional[float] = None
+        self.size = None
+        self.bytes_out = self.fragments = self.starts = 0
+        self.error: Optional[str] = None
+
+    # ---- clients
+    def subscribe(self) -> Client:
+        c = Client(self)
+        with self._lock:
+            self._clients.add(c)
+            self._idle_since = None
+            if self._init: c.put(self._init, True)
+            start = self._proc is None and not self._starting
+            if start: self._starting = True
+        if start:
+            try: self._start()
+            finally: self._starting = False
+        return c
+
+    def _detach(self, c: Client):
+        with self._lock:
+            self._clients.discard(c)
+            if not self._clients: self._idle_since = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    # ---- ffmpeg
+    def _start(self):
+        first, deadline = None, time.monotonic() + FIRST_FRAME_WAIT_S
+        while first is None and time.monotonic() < deadline:
+            first = self.source(None)
+            if first is None: time.sleep(0.05)
+        if first is None:
+            self._fail("no frames from camera"); return
+        h, w = first.shape[:2]
+        cmd = ffmpeg_cmd(self.fmt, w, h, self.fps, self.kbps)
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    bufsize=0)
+        except OSError as e:
+            self._fail(f"ffmpeg: {e}"); return
+        with self._lock:
+            self._proc, self._init, self.size, self.error = proc, None, (w, h), None
+            self._stderr.clear()
+            self.starts += 1
+        drain = threading.Thread(target=self._drain, args=(proc,), daemon=True, name=f"h264-err-{self.name}")
+        drain.start()
+        threading.Thread(target=self._feed, args=(proc, first), daemon=True, name=f"h264-feed-{self.name}").start()
+        threading.Thread(target=self._read, args=(proc, drain), daemon=True, name=f"h264-read-{self.name}").start()
+
+    def _feed(self, proc, frame):
+        # constant rate: the newest frame every 1/fps, repeated if the camera hasn't produced a new one
+        interval, nxt = 1.0 / max(1.0, self.fps), time.monotonic()
+        try:
+            while proc.poll() is None:
+                with self._lock:
+                    idle = self._idle_since is not None and time.monotonic() - self._idle_since > H264_IDLE_S
+                    if idle and self._proc is proc:
+                        # retired under the lock: a subscriber from here on starts a fresh ffmpeg
+                        # instead of joining one that is about to close
+                        self._proc, self._init = None, None
+                if idle or self._proc is not proc: break
+                f = self.source(self.size)
+                if f is not None: frame = f
+                proc.stdin.write(memoryview(frame).cast("B"))
+                nxt += interval
+                d = nxt - time.monotonic()
+                if d > 0: time.sleep(d)
+                else: nxt = time.monotonic()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        finally:
+            self._stop_proc(proc)
+
+    def _read(self, proc, drain):
+        out = proc.stdout
+        try:
+            if self.fmt == "mp4":
+                moof = None
+                for typ, box in mp4_boxes(out):
+                    if typ in ("ftyp", "moov"):
+                        with self._lock:
+                            if self._proc is not proc: continue   # retired: its clients are gone
+                            self._init = (self._init or b"") + box
+                            if typ == "moov":
+                                for c in list(self._clients): c.put(self._init, True)
+                    elif typ == "moof":
+                        moof = box
+                    elif typ == "mdat" and moof is not None:
+                        self._fanout(proc, moof + box, True); moof = None
+            else:
+                # unbuffered pipe → reads come back at any length; only whole packets go out
+                buf = bytearray()
+                while True:
+                    chunk = out.read(TS_PACKET * 64)
+                    if not chunk: break
+                    buf += chunk
+                    n = len(buf) - len(buf) % TS_PACKET
+                    if n:
+                        self._fanout(proc, bytes(buf[:n]), False)
+                        del buf[:n]
+        except (OSError, ValueError):
+            pass
+        rc = proc.wait()
+        drain.join(timeout=1.0)   # last stderr lines → error message
+        with self._lock:
+            # still current = ffmpeg died under its clients (a retired one was already swapped out,
+            # and the clients attached now belong to its successor)
+            died = self._proc is proc
+            if died:
+                self._proc, self._init = None, None
+                if rc not in (0, None) and self._idle_since is None:
+                    self.error = f"ffmpeg exited {rc}: {self._stderr[-1] if self._stderr else ''}"
+            clients = list(self._clients) if died and self._idle_since is None else []
+        # ffmpeg gone while clients are attached → end their responses (they reconnect and restart it)
+        for c in clients:
+            with c.cond:
+                c.closed = True; c.cond.notify_all()
+
+    def _drain(self, proc):
+        try:
+            for line in proc.stderr:
+                line = line.decode("utf-8", "replace").strip()
+                if line: self._stderr.append(line)
+        except (OSError, ValueError):
+            pass
+
+    def _fanout(self, proc, chunk: bytes, key: bool):
+        with self._lock:
+            if self._proc is not proc: return   # tail of a retired ffmpeg: not for the next pipeline's clients
+            clients = list(self._clients)
+            self.fragments += 1
+        for c in clients: c.put(chunk, key)
+        self.bytes_out += len(chunk) * len(clients)
+
+    def _stop_proc(self, proc):
+        try: proc.stdin.close()
+        except OSError: pass
+        try: proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def _fail(self, msg: str):
+        self.error = msg
+        with self._lock:
+            clients = list(self._clients)
+        for c in clients:
+            with c.cond:
+                c.closed = True; c.cond.notify_all()
+
+    def stop(self):
+        with self._lock:
+            proc, self._idle_since = self._proc, time.monotonic() - H264_IDLE_S - 1
+            self._proc, self._init = None, None
+        if proc is not None: self._stop_proc(proc)
+
+    def info(self) -> dict:
+        with self._lock:
+            n = len(self._clients)
+        return {"format": self.fmt, "running": self.running, "clients": n, "size": self.size, "fps": self.fps,
+                "kbps": self.kbps, "bytes_out": self.bytes_out, "fragments": self.fragments, "starts": self.starts,
+                "error": self.error}
+
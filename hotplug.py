@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# hotplug.py — device add/remove notifications for the camera watcher
+#
+# Backends, first one that works wins:
+#   netlink : kernel uevent socket (usb + video4linux add/remove)
+#   inotify : IN_CREATE/IN_DELETE on /dev (video*) and /dev/bus/usb/* (gphoto cameras)
+#   poll    : nothing to listen to — caller keeps its old interval polling
+# Only the standard library is used (socket / ctypes), so it runs on a bare Pi image.
+import os, sys, time, errno, select, socket, struct, threading, ctypes, ctypes.util
+from typing import Callable, Optional
+
+NETLINK_KOBJECT_UEVENT = 15
+_SUBSYSTEMS = (b"SUBSYSTEM=usb", b"SUBSYSTEM=video4linux")
+
+IN_CREATE, IN_DELETE, IN_ATTRIB = 0x100, 0x200, 0x004
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_EV = struct.Struct("iIII")
+
+
+def _open_netlink():
+    if not sys.platform.startswith("linux"): return None
+    s = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+    try:
+        s.bind((0, 1))   # pid 0 = let the kernel assign; group 1 = kernel uevents
+        s.setblocking(False)
+        return s
+    except OSError:
+        s.close(); raise
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+    def watch(self, path: str, mask: int) -> bool:
+        wd = self._add(self.fd, path.encode(), mask)
+        if wd < 0: return False
+        self.dirs[wd] = path
+        return True
+
+    def read(self):
+        """-> [(dir, name, mask)]"""
+        out = []
+        try: buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError: return out
+        i = 0
+        while i + _EV.size <= len(buf):
+            wd, mask, _cookie, ln = _EV.unpack_from(buf, i)
+            name = buf[i + _EV.size:i + _EV.size + ln].rstrip(b"\0").decode(errors="replace")
+            out.append((self.dirs.get(wd, ""), name, mask))
+            i += _EV.size + ln
+        return out
+
+    def close(self):
+        try: os.close(self.fd)
+        except OSError: pass
+
+
+class HotplugMonitor:
+    """Background listener; wait() returns True once per (debounced) burst of device changes."""
+
+    def __init__(self, settle_s: float = 0.4, log: Callable[[str], None] = print, prefer: Optional[str] = None):
+        self.settle_s = settle_s
+        self.log = log
+        self.prefer = (prefer or "auto").lower()
+        self.backend = "poll"
+        self.events = 0
+        self._evt = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._nl = None
+        self._ino: Optional[_Inotify] = None
+
+    @property
+    def active(self) -> bool:
+        return self.backend != "poll"
+
+    def start(self) -> str:
+        order = [self.prefer] if self.prefer in ("netlink", "inotify", "poll") else ["netlink", "inotify"]
+        for b in order:
+            try:
+                if b == "netlink":
+                    self._nl = _open_netlink()
+                    if self._nl is None: continue
+                elif b == "inotify":
+                    self._ino = self._setup_inotify()
+                    if self._ino is None: continue
+                else:
+                    break
+                self.backend = b
+                break
+            except Exception as e:
+                self.log(f"[HOTPLUG] {b} unavailable: {e}")
+        if self.active:
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="hotplug")
+            self._thread.start()
+        return self.backend
+
+    def stop(self):
+        self._running = False
+        if self._thread: self._thread.join(timeout=2)
+        if self._nl is not None:
+            try: self._nl.close()
+            except Exception: pass
+        if self._ino is not None: self._ino.close()
+        self._evt.set()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        if not self._evt.wait(timeout): return False
+        # USB enumeration emits a burst (device, interfaces, v4l nodes) — coalesce it
+        time.sleep(self.settle_s)
+        self._evt.clear()
+        return self._running
+
+    # ---- internals
+    def _setup_inotify(self) -> Optional[_Inotify]:
+        if not sys.platform.startswith("linux"): return None
+        ino = _Inotify()
+        ok = ino.watch("/dev", IN_CREATE | IN_DELETE)
+        usb = "/dev/bus/usb"
+        if os.path.isdir(usb):
+            ino.watch(usb, IN_CREATE | IN_DELETE)   # new bus directories
+            for b in os.listdir(usb):
+                ino.watch(os.path.join(usb, b), IN_CREATE | IN_DELETE | IN_ATTRIB)
+        if not ok:
+            ino.close(); return None
+        return ino
+
+    def _relevant_uevent(self, msg: bytes) -> bool:
+        head = msg.split(b"\0", 1)[0]
+        if not (head.startswith(b"add@") or head.startswith(b"remove@")): return False
+        return any(s in msg for s in _SUBSYSTEMS)
+
+    def _relevant_inotify(self, d: str, name: str, mask: int) -> bool:
+        if d == "/dev": return name.startswith("video")
+        if d == "/dev/bus/usb" and mask & IN_CREATE:
+            self._ino.watch(os.path.join(d, name), IN_CREATE | IN_DELETE | IN_ATTRIB)
+        return d.startswith("/dev/bus/usb")
+
+    def _loop(self):
+        fd = self._nl.fileno() if self._nl is not None else self._ino.fd
+        while self._running:
+            try:
+                r, _, _ = select.select([fd], [], [], 1.0)
+                if not r: continue
+                hit = False
+                if self._nl is not None:
+                    while True:
+                        try: msg = self._nl.recv(16384)
+                        except (BlockingIOError, InterruptedError): break
+                        hit = hit or self._relevant_uevent(msg)
+                else:
+                    for d, name, mask in self._ino.read():
+                        hit = self._relevant_inotify(d, name, mask) or hit
+                if hit:
+                    self.events += 1
+                    self._evt.set()
+            except OSError as e:
+                if e.errno == errno.EINTR: continue
+                self.log(f"[HOTPLUG] {self.backend} error: {e}")
+                time.sleep(1.0)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# jpegenc.py — pluggable JPEG encoders (OpenCV / Pillow / simplejpeg / PyTurboJPEG)
+#
+# All backends take a HxWx3 uint8 BGR ndarray (what cv2 capture hands us) and a
+# quality 1..100, and return JPEG bytes or None. AutoEncoder benchmarks every
+# installed backend on the first real frame it sees and keeps the fastest.
+import threading, time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+try:
+    import simplejpeg
+except Exception:
+    simplejpeg = None
+try:
+    from turbojpeg import TurboJPEG
+except Exception:
+    TurboJPEG = None
+
+
+class JpegEncoder:
+    name = "base"
+
+    def encode(self, frame, quality: int) -> Optional[bytes]:
+        raise NotImplementedError
+
+
+class OpenCVEncoder(JpegEncoder):
+    name = "opencv"
+
+    def encode(self, frame, quality):
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        return buf.tobytes() if ok else None
+
+
+class PillowEncoder(JpegEncoder):
+    name = "pillow"
+
+    def encode(self, frame, quality):
+        import io
+        frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        img = Image.frombuffer("RGB", (w, h), frame, "raw", "BGR", 0, 1)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=int(quality))
+        return out.getvalue()
+
+
+class SimpleJpegEncoder(JpegEncoder):
+    name = "simplejpeg"
+
+    def encode(self, frame, quality):
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=int(quality), colorspace="BGR")
+
+
+class TurboJpegEncoder(JpegEncoder):
+    name = "turbojpeg"
+
+    def __init__(self):
+        self._tj = TurboJPEG()  # raises if libturbojpeg.so is missing
+
+    def encode(self, frame, quality):
+        return self._tj.encode(np.ascontiguousarray(frame), quality=int(quality))
+
+
+def available_encoders() -> List[JpegEncoder]:
+    out: List[JpegEncoder] = []
+    if cv2 is not None: out.append(OpenCVEncoder())
+    if simplejpeg is not None: out.append(SimpleJpegEncoder())
+    if TurboJPEG is not None:
+        try: out.append(TurboJpegEncoder())
+        except Exception: pass
+    if Image is not None: out.append(PillowEncoder())
+    return out
+
+
+def benchmark(encoders: List[JpegEncoder], frame, quality: int, rounds: int = 5) -> Dict[str, float]:
+    """Median encode time (ms) per backend on this frame; failing backends are left out."""
+    res: Dict[str, float] = {}
+    for e in encoders:
+        try:
+            if not e.encode(frame, quality): continue  # warm-up + sanity
+            ts = []
+            for _ in range(rounds):
+                t0 = time.perf_counter(); e.encode(frame, quality); ts.append(time.perf_counter() - t0)
+            ts.sort()
+            res[e.name] = round(ts[len(ts) // 2] * 1000.0, 3)
+        except Exception:
+            pass
+    return res
+
+
+class AutoEncoder:
+    """Picks a backend lazily: `prefer` if it is installed, else the fastest on the first frame."""
+
+    def __init__(self, prefer: Optional[str] = "auto", rounds: int = 5):
+        self.prefer = (prefer or "auto").strip().lower()
+        self.rounds = rounds
+        self._enc: Optional[JpegEncoder] = None
+        self._lock = threading.Lock()
+        self.bench: Dict[str, float] = {}
+        self.frame_size = None
+
+    def select(self, frame, quality: int) -> JpegEncoder:
+        with self._lock:
+            if self._enc is not None: return self._enc
+            encs = available_encoders()
+            if not encs: raise RuntimeError("no JPEG encoder available")
+            forced = [e for e in encs if e.name == self.prefer]
+            if forced:
+                self._enc = forced[0]
+            else:
+                self.bench = benchmark(encs, frame, quality, self.rounds)
+                self._enc = min(encs, key=lambda e: self.bench.get(e.name, float("inf")))
+            self.frame_size = [int(frame.shape[1]), int(frame.shape[0])]
+            return self._enc
+
+    def encode(self, frame, quality: int) -> Optional[bytes]:
+        enc = self._enc or self.select(frame, quality)
+        return enc.encode(frame, quality)
+
+    def info(self) -> dict:
+        return {"name": self._enc.name if self._enc else None, "prefer": self.prefer,
+                "bench_ms": self.bench, "frame_size": self.frame_size}
@@ -0,0 +1,79 @@
+// lib/cameraSocket.js — client for the CameraServer WebSocket live view (/video_ws)
+//
+// Each binary message = 32-byte little-endian header + JPEG (see wsframes.py).
+// The server only sends against credit, so we grant one credit after a frame has
+// been painted: a slow tab/device gets fewer but always-current frames.
+//
+//   const cam = openCameraSocket(CAMERA_BASE, {
+//     query: { autoconfirm: 1, w: 960 },
+//     onFrame: ({ bitmap, seq, latencyMs }) => ctx.drawImage(bitmap, 0, 0),
+//   });
+//   …
+//   cam.close();
+
+const HEADER_BYTES = 32;
+export const FLAG_PLACEHOLDER = 0x01;
+
+function wsUrl(base, path, query) {
+  const u = new URL(path, base || window.location.href);
+  u.protocol = u.protocol === "https:" ? "wss:" : "ws:";
+  Object.entries(query || {}).forEach(([k, v]) => v != null && u.searchParams.set(k, String(v)));
+  return u.toString();
+}
+
+function parseHeader(buf) {
+  const dv = new DataView(buf);
+  return {
+    version: dv.getUint8(0),
+    flags: dv.getUint8(1),
+    headerLength: dv.getUint16(2, true),
+    seq: dv.getUint32(4, true),
+    captureTs: dv.getFloat64(8, true),
+    publishTs: dv.getFloat64(16, true),
+    sendTs: dv.getFloat64(24, true),
+  };
+}
+
+export function openCameraSocket(base, opts = {}) {
+  const { camId, query, onFrame, onOpen, onClose, onError, credits = 1 } = opts;
+  const path = camId ? `/cams/${encodeURIComponent(camId)}/video_ws` : "/video_ws";
+  const ws = new WebSocket(wsUrl(base, path, { ...query, credits }));
+  ws.binaryType = "arraybuffer";
+  let lastSeq = null;
+  let dropped = 0;
+  let closed = false;
+
+  const grant = (n = 1) => {
+    if (!closed && ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ credit: n }));
+  };
+
+  ws.onopen = () => onOpen && onOpen();
+  ws.onerror = (e) => onError && onError(e);
+  ws.onclose = (e) => { closed = true; onClose && onClose(e); };
+  ws.onmessage = async (ev) => {
+    if (typeof ev.data === "string") return; // hello / control
+    const h = parseHeader(ev.data);
+    if (h.version !== 1 || h.headerLength < HEADER_BYTES) { grant(); return; }
+    if (lastSeq != null && h.seq > lastSeq + 1) dropped += h.seq - lastSeq - 1;
+    if (h.seq) lastSeq = h.seq;
+    const blob = new Blob([new Uint8Array(ev.data, h.headerLength)], { type: "image/jpeg" });
+    let bitmap = null;
+    try { bitmap = await createImageBitmap(blob); } catch { grant(); return; }
+    try {
+      onFrame && onFrame({
+        bitmap, blob, ...h, dropped,
+        placeholder: (h.flags & FLAG_PLACEHOLDER) !== 0,
+        latencyMs: h.captureTs ? Date.now() - h.captureTs : null,
+      });
+    } finally {
+      // ask for the next frame once this one is on screen
+      requestAnimationFrame(() => grant());
+    }
+  };
+
+  return {
+    ws,
+    setFps: (fps) => ws.readyState === WebSocket.OPEN && ws.send(JSON.stringify({ fps })),
+    close: () => { closed = true; try { ws.close(); } catch {} },
+  };
+}
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# metrics.py — in-process counters / gauges / latency histograms + Prometheus text output
+#
+# Cheap enough for the frame path: an observation is one bisect + a few adds under
+# a lock. Histograms keep cumulative buckets (what Prometheus scrapes) plus a
+# rolling window of recent samples, exported as <name>_recent{quantile=…} so the
+# current p50/p99 is visible without a Prometheus server on the booth.
+import bisect, threading, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# seconds; frame stages live in the ms range, DSLR capture steps in the seconds range
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WINDOW = 512
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: Optional[Tuple[str, str]] = None) -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(f'{extra[0]}="{_esc(extra[1])}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v) -> str:
+    if v == float("inf"): return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, lv: dict) -> Tuple[str, ...]:
+        return tuple(str(lv.get(n, "")) for n in self.labels)
+
+    def remove(self, **lv):
+        """Drop one label set (e.g. a disconnected viewer) so series don't pile up."""
+        with self._lock:
+            self._vals.pop(self._key(lv), None)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._vals: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, n: float = 1, **lv):
+        k = self._key(lv)
+        with self._lock:
+            self._vals[k] = self._vals.get(k, 0) + n
+
+    def value(self, **lv) -> float:
+        with self._lock:
+            return self._vals.get(self._key(lv), 0)
+
+    def lines(self):
+        with self._lock:
+            items = list(self._vals.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """set() values, or fn() -> number / {label tuple: number} evaluated at scrape time."""
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), fn: Optional[Callable] = None):
+        super().__init__(name, help, labels)
+        self._vals: Dict[Tuple[str, ...], float] = {}
+        self.fn = fn
+
+    def set(self, v: float, **lv):
+        with self._lock:
+            self._vals[self._key(lv)] = v
+
+    def lines(self):
+        if self.fn is not None:
+            try: got = self.fn()
+            except Exception: return []
+            items = list(got.items()) if isinstance(got, dict) else [((), got)]
+        else:
+            with self._lock:
+                items = list(self._vals.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class _HSeries:
+    __slots__ = ("counts", "sum", "count", "recent")
+
+    def __init__(self, n: int, window: int):
+        self.counts = [0] * (n + 1)   # last bucket = +Inf
+        self.sum, self.count = 0.0, 0
+        self.recent = deque(maxlen=window)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, window: int = WINDOW):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self._vals: Dict[Tuple[str, ...], _HSeries] = {}
+
+    def observe(self, v: float, **lv):
+        k = self._key(lv)
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            s = self._vals.get(k)
+            if s is None: s = self._vals[k] = _HSeries(len(self.buckets), self.window)
+            s.counts[i] += 1; s.sum += v; s.count += 1
+            s.recent.append(v)
+
+    @contextmanager
+    def time(self, **lv):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - t0, **lv)
+
+    def quantiles(self, qs=(0.5, 0.9, 0.99), **lv) -> Dict[float, Optional[float]]:
+        with self._lock:
+            s = self._vals.get(self._key(lv))
+            r = sorted(s.recent) if s else []
+        return {q: (r[min(len(r) - 1, int(q * len(r)))] if r else None) for q in qs}
+
+    def totals(self, **lv) -> Tuple[int, float]:
+        """(count, sum) so far for one label set — diff two reads for a per-interval mean."""
+        with self._lock:
+            s = self._vals.get(self._key(lv))
+            return (s.count, s.sum) if s else (0, 0.0)
+
+    def lines(self):
+        with self._lock:
+            items = [(k, list(s.counts), s.sum, s.count, sorted(s.recent)) for k, s in self._vals.items()]
+        out = []
+        for k, counts, total, n, recent in items:
+            acc = 0
+            for b, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                out.append(f"{self.name}_bucket{_labels(self.labels, k, ('le', _num(b)))} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labels, k)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labels, k)} {n}")
+        return out
+
+    def recent_lines(self):
+        """Rolling-window quantiles as a Prometheus summary named <name>_recent."""
+        with self._lock:
+            items = [(k, sorted(s.recent)) for k, s in self._vals.items()]
+        name = self.name + "_recent"
+        out = [f"# HELP {name} {self.help} (last {self.window} samples)", f"# TYPE {name} summary"]
+        for k, r in items:
+            if not r: continue
+            for q in (0.5, 0.9, 0.99):
+                out.append(f"{name}{_labels(self.labels, k, ('quantile', q))} {_num(r[min(len(r) - 1, int(q * len(r)))])}")
+            out.append(f"{name}_sum{_labels(self.labels, k)} {_num(sum(r))}")
+            out.append(f"{name}_count{_labels(self.labels, k)} {len(r)}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *a, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None: m = self._metrics[name] = cls(name, *a, **kw)
+            return m
+
+    def counter(self, name, help, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=(), fn=None) -> Gauge:
+        return self._get(Gauge, name, help, labels, fn)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, window=WINDOW) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets, window)
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        with self._lock:
+            ms = list(self._metrics.values())
+        out = []
+        for m in ms:
+            out += m.header() + m.lines()
+            if isinstance(m, Histogram): out += m.recent_lines()
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+counter, gauge, histogram = REGISTRY.counter, REGISTRY.gauge, REGISTRY.histogram
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
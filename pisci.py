@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
 import os, sys, time, signal, threading, cv2
-from datetime import datetime
 from flask import Flask, Response, request, send_file, send_from_directory, jsonify
 from flask_cors import CORS
-from picamera2 import Picamera2
+import synthcam
+if synthcam.enabled():
+    # CAMERA_SYNTH=pattern|dir:<jpegs>|<video> — run without a Pi camera (benchmarks / CI)
+    from synthcam import SyntheticPicamera2 as Picamera2
+else:
+    from picamera2 import Picamera2
+from framebus import FrameBroadcaster
+from storage import capture_path
+from jpegenc import AutoEncoder
 
 # ---------- Setup ----------
 app = Flask(__name__)
@@ -19,12 +26,11 @@ preview_config = picam2.create_preview_configuration(main={"size": (1920, 1080)}
 picam2.configure(preview_config)
 picam2.start()
 
-latest_frame = None
-latest_frame_ver = 0
+frame_bus = FrameBroadcaster()
+jpeg_encoder = AutoEncoder(os.getenv("JPEG_ENCODER", "auto"))
 captured_image = None
 captured_filename = None
 mode = "live"
-lock = threading.Lock()
 running = False
 capture_thread = None
 viewers = 0
@@ -32,31 +38,25 @@ last_error = None
 preview_fps = 60.0  # default fps
 
 # ---------- Helpers ----------
+def _rel_url(path: str) -> str:
+    return "/captured_images/" + os.path.relpath(path, SAVE_DIR).replace(os.sep, "/")
+
 def _set_latest_frame(frame_bytes: bytes):
-    global latest_frame, latest_frame_ver
-    with lock:
-        latest_frame = frame_bytes
-        latest_frame_ver += 1
+    frame_bus.publish(frame_bytes)
 
 def generate_frames():
-    global latest_frame_ver
     boundary = b'--frame\r\n'
-    last_ver = -1
-
-    while True:
-        with lock:
-            frame = latest_frame
-            ver = latest_frame_ver
 
-        if frame and ver != last_ver:
+    with frame_bus.subscribe() as sub:
+        while True:
+            frame = sub.wait(timeout=1.0)
+            if not frame:
+                continue
             headers = (
                 b'Content-Type: image/jpeg\r\n'
                 + b'Content-Length: ' + str(len(frame)).encode() + b'\r\n\r\n'
             )
             yield boundary + headers + frame + b'\r\n'
-            last_ver = ver
-        else:
-            time.sleep(0.01)
 
 def capture_loop():
     global running
@@ -65,9 +65,9 @@ def capture_loop():
             frame = picam2.capture_array("main")
             # Convert BGR to RGB for correct colors
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            ret, buf = cv2.imencode(".jpg", rgb_frame)
-            if ret:
-                _set_latest_frame(buf.tobytes())
+            b = jpeg_encoder.encode(rgb_frame, 95)
+            if b:
+                _set_latest_frame(b)
             time.sleep(1.0 / preview_fps)
         except Exception as e:
             print(f"[WARN] capture_loop error: {e}")
@@ -102,7 +102,8 @@ def root():
 def api_health():
     return jsonify({
         "ok": True, "running": running, "viewers": viewers,
-        "mode": mode, "last_error": last_error, "preview_fps": preview_fps
+        "mode": mode, "last_error": last_error, "preview_fps": preview_fps,
+        "encoder": jpeg_encoder.info(),
     })
 
 @app.route("/video_feed")
@@ -130,23 +131,21 @@ def capture():
     try:
         frame = picam2.capture_array("main")
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # convert to RGB
-        ret, buf = cv2.imencode(".jpg", rgb_frame)
-        if not ret:
+        data = jpeg_encoder.encode(rgb_frame, 95)
+        if not data:
             return jsonify({"ok": False, "error": "Failed to encode image"}), 500
 
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        host_filename = f"capture_{ts}.jpg"
-        host_filepath = os.path.join(SAVE_DIR, host_filename)
-        cv2.imwrite(host_filepath, rgb_frame)
+        host_filepath = capture_path(SAVE_DIR, None, ".jpg")
+        with open(host_filepath, "wb") as f:
+            f.write(data)
 
-        with open(host_filepath, "rb") as f:
-            captured_image = f.read()
+        captured_image = data
         captured_filename = host_filepath
 
         _set_latest_frame(captured_image)
         mode = "captured"
 
-        rel_url = f"/captured_images/{os.path.basename(host_filepath)}"
+        rel_url = _rel_url(host_filepath)
         return jsonify({"ok": True, "url": rel_url, "serverPath": captured_filename})
     except Exception as e:
         return jsonify({"ok": False, "error": f"Capture failed: {e}"}), 500
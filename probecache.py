@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# probecache.py — on-disk cache of the last good camera probe + cheap V4L2 identity
+#
+# Boot reads the cache, matches it against what is plugged in using sysfs only
+# (no device open, no cam.init()), and starts live from the cached mode right
+# away; the full probe then runs in the background to confirm / correct it.
+import os, json, time, glob
+from typing import List, Optional
+
+CACHE_VERSION = 1
+_SYS_V4L = "/sys/class/video4linux"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f: return f.read().strip()
+    except OSError:
+        return None
+
+
+def v4l2_identity(dev: str) -> dict:
+    """Stable identity of /dev/videoN from sysfs: driver name + USB vid:pid/serial/port."""
+    node = os.path.basename(dev)
+    base = os.path.join(_SYS_V4L, node)
+    ident = {"name": _read(os.path.join(base, "name"))}
+    try:
+        usb = os.path.realpath(os.path.join(base, "device"))
+        # walk up from the interface to the usb_device that carries idVendor
+        for _ in range(4):
+            if os.path.exists(os.path.join(usb, "idVendor")): break
+            usb = os.path.dirname(usb)
+        vid, pid = _read(os.path.join(usb, "idVendor")), _read(os.path.join(usb, "idProduct"))
+        if vid and pid:
+            ident["usb"] = f"{vid}:{pid}"
+            ident["serial"] = _read(os.path.join(usb, "serial"))
+            ident["port"] = os.path.basename(usb)
+    except OSError:
+        pass
+    return ident
+
+
+def v4l2_capture_nodes(devs: List[str]) -> List[str]:
+    """Drop metadata nodes (sysfs index != 0) so probes never open them."""
+    out = []
+    for d in devs:
+        idx = _read(os.path.join(_SYS_V4L, os.path.basename(d), "index"))
+        if idx is None or idx == "0": out.append(d)
+    return out
+
+
+def list_v4l2_capture() -> List[str]:
+    return v4l2_capture_nodes(sorted(glob.glob("/dev/video*"), key=lambda d: (len(d), d)))
+
+
+def _same_device(a: dict, b: dict) -> bool:
+    keys = ("name", "usb", "serial")
+    return bool(a) and bool(b) and all(a.get(k) == b.get(k) for k in keys) and any(a.get(k) for k in keys)
+
+
+class ProbeCache:
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                d = json.load(f)
+            return d if d.get("version") == CACHE_VERSION else None
+        except (OSError, ValueError):
+            return None
+
+    def save(self, entry: dict):
+        entry = dict(entry, version=CACHE_VERSION, saved=time.time())
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entry, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def invalidate(self):
+        try: os.remove(self.path)
+        except OSError: pass
+
+    def match_uvc(self, devs: List[str]) -> Optional[dict]:
+        """Cached UVC entry re-pointed at the node that carries the same device now, or None."""
+        c = self.load()
+        if not c or c.get("engine") != "uvc" or not c.get("ok"): return None
+        for d in v4l2_capture_nodes(devs):
+            if _same_device(v4l2_identity(d), c.get("identity") or {}):
+                try: idx = int(d.replace("/dev/video", ""))
+                except ValueError: continue
+                det = dict(c.get("details") or {}, index=idx)
+                return dict(c, details=det)
+        return None
+
+    def match_gphoto(self, cams) -> Optional[dict]:
+        """Cached gphoto entry matched by model (the usb port changes on replug), or None."""
+        c = self.load()
+        if not c or c.get("engine") != "gphoto" or not c.get("ok"): return None
+        model = (c.get("identity") or {}).get("model")
+        for m, p in cams:
+            if m == model:
+                return dict(c, details=dict(c.get("details") or {}, port=p))
+        return None
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# renditions.py — preview / thumbnail / print-size derivatives of a capture
+#
+# Runs inside CameraServer's process pool, so everything here is a plain
+# top-level function taking/returning bytes + paths (picklable). The original
+# capture is never modified; derivatives go to <SAVE_DIR>/renditions/.
+import io, os
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps
+
+
+def _env_int(name, default):
+    try: return int(os.environ.get(name, default))
+    except Exception: return default
+
+
+# name -> (long edge px, JPEG quality)
+SPECS: Dict[str, Tuple[int, int]] = {
+    "preview": (_env_int("RENDITION_PREVIEW", 1280), 85),
+    "thumb":   (_env_int("RENDITION_THUMB", 320), 75),
+    "print":   (_env_int("RENDITION_PRINT", 1800), 92),
+}
+
+
+def rendition_path(rend_dir: str, original: str, name: str) -> str:
+    stem = os.path.splitext(os.path.basename(original))[0]
+    return os.path.join(rend_dir, f"{stem}.{name}.jpg")
+
+
+def render(data: bytes, long_edge: int, quality: int) -> bytes:
+    img = Image.open(io.BytesIO(data))
+    w, h = img.size
+    s = min(1.0, float(long_edge) / max(w, h))
+    # let libjpeg scale in the DCT domain (1/2, 1/4, 1/8) before the real resize
+    img.draft("RGB", (max(1, int(w * s)), max(1, int(h * s))))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def render_to(data: bytes, path: str, name: str) -> bytes:
+    long_edge, quality = SPECS[name]
+    b = render(data, long_edge, quality)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(b)
+    os.replace(tmp, path)
+    return b
+
+
+def render_many(data: bytes, jobs) -> None:
+    """Background renditions for one capture: jobs = [(name, path), ...]."""
+    for name, path in jobs:
+        render_to(data, path, name)
+
+
+def warm() -> bool:
+    return True
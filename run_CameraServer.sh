@@ -1,8 +1,14 @@
 #!/usr/bin/env bash
 # run_CameraServer.sh — run CameraServer.py with python3 (default) or gunicorn via .env
 # Env:
-#   CAMERA_RUN_MODE=python|gunicorn   (default: python)
-#   PORT=8080                         (พอร์ตของ API; ใช้ได้เมื่อ CAMERA_RUN_MODE=gunicorn หรือเมื่อแก้ CameraServer.py ให้รับ $PORT)
+#   CAMERA_RUN_MODE=python|gunicorn|asgi   (default: python; asgi = uvicorn, viewers เป็น coroutine ไม่กิน thread)
+#   CONTROL_THREADS=8                 (asgi: thread pool ของ route ที่ไม่ใช่ stream)
+#   PORT=8080                         (พอร์ตของ API; ทั้ง python และ gunicorn)
+#   UVC_PASSTHROUGH=1                 (เว็บแคม MJPEG: ส่ง JPEG ของกล้องตรงถึง viewer ไม่ decode/encode ซ้ำ; 0 = BGR เดิม)
+#   STANDBY_FPS=2 STANDBY_GRACE_S=30 IDLE_MODE=release|sleep
+#                                     (ไม่มีคนดู: ลดเฟรมเหลือ STANDBY_FPS ช่วง grace แล้วปล่อยกล้อง/หยุดอ่าน — ประหยัดไฟและความร้อน)
+#   H264_W=1280 H264_FPS=30 H264_KBPS=1500 H264_GOP_S=1 H264_IDLE_S=5
+#                                     (/video.mp4, /video.ts: live view แบบ H.264 ผ่าน ffmpeg สำหรับดูจากระยะไกล)
 #   APT_AUTO=1                        (ติดตั้งแพ็กเกจอัตโนมัติถ้าจำเป็น)
 
 set -Eeuo pipefail
@@ -14,7 +20,7 @@ cd "$HERE"
 PORT="${PORT:-8080}"
 VENV_DIR=".venv_camera"
 APT_AUTO="${APT_AUTO:-1}"
-RUN_MODE="${CAMERA_RUN_MODE:-python}"   # python (default) | gunicorn
+RUN_MODE="${CAMERA_RUN_MODE:-python}"   # python (default) | gunicorn | asgi
 # ----------------------------
 
 # 0) ตรวจไฟล์หลัก
@@ -39,6 +45,8 @@ apt_install(){
 has_cmd python3 || apt_install python3 python3-venv python3-pip
 has_cmd pip3     || apt_install python3-pip
 has_cmd gphoto2  || apt_install gphoto2
+# optional (/video.mp4, /video.ts): ติดตั้งไม่ได้ (เช่น ออฟไลน์) ก็รันต่อ — แค่ไม่มี H.264 live view
+has_cmd ffmpeg   || apt_install ffmpeg || echo "[CAM][WARN] ffmpeg unavailable — /video.mp4, /video.ts disabled"
 dpkg -s libgphoto2-6    &>/dev/null || apt_install libgphoto2-6
 dpkg -s libgphoto2-dev  &>/dev/null || apt_install libgphoto2-dev
 dpkg -s build-essential &>/dev/null || apt_install build-essential
@@ -79,8 +87,9 @@ pillow==11.3.0
 numpy==2.2.6
 imageio==2.37.0
 python-dotenv==1.1.1
-# optional WSGI
+# optional WSGI / ASGI
 gunicorn==23.0.0
+uvicorn==0.35.0
 EOF
   echo "[CAM] Created $REQ_FILE (พื้นฐาน)"
 fi
@@ -92,10 +101,17 @@ if [[ "$RUN_MODE" == "gunicorn" && ! -x "$GUNICORN_BIN" ]]; then
   echo "[CAM] gunicorn not found in venv → installing…"
   python -m pip install gunicorn==23.0.0
 fi
+UVICORN_BIN="$HERE/$VENV_DIR/bin/uvicorn"
+if [[ "$RUN_MODE" == "asgi" && ! -x "$UVICORN_BIN" ]]; then
+  echo "[CAM] uvicorn not found in venv → installing…"
+  python -m pip install uvicorn==0.35.0
+fi
 
+export PORT
 cleanup(){
   echo; echo "[CAM] Stopping CameraServer…"
   pkill -f "gunicorn .*CameraServer:app" 2>/dev/null || true
+  pkill -f "uvicorn .*asgi:app" 2>/dev/null || true
   pkill -f "python .*CameraServer.py" 2>/dev/null || true
   deactivate 2>/dev/null || true
 }
@@ -111,6 +127,13 @@ if [[ "$RUN_MODE" == "gunicorn" ]]; then
     --timeout 0 \
     --graceful-timeout 10 \
     --chdir "$HERE"
+elif [[ "$RUN_MODE" == "asgi" ]]; then
+  echo "[CAM] RUN_MODE=asgi → starting uvicorn at 0.0.0.0:${PORT}"
+  exec "$UVICORN_BIN" "asgi:app" \
+    --host 0.0.0.0 --port "${PORT}" \
+    --timeout-graceful-shutdown 5 \
+    --log-level warning \
+    --app-dir "$HERE"
 else
   echo "[CAM] RUN_MODE=python → starting python3 CameraServer.py"
   exec python "CameraServer.py"
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# storage.py — sharded capture paths + background retention (quota / age GC)
+#
+# Layout: <root>/<YYYYMMDD>/<session>/capture_<YYYYmmdd_HHMMSS_mmm>_<seq>.<ext>
+# Names carry milliseconds plus a per-process sequence number, so two shots in
+# the same second (or two engines) never collide.
+import os, re, time, itertools, threading
+from datetime import datetime
+from typing import Callable, List, Optional
+
+NO_SESSION = "nosession"
+_seq = itertools.count(1)
+_seq_lock = threading.Lock()
+
+
+def _safe_session(session: Optional[str]) -> str:
+    s = re.sub(r"[^A-Za-z0-9_-]", "", str(session or ""))[:48]
+    return s or NO_SESSION
+
+
+def capture_path(root: str, session: Optional[str] = None, ext: str = ".jpg", now: Optional[float] = None) -> str:
+    """New, not-yet-existing path for a capture; creates the shard directory."""
+    now = time.time() if now is None else now
+    dt = datetime.fromtimestamp(now)
+    d = os.path.join(root, dt.strftime("%Y%m%d"), _safe_session(session))
+    os.makedirs(d, exist_ok=True)
+    ext = ext if ext.startswith(".") else "." + ext
+    while True:
+        with _seq_lock:
+            n = next(_seq)
+        p = os.path.join(d, f"capture_{dt.strftime('%Y%m%d_%H%M%S')}_{int(now * 1000) % 1000:03d}_{n:04d}{ext}")
+        if not os.path.exists(p) and not os.path.exists(p + ".part"):
+            return p
+
+
+def dir_bytes(root: str) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for f in filenames:
+            try: total += os.path.getsize(os.path.join(dirpath, f))
+            except OSError: pass
+    return total
+
+
+def _file_bytes(paths) -> int:
+    total = 0
+    for p in paths:
+        try: total += os.path.getsize(p)
+        except OSError: pass
+    return total
+
+
+def prune_empty_dirs(root: str, keep: List[str] = ()):
+    keep = {os.path.abspath(k) for k in keep} | {os.path.abspath(root)}
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if os.path.abspath(dirpath) in keep: continue
+        try:
+            if not os.listdir(dirpath): os.rmdir(dirpath)
+        except OSError:
+            pass
+
+
+class RetentionWorker:
+    """Deletes the oldest captures once the catalog exceeds a size quota or age limit.
+
+    Runs on its own thread every `interval` seconds; the request path never
+    waits for it. delete(paths) -> deleted paths does the actual removal.
+    sidecars(path) -> derivative files of a capture (renditions): their bytes
+    count toward the quota (everything under sidecar_root) and they go with it.
+    """
+
+    def __init__(self, catalog, delete: Callable[[List[str]], List[str]], max_bytes: int = 0,
+                 max_age_s: float = 0, interval: float = 300.0, batch: int = 200, log=print,
+                 sidecars: Optional[Callable[[str], List[str]]] = None, sidecar_root: Optional[str] = None):
+        self.catalog, self.delete = catalog, delete
+        self.sidecars, self.sidecar_root = sidecars or (lambda _p: []), sidecar_root
+        self.max_bytes, self.max_age_s = int(max_bytes), float(max_age_s)
+        self.interval, self.batch, self.log = float(interval), int(batch), log
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.max_age_s > 0
+
+    def start(self):
+        if not self.enabled or (self._thread and self._thread.is_alive()): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="retention")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=2)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try: self.run_once()
+            except Exception as e: self.log(f"[RETENTION] error: {e}")
+
+    def run_once(self) -> dict:
+        removed, freed = 0, 0
+        if self.max_age_s > 0:
+            cutoff = time.time() - self.max_age_s
+            while not self._stop.is_set():
+                rows = self.catalog.oldest(self.batch, before=cutoff)
+                if not rows: break
+                n, b, sb = self._drop(rows); removed += n; freed += b + sb
+                if n == 0: break
+        if self.max_bytes > 0:
+            side = dir_bytes(self.sidecar_root) if self.sidecar_root else 0
+            while not self._stop.is_set() and self.catalog.total_size() + side > self.max_bytes:
+                rows = self.catalog.oldest(self.batch)
+                if not rows: break
+                over = self.catalog.total_size() + side - self.max_bytes
+                take, acc = [], 0
+                for r in rows:
+                    take.append(r); acc += (r[1] or 0) + _file_bytes(self.sidecars(r[0]))
+                    if acc >= over: break
+                n, b, sb = self._drop(take); removed += n; freed += b + sb
+                side = max(0, side - sb)
+                if n == 0: break
+        if removed:
+            prune_empty_dirs(self.catalog.root, keep=self.catalog.skip_dirs)
+            self.log(f"[RETENTION] removed={removed} freed={freed/1048576:.1f}MB")
+        self.last_run = {"time": time.time(), "removed": removed, "freed_bytes": freed}
+        return self.last_run
+
+    def _drop(self, rows):
+        """-> (rows dropped, original bytes freed, sidecar bytes freed)"""
+        paths = [p for p, _s, _c in rows]
+        side = {p: [s for s in self.sidecars(p) if os.path.exists(s)] for p in paths}
+        side_size = {p: _file_bytes(side[p]) for p in paths}
+        gone = set(self.delete(paths))
+        # rows whose file is already missing are stale — drop them from the catalog too
+        stale = [p for p in paths if p not in gone and not os.path.exists(p)]
+        side_freed = 0
+        for p in list(gone) + stale:
+            for s in side[p]:
+                try: os.remove(s)
+                except FileNotFoundError: pass   # delete() already took it
+                except OSError: continue
+            side_freed += side_size[p]
+        self.catalog.remove(list(gone) + stale)
+        return len(gone) + len(stale), sum((s or 0) for p, s, _c in rows if p in gone), side_freed
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# synthcam.py — hardware-free camera source for benchmarks / CI / laptops
+#
+# CAMERA_SYNTH selects the source (unset = real hardware only):
+#   pattern             moving test pattern (colour bars + sweeping box + frame counter)
+#   dir:/path/to/jpegs  replay a directory of JPEGs (sorted, looped)
+#   /path/to/clip.mp4   replay a video file (anything cv2.VideoCapture reads, looped)
+# SYNTH_W / SYNTH_H / SYNTH_FPS are the "sensor" native mode (default 1920x1080@30);
+# like a real camera, set() may ask for less but never more. Replays use the
+# source's own size as the native mode.
+#
+# SyntheticCapture looks like cv2.VideoCapture (isOpened/read/grab/set/get/release) and
+# blocks in read() until the next frame is due, so it runs through the same worker /
+# ring / encode / capture code as a webcam. SyntheticPicamera2 does the same for pisci.
+# Asking for the MJPG fourcc with CONVERT_RGB=0 makes read() return JPEG bytes (1×N uint8)
+# like a webcam's MJPEG mode: dir: replays hand out the files as-is, other sources are
+# encoded here (the "camera's" encoder — that cost lands in this process, unlike real hardware).
+import os, glob, time
+from typing import Optional
+
+import numpy as np
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+PROP_W, PROP_H, PROP_FPS = (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT, cv2.CAP_PROP_FPS) if cv2 else (3, 4, 5)
+PROP_FOURCC, PROP_CONVERT_RGB = (cv2.CAP_PROP_FOURCC, cv2.CAP_PROP_CONVERT_RGB) if cv2 else (6, 16)
+FOURCC_MJPG = float(0x47504A4D)   # "MJPG" little-endian, as cv2.VideoWriter_fourcc(*"MJPG")
+SYNTH_JPEG_Q = int(os.environ.get("SYNTH_JPEG_Q", "85"))
+CACHE_FRAMES = 120   # decoded replay frames kept in memory (longer replays decode per frame)
+
+# colour bars, BGR
+_BARS = np.array([[192, 192, 192], [0, 192, 192], [192, 192, 0], [0, 192, 0],
+                  [192, 0, 192], [0, 0, 192], [192, 0, 0], [16, 16, 16]], np.uint8)
+
+
+def source() -> Optional[str]:
+    return os.environ.get("CAMERA_SYNTH", "").strip() or None
+
+
+def enabled() -> bool:
+    return source() is not None
+
+
+class SyntheticCapture:
+    def __init__(self, spec: Optional[str] = None, w: Optional[int] = None, h: Optional[int] = None,
+                 fps: Optional[float] = None):
+        self.spec = spec or source() or "pattern"
+        self.max_w = int(w or os.environ.get("SYNTH_W", "1920"))
+        self.max_h = int(h or os.environ.get("SYNTH_H", "1080"))
+        self.max_fps = float(fps or os.environ.get("SYNTH_FPS", "30"))
+        self.frames = 0
+        self.fourcc, self.convert_rgb = 0.0, True
+        self._files, self._video, self._cache = [], None, {}
+        self._raw = {}   # dir: replay file bytes for MJPEG mode
+        self._base = None
+        self._next: Optional[float] = None
+        self._opened = self._open()
+        self.w, self.h, self.fps = self.max_w, self.max_h, self.max_fps
+
+    # ---- cv2.VideoCapture surface
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self, image=None):
+        if not self._opened: return False, None
+        if self._mjpeg(): return self._read_jpeg()
+        self._pace()
+        shape = (self.h, self.w, 3)
+        out = image if image is not None and getattr(image, "shape", None) == shape else np.empty(shape, np.uint8)
+        if self._video is None and not self._files:
+            self._pattern(out)
+        else:
+            src = self._replay_frame()
+            if src is None: return False, None
+            if src.shape[:2] != shape[:2]: cv2.resize(src, (self.w, self.h), dst=out, interpolation=cv2.INTER_AREA)
+            else: np.copyto(out, src)
+        self.frames += 1
+        return True, out
+
+    def grab(self) -> bool:
+        # advance one frame without producing it (stale-frame flush after a slow-read gap)
+        if not self._opened: return False
+        self._pace()
+        if self._video is not None and not self._video.grab():
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)   # end of clip → loop
+        self.frames += 1
+        return True
+
+    def set(self, prop, value) -> bool:
+        # the "driver" clamps to the native mode, like a real UVC camera does
+        if prop == PROP_W: self.w = max(16, min(int(value), self.max_w))
+        elif prop == PROP_H: self.h = max(16, min(int(value), self.max_h))
+        elif prop == PROP_FPS: self.fps = max(1.0, min(float(value), self.max_fps))
+        elif prop == PROP_FOURCC: self.fourcc = float(value)
+        elif prop == PROP_CONVERT_RGB:
+            if not value and cv2 is None: return False   # no encoder for the "camera"
+            self.convert_rgb = bool(value)
+        else: return False
+        return True
+
+    def get(self, prop) -> float:
+        return {PROP_W: float(self.w), PROP_H: float(self.h), PROP_FPS: float(self.fps), PROP_FOURCC: self.fourcc,
+                PROP_CONVERT_RGB: float(self.convert_rgb)}.get(prop, 0.0)
+
+    def release(self):
+        if self._video is not None:
+            try: self._video.release()
+            except Exception: pass
+        self._video, self._opened = None, False
+
+    # ---- MJPEG mode
+    def _mjpeg(self) -> bool:
+        return not self.convert_rgb and self.fourcc == FOURCC_MJPG
+
+    def _read_jpeg(self):
+        if self._files and (self.w, self.h) == (self.max_w, self.max_h):
+            i = self.frames % len(self._files)
+            buf = self._raw.get(i)
+            if buf is None:
+                buf = np.fromfile(self._files[i], np.uint8).reshape(1, -1)
+                if i < CACHE_FRAMES: self._raw[i] = buf
+            self._pace(); self.frames += 1
+            return True, buf
+        self.convert_rgb = True
+        try: ret, frame = self.read()
+        finally: self.convert_rgb = False
+        if not ret: return False, None
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), SYNTH_JPEG_Q])
+        return (True, buf.reshape(1, -1)) if ok else (False, None)
+
+    # ---- sources
+    def _open(self) -> bool:
+        if self.spec == "pattern": return True
+        if cv2 is None: return False   # replays need a decoder
+        if self.spec.startswith("dir:"):
+            d = self.spec[4:]
+            self._files = sorted(f for f in glob.glob(os.path.join(d, "*")) if f.lower().endswith((".jpg", ".jpeg")))
+            first = self._load(0) if self._files else None
+            if first is None: return False
+            self.max_h, self.max_w = first.shape[:2]
+            return True
+        self._video = cv2.VideoCapture(self.spec)
+        if not self._video.isOpened(): return False
+        self.max_w = int(self._video.get(PROP_W)) or self.max_w
+        self.max_h = int(self._video.get(PROP_H)) or self.max_h
+        return True
+
+    def _load(self, i: int):
+        if i in self._cache: return self._cache[i]
+        img = cv2.imdecode(np.fromfile(self._files[i], np.uint8), cv2.IMREAD_COLOR)
+        if img is not None and i < CACHE_FRAMES: self._cache[i] = img
+        return img
+
+    def _replay_frame(self):
+        if self._files:
+            img = self._load(self.frames % len(self._files))
+            if img is not None and img.shape[:2] != (self.max_h, self.max_w):
+                img = cv2.resize(img, (self.max_w, self.max_h), interpolation=cv2.INTER_AREA)
+            return img
+        ok, img = self._video.read()
+        if not ok:   # end of clip → loop
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, img = self._video.read()
+        return img if ok else None
+
+    def _pattern(self, out):
+        if self._base is None or self._base.shape != out.shape:
+            idx = (np.arange(self.w) * len(_BARS)) // self.w
+            self._base = np.ascontiguousarray(np.broadcast_to(_BARS[idx], out.shape))
+        np.copyto(out, self._base)
+        s = max(8, self.h // 6)
+        x, y = (self.frames * 7) % max(1, self.w - s), (self.h - s) // 2
+        out[y:y + s, x:x + s] = 255
+        if cv2 is not None:
+            cv2.putText(out, f"{self.frames:06d} {time.time():.3f}", (16, self.h - 16),
+                        cv2.FONT_HERSHEY_SIMPLEX, max(0.5, self.h / 720.0), (255, 255, 255), 2)
+
+    def _pace(self):
+        # a real sensor hands out frames at its rate — block until the next one is due
+        now = time.monotonic()
+        if self._next is None or now - self._next > 1.0: self._next = now
+        d = self._next - now
+        if d > 0: time.sleep(d)
+        self._next += 1.0 / self.fps
+
+
+class SyntheticPicamera2:
+    """Just enough of picamera2.Picamera2 for pisci.py: configure / start / capture_array / close."""
+
+    def __init__(self, *args, **kwargs):
+        self._size = (1920, 1080)
+        self._cap: Optional[SyntheticCapture] = None
+
+    def create_preview_configuration(self, main=None, **kwargs):
+        return {"main": dict(main or {})}
+
+    create_still_configuration = create_preview_configuration
+
+    def configure(self, config):
+        self._size = tuple((config.get("main") or {}).get("size") or self._size)
+
+    def start(self):
+        self._cap = SyntheticCapture()
+        self._cap.set(PROP_W, self._size[0]); self._cap.set(PROP_H, self._size[1])
+
+    def capture_array(self, name="main"):
+        if self._cap is None: self.start()
+        ok, frame = self._cap.read()
+        if not ok: raise RuntimeError(f"synthetic source unavailable: {self._cap.spec}")
+        return frame[..., ::-1].copy()   # Picamera2 "main" arrays come RGB-ordered
+
+    def stop(self): pass
+
+    def close(self):
+        if self._cap is not None: self._cap.release()
@@ -10,15 +10,23 @@
 #   FRONTEND_ORIGIN=http://<ui-host>:3000
 #   CAMERA_PORT=usb:001,010   # for gphoto2
 #   PREVIEW_FPS=18            # (1–60)
+#   CAMERA_SYNTH=pattern      # no hardware: test pattern / dir:<jpegs> / <video> (see synthcam.py)
 #
 # pip install flask flask-cors gphoto2 opencv-python-headless
 
 import os, sys, time, signal, threading, mimetypes, glob
-from datetime import datetime
-import gphoto2 as gp
+try:
+    import gphoto2 as gp
+except ImportError:
+    gp = None   # webcam / synthetic source only
 import cv2
 from flask import Flask, Response, request, send_file, send_from_directory, jsonify
 from flask_cors import CORS
+from framebus import FrameBroadcaster
+from storage import capture_path
+from jpegenc import AutoEncoder
+from probecache import list_v4l2_capture, v4l2_identity
+import synthcam
 
 # ---------- ENV ----------
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://127.0.0.1:3000")
@@ -44,14 +52,12 @@ os.makedirs(SAVE_DIR, exist_ok=True)
 
 # ---------- Globals ----------
 selected_port = CAMERA_PORT_ENV
-latest_frame = None
-latest_frame_ver = 0
-latest_frame_ts = 0.0
+frame_bus = FrameBroadcaster()
+jpeg_encoder = AutoEncoder(os.getenv("JPEG_ENCODER", "auto"))
 captured_image = None
 captured_filename = None
 mode = "live"
 running = False
-lock = threading.Lock()
 capture_thread = None
 supports_preview = None
 viewers = 0
@@ -82,15 +88,15 @@ def _choose_ext(mime: str, fallback_name: str) -> str:
         ext = guessed or os.path.splitext(fallback_name)[1] or '.bin'
     return ext
 
+def _rel_url(path: str) -> str:
+    return "/captured_images/" + os.path.relpath(path, SAVE_DIR).replace(os.sep, "/")
+
 def _set_latest_frame(data: bytes):
-    global latest_frame, latest_frame_ver, latest_frame_ts, lock
-    with lock:
-        latest_frame = data
-        latest_frame_ver += 1
-        latest_frame_ts = time.monotonic()
+    frame_bus.publish(data)
 
 # ---------- Camera detect ----------
 def list_cameras():
+    if not gp: return []
     try:
         arr = gp.Camera.autodetect()
         return arr or []
@@ -98,7 +104,22 @@ def list_cameras():
         print(f"[ERROR] autodetect failed: {e}")
         return []
 
+def _open_webcam(index):
+    return synthcam.SyntheticCapture() if index == "synth" else cv2.VideoCapture(index)
+
 def list_webcams(max_devices=5):
+    if synthcam.enabled():
+        return [(f"Synthetic ({synthcam.source()})", "synth")]
+    # sysfs names the capture nodes without opening anything (metadata nodes skipped);
+    # only fall back to blind index opens where there is no /dev/video* (non-Linux)
+    nodes = list_v4l2_capture()
+    if nodes:
+        found = []
+        for d in nodes:
+            idx = d.replace("/dev/video", "")
+            if idx.isdigit():
+                found.append((v4l2_identity(d).get("name") or f"USB Webcam {idx}", idx))
+        return found
     found = []
     for i in range(max_devices):
         cap = cv2.VideoCapture(i)
@@ -109,6 +130,11 @@ def list_webcams(max_devices=5):
 
 def pick_camera():
     global CAMERA_TYPE, selected_port, WEBCAM_INDEX
+    if synthcam.enabled():
+        # headless benchmark / CI run — nothing to choose
+        CAMERA_TYPE, WEBCAM_INDEX = "webcam", "synth"
+        print(f"[INFO] Using synthetic camera: {synthcam.source()}")
+        return
     gphoto2_cams = list_cameras()
     webcams = list_webcams()
 
@@ -191,9 +217,7 @@ def safe_capture_one(cam):
     camera_file = cam.file_get(cam_folder, cam_name, gp.GP_FILE_TYPE_NORMAL)
     mime = camera_file.get_mime_type()
     ext = _choose_ext(mime, cam_name)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    host_filename = f"capture_{ts}{ext}"
-    host_filepath = os.path.join(SAVE_DIR, host_filename)
+    host_filepath = capture_path(SAVE_DIR, None, ext)
     camera_file.save(host_filepath)
     try: cam.file_delete(cam_folder, cam_name)
     except gp.GPhoto2Error: pass
@@ -201,7 +225,7 @@ def safe_capture_one(cam):
 
 # ---------- Capture loop ----------
 def capture_loop():
-    global latest_frame, mode, running, supports_preview, selected_port, last_error, preview_fps
+    global mode, running, supports_preview, selected_port, last_error, preview_fps
 
     if CAMERA_TYPE == "gphoto2":
         cam = connect_camera(selected_port)
@@ -230,7 +254,7 @@ def capture_loop():
         print("[INFO] DSLR capture_loop stopped")
 
     elif CAMERA_TYPE == "webcam":
-        cap = cv2.VideoCapture(WEBCAM_INDEX)
+        cap = _open_webcam(WEBCAM_INDEX)
         if not cap.isOpened():
             last_error = f"Cannot open webcam index {WEBCAM_INDEX}"
             running = False
@@ -241,9 +265,9 @@ def capture_loop():
             ret, frame = cap.read()
             if not ret:
                 time.sleep(0.05); continue
-            ret, buf = cv2.imencode(".jpg", frame)
-            if ret:
-                _set_latest_frame(buf.tobytes())
+            b = jpeg_encoder.encode(frame, 95)
+            if b:
+                _set_latest_frame(b)
             now = time.monotonic()
             sleep_for = next_tick - now
             if sleep_for > 0: time.sleep(sleep_for)
@@ -253,29 +277,24 @@ def capture_loop():
 
 # ---------- Stream generator ----------
 def generate_frames():
-    global preview_fps, latest_frame_ver
+    global preview_fps
     send_interval = 1.0 / max(1.0, float(preview_fps))
     next_send = time.monotonic()
-    last_sent_ver = -1
     boundary = b'--frame\r\n'
-    while True:
-        now = time.monotonic()
-        if now < next_send:
-            time.sleep(min(0.005, next_send - now))
-            continue
-        with lock:
-            frame = latest_frame
-            ver = latest_frame_ver
-        if frame and ver != last_sent_ver:
+    with frame_bus.subscribe() as sub:
+        while True:
+            now = time.monotonic()
+            if now < next_send:
+                time.sleep(next_send - now)
+            frame = sub.wait(timeout=1.0)
+            if not frame:
+                continue
             headers = (
                 b'Content-Type: image/jpeg\r\n' +
                 b'Content-Length: ' + str(len(frame)).encode('ascii') + b'\r\n\r\n'
             )
             yield boundary + headers + frame + b'\r\n'
-            last_sent_ver = ver
             next_send = time.monotonic() + send_interval
-        else:
-            time.sleep(0.01)
 
 # ---------- Thread control ----------
 def stop_capture_thread():
@@ -307,6 +326,7 @@ def api_health():
         "ok": True, "running": running, "viewers": viewers, "mode": mode,
         "selected_port": selected_port, "camera_type": CAMERA_TYPE,
         "last_error": last_error, "preview_fps": preview_fps,
+        "encoder": jpeg_encoder.info(),
     }), 200
 
 @app.route('/capture', methods=['POST'])
@@ -326,7 +346,7 @@ def capture():
             if mime == 'image/jpeg':
                 _set_latest_frame(captured_image)
             mode = "captured"
-            rel_url = f"/captured_images/{os.path.basename(host_filepath)}"
+            rel_url = _rel_url(host_filepath)
             return jsonify({"ok": True, "url": rel_url, "serverPath": captured_filename}), 200
         except Exception as e:
             last_error = f"Capture failed: {e}"
@@ -336,21 +356,19 @@ def capture():
             except: pass
             ensure_preview_if_needed()
     elif CAMERA_TYPE == "webcam":
-        cap = cv2.VideoCapture(WEBCAM_INDEX)
+        cap = _open_webcam(WEBCAM_INDEX)
         ret, frame = cap.read()
         cap.release()
         if not ret:
             return jsonify({"ok": False, "error": "Webcam capture failed"}), 500
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        host_filename = f"capture_{ts}.jpg"
-        host_filepath = os.path.join(SAVE_DIR, host_filename)
+        host_filepath = capture_path(SAVE_DIR, None, ".jpg")
         cv2.imwrite(host_filepath, frame)
         with open(host_filepath, 'rb') as f:
             captured_image = f.read()
         captured_filename = os.path.abspath(host_filepath)
         _set_latest_frame(captured_image)
         mode = "captured"
-        rel_url = f"/captured_images/{os.path.basename(host_filepath)}"
+        rel_url = _rel_url(host_filepath)
         return jsonify({"ok": True, "url": rel_url, "serverPath": captured_filename}), 200
 
 @app.route('/video_feed')
@@ -396,7 +414,7 @@ def confirm():
         return jsonify({
             "ok": True,
             "serverPath": captured_filename,
-            "url": f"/captured_images/{os.path.basename(captured_filename)}"
+            "url": _rel_url(captured_filename)
         }), 200
     else:
         return jsonify({"ok": False, "error": "No image to confirm"}), 400
@@ -405,10 +423,10 @@ def confirm():
 @app.route('/stop_stream', methods=['POST'])
 @app.route('/stop', methods=['POST'])
 def stop_stream():
-    global mode, latest_frame
+    global mode
     mode = "live"
     stop_capture_thread()
-    with lock: latest_frame = None
+    frame_bus.clear()
     return jsonify({"ok": True, "stopped": True}), 200
 
 # ---------- Cleanup ----------
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# wsframes.py — WebSocket live-view wire format (/video_ws, /cams/<id>/video_ws)
+#
+# Server → client
+#   text    {"type":"hello", "cam":…, "header":"<BBHIddd", "credits":N}   once, on connect
+#   binary  HEADER + JPEG, one message per frame:
+#             u8  version (1)       u8  flags (FLAG_PLACEHOLDER = black first frame)
+#             u16 header length     u32 frame seq (bus version; gaps = frames skipped)
+#             f64 capture ts        f64 publish ts        f64 send ts      (epoch ms)
+# Client → server (text JSON)
+#   {"credit": n}   ready for n more frames (normally 1 after each frame is painted)
+#   {"fps": 15}     cap this viewer's rate (0 = off)
+#
+# The server sends only while the client holds credit; without credit the viewer's
+# bus slot just keeps the newest frame, so a slow client never builds a queue.
+import json, struct, time
+from typing import Optional
+
+VERSION = 1
+HEADER = struct.Struct("<BBHIddd")
+FLAG_PLACEHOLDER = 0x01
+MAX_CREDITS = 8
+
+
+def pack(jpeg: bytes, meta=None, flags: int = 0) -> bytes:
+    """meta = Subscriber.meta (seq, capture ts, publish ts) in epoch seconds."""
+    seq, cap, pub = meta or (0, 0.0, 0.0)
+    return HEADER.pack(VERSION, flags, HEADER.size, seq & 0xFFFFFFFF,
+                       cap * 1000.0, pub * 1000.0, time.time() * 1000.0) + jpeg
+
+
+def unpack(msg: bytes):
+    """-> (header dict, jpeg bytes); for tools / tests."""
+    ver, flags, hlen, seq, cap, pub, sent = HEADER.unpack_from(msg)
+    return {"version": ver, "flags": flags, "seq": seq, "capture_ts": cap, "publish_ts": pub,
+            "send_ts": sent}, msg[hlen:]
+
+
+def hello(cam: str, credits: int) -> str:
+    return json.dumps({"type": "hello", "cam": cam, "header": HEADER.format, "credits": credits})
+
+
+def parse_client(msg) -> dict:
+    """Client control message -> {"credit": int, "fps": float} (keys present only if sent)."""
+    try:
+        d = json.loads(msg if isinstance(msg, str) else bytes(msg).decode("utf-8"))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return {}
+    if not isinstance(d, dict): return {}
+    out = {}
+    try:
+        if "credit" in d: out["credit"] = max(0, int(d["credit"]))
+        if "fps" in d: out["fps"] = max(0.0, float(d["fps"]))
+    except (TypeError, ValueError):
+        pass
+    return out
+
+
+class Credits:
+    """Frames the client has said it can take; capped so a burst of acks can't build a backlog."""
+
+    def __init__(self, initial: Optional[int] = 1):
+        self.n = max(0, min(MAX_CREDITS, int(initial if initial is not None else 1)))
+
+    def add(self, n: int):
+        self.n = min(MAX_CREDITS, self.n + n)
+
+    def take(self) -> bool:
+        if self.n <= 0: return False
+        self.n -= 1
+        return True